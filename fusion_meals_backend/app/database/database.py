@@ -1,17 +1,59 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
 # Get database URL from environment variable or use default
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://vinitdesai@localhost:5432/fusion_meals")
 
+# Async drivers for the same databases: asyncpg for Postgres, aiosqlite for local/test SQLite
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a database URL: postgresql://... -> postgresql+asyncpg://..."""
+    scheme, separator, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}{separator}{rest}"
+
+# ASYNC_DATABASE_URL overrides the URL derived from DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+def pool_options(url: str) -> dict:
+    """
+    Async connection pool settings from the environment. SQLite files get a
+    pool too (aiosqlite would otherwise open a connection and thread per
+    session); in-memory SQLite keeps its default single shared connection.
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.endswith("://")):
+        return {}
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    }
+    if url.startswith("sqlite"):
+        return {**options, "poolclass": AsyncAdaptedQueuePool}
+    # Server connections are recycled and checked before use
+    return {**options, "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")), "pool_pre_ping": True}
+
 # Create SQLAlchemy engine
 engine = create_engine(DATABASE_URL)
 
 # Create sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Shared async engine used by the pantry and recipe ratings routers; queries
+# wait on the driver without blocking the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+
+# Objects stay loaded after commit, since async sessions can't lazy-load on attribute access
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create Base class for declarative models
 Base = declarative_base()
 
@@ -21,4 +63,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
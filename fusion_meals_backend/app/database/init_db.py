@@ -1,5 +1,6 @@
 from app.database.database import Base, engine
 from app.database.models import User, PantryItem
+from app.models.recipe_rating import RecipeRating, RecipeSimilarity
 
 def init_database():
     """Create all database tables if they don't exist"""
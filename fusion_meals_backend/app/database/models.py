@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -28,10 +28,17 @@ class User(Base):
 class PantryItem(Base):
     """Database model for pantry items"""
     __tablename__ = "pantry_items"
+    __table_args__ = (
+        # Every pantry query is per user: by normalized name, stored status or expiry date
+        Index("ix_pantry_items_user_id_name_norm", "user_id", "name_norm"),
+        Index("ix_pantry_items_user_id_status", "user_id", "status"),
+        Index("ix_pantry_items_user_id_expiry_date", "user_id", "expiry_date"),
+    )
     
     id = Column(String, primary_key=True, index=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"))
     name = Column(String, index=True)
+    name_norm = Column(String, nullable=True)  # normalize_name(name), for exact lookups
     category = Column(String, index=True)
     quantity = Column(Float, default=0)
     unit = Column(String)  # Corresponds to QuantityUnit enum
@@ -0,0 +1,5 @@
+# LLM gateway package
+from .gateway import LLMGateway, llm_gateway
+from .cache import CompletionCache, ENDPOINT_TTLS
+from .coalesce import SingleFlight, fingerprint, single_flight
+from .scheduler import LLMScheduler, PRIORITY_PREMIUM, PRIORITY_INTERACTIVE, PRIORITY_BATCH
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple
+
+logger = logging.getLogger("llm_cache")
+
+# How long a cached completion stays valid, per endpoint (seconds).
+# Only endpoints listed here are cached; everything else always hits the LLM.
+ENDPOINT_TTLS: Dict[str, int] = {
+    "ingredient_substitution": 7 * 24 * 3600,
+    "global_cuisine": 7 * 24 * 3600,
+    "recipe_scaling": 30 * 24 * 3600,
+    "recipe_analysis": 7 * 24 * 3600,
+    "grocery_parse": 24 * 3600,
+}
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+# Set LLM_CACHE_DB_PATH to enable the on-disk tier (SQLite) that survives restarts
+DEFAULT_DB_PATH = os.getenv("LLM_CACHE_DB_PATH")
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: Optional[float] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Content-address a completion request"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "response_format": response_format,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Two-tier completion cache.
+
+    Entries live in an in-memory LRU with per-entry expiry. When a database
+    path is configured, entries are also written through to SQLite and a
+    memory miss falls back to disk before counting as a miss.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, db_path: Optional[str] = DEFAULT_DB_PATH):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    # Disk tier
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT expires_at, value FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _disk_set(self, key: str, expires_at: float, value: str):
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            db.execute("DELETE FROM completions WHERE expires_at < ?", (time.time(),))
+            db.commit()
+
+    # Memory tier
+    def _remember(self, key: str, expires_at: float, value: str):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached completion or None"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return value
+            del self._entries[key]
+            self._counters["expirations"] += 1
+
+        if self.db_path:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Completion cache disk read failed: {str(e)}")
+                entry = None
+            if entry is not None and entry[0] > now:
+                self._remember(key, entry[0], entry[1])
+                self._counters["disk_hits"] += 1
+                return entry[1]
+
+        self._counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: float):
+        """Store a completion for ttl seconds"""
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, value)
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._disk_set, key, expires_at, value)
+            except sqlite3.Error as e:
+                logger.warning(f"Completion cache disk write failed: {str(e)}")
+
+    def clear(self):
+        """Drop every in-memory entry (the disk tier is left intact)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        lookups = self._counters["hits"] + self._counters["disk_hits"] + self._counters["misses"]
+        hits = self._counters["hits"] + self._counters["disk_hits"]
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_tier": bool(self.db_path),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
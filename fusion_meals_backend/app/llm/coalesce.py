@@ -0,0 +1,86 @@
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger("llm_coalesce")
+
+T = TypeVar("T")
+
+
+def fingerprint(namespace: str, request: BaseModel, *extra: Any) -> str:
+    """
+    Canonical fingerprint of a request model.
+
+    Defaults are included and keys are sorted, so two payloads that validate
+    to the same model produce the same fingerprint. Use extra for anything
+    outside the model that changes the result (e.g. the user id).
+    """
+    payload = json.dumps(
+        [request.model_dump(mode="json"), list(extra)],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class _InFlight:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one in-flight task.
+
+    The first caller starts the work; duplicates arriving before it finishes
+    await the same result (or exception). A caller that is cancelled only
+    stops waiting; the shared work is cancelled once nobody is waiting for it.
+    Results are not kept after completion - caching is the gateway's job.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, _InFlight] = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "cancelled": 0}
+
+    def _forget(self, key: str, call: _InFlight, task: "asyncio.Task"):
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() once per key among concurrent callers and share its result"""
+        call = self._inflight.get(key)
+        if call is None:
+            call = _InFlight(asyncio.ensure_future(fn()))
+            self._inflight[key] = call
+            call.task.add_done_callback(lambda task, key=key, call=call: self._forget(key, call, task))
+            self._counters["leaders"] += 1
+        else:
+            self._counters["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logger.info(f"Cancelling in-flight request {key}: no callers left")
+                self._counters["cancelled"] += 1
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing counters for monitoring"""
+        return {**self._counters, "in_flight": len(self._inflight)}
+
+
+# Shared coalescer used by the generation routers
+single_flight = SingleFlight()
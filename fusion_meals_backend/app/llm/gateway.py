@@ -0,0 +1,209 @@
+import os
+import time
+import asyncio
+import logging
+from typing import List, Dict, Optional, Any, AsyncIterator
+
+import httpx
+from openai import AsyncOpenAI, RateLimitError
+
+from .cache import CompletionCache, ENDPOINT_TTLS, make_cache_key
+from .scheduler import LLMScheduler, estimate_tokens
+
+logger = logging.getLogger("llm_gateway")
+
+# Connection pool sizing for the shared HTTP client. Every router goes through
+# the same pool, so these bound the number of sockets we hold open to OpenAI.
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+DEFAULT_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+# How long a readiness check result is reused, so frequent probes don't each hit OpenAI
+READINESS_TTL_SECONDS = float(os.getenv("LLM_READINESS_TTL_SECONDS", "30"))
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM call made by the routers.
+
+    Wraps one AsyncOpenAI client backed by a pooled httpx.AsyncClient, so
+    slow generations await on the event loop instead of blocking it.
+    The client is created lazily on first use. Completions for endpoints
+    listed in ENDPOINT_TTLS are served from a content-addressed cache;
+    everything else is admitted through the per-model scheduler.
+    """
+
+    def __init__(self, cache: Optional[CompletionCache] = None, scheduler: Optional[LLMScheduler] = None):
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.cache = cache or CompletionCache()
+        self.scheduler = scheduler or LLMScheduler()
+        self._readiness: Optional[Dict[str, Any]] = None
+        self._readiness_checked_at = 0.0
+        self._readiness_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Return the shared AsyncOpenAI client, creating it on first use"""
+        if self._client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OpenAI API key not found in environment variables")
+
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=DEFAULT_MAX_CONNECTIONS,
+                    max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+                ),
+                timeout=DEFAULT_TIMEOUT,
+            )
+            self._client = AsyncOpenAI(api_key=api_key, http_client=self._http_client)
+            logger.info("Created shared AsyncOpenAI client")
+        return self._client
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        endpoint: Optional[str] = None,
+        priority: Optional[int] = None,
+    ) -> str:
+        """
+        Run a chat completion and return the message content.
+
+        Pass endpoint to opt into caching with that endpoint's TTL, and
+        priority (see scheduler.PRIORITY_*) to override the size-based default.
+        """
+        ttl = ENDPOINT_TTLS.get(endpoint) if endpoint else None
+        cache_key = None
+        if ttl:
+            cache_key = make_cache_key(model, messages, temperature, response_format)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        kwargs: Dict[str, Any] = {"model": model, "messages": messages}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        lease = await self.scheduler.acquire(model, estimate_tokens(messages, max_tokens), priority)
+        used_tokens = None
+        try:
+            response = await self.client.chat.completions.create(**kwargs)
+            if response.usage is not None:
+                used_tokens = response.usage.total_tokens
+        except RateLimitError:
+            self.scheduler.record_rate_limited(model)
+            raise
+        finally:
+            lease.release(used_tokens)
+        content = response.choices[0].message.content or ""
+
+        if cache_key and content:
+            await self.cache.set(cache_key, content, ttl)
+        return content
+
+    async def stream_complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Run a streaming chat completion, yielding content deltas as they arrive"""
+        kwargs: Dict[str, Any] = {"model": model, "messages": messages, "stream": True}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        # The slot is held until the stream is fully consumed or abandoned
+        lease = await self.scheduler.acquire(model, estimate_tokens(messages, max_tokens), priority)
+        try:
+            try:
+                stream = await self.client.chat.completions.create(**kwargs)
+            except RateLimitError:
+                self.scheduler.record_rate_limited(model)
+                raise
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+        finally:
+            lease.release()
+
+    async def generate_image(
+        self,
+        prompt: str,
+        model: str = "dall-e-3",
+        size: str = "1024x1024",
+        quality: Optional[str] = None,
+        priority: Optional[int] = None,
+    ) -> Optional[str]:
+        """Generate a single image and return its URL"""
+        kwargs: Dict[str, Any] = {"model": model, "prompt": prompt, "size": size, "n": 1}
+        if quality is not None:
+            kwargs["quality"] = quality
+
+        lease = await self.scheduler.acquire(model, priority=priority)
+        try:
+            response = await self.client.images.generate(**kwargs)
+        except RateLimitError:
+            self.scheduler.record_rate_limited(model)
+            raise
+        finally:
+            lease.release()
+        return response.data[0].url
+
+    async def check_ready(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """
+        Check that the OpenAI API is reachable with the configured key.
+        Results are reused for READINESS_TTL_SECONDS.
+        """
+        if self._readiness_lock is None:
+            self._readiness_lock = asyncio.Lock()
+        async with self._readiness_lock:
+            if self._readiness is not None and time.monotonic() - self._readiness_checked_at < READINESS_TTL_SECONDS:
+                return self._readiness
+
+            start_time = time.monotonic()
+            try:
+                await self.client.models.list(timeout=timeout)
+                result = {"ready": True, "latency_ms": round((time.monotonic() - start_time) * 1000, 1)}
+            except Exception as e:
+                logger.warning(f"LLM readiness check failed: {str(e)}")
+                result = {"ready": False, "error": str(e)}
+
+            self._readiness = result
+            self._readiness_checked_at = time.monotonic()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Gateway metrics for monitoring"""
+        return {"cache": self.cache.stats(), "scheduler": self.scheduler.stats()}
+
+    async def aclose(self):
+        """Close the pooled HTTP connections"""
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._http_client = None
+
+
+# Shared gateway used by every router
+llm_gateway = LLMGateway()
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from typing import List, Dict, Optional, Any, NamedTuple
+
+logger = logging.getLogger("llm_scheduler")
+
+# Lower value is served first
+PRIORITY_PREMIUM = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_PREMIUM: "premium", PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# Requests estimated above this many tokens are scheduled as batch work
+# unless the caller passes an explicit priority
+BATCH_TOKEN_THRESHOLD = int(os.getenv("LLM_BATCH_TOKEN_THRESHOLD", "3000"))
+# Assumed completion length when the caller doesn't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+class ModelLimits(NamedTuple):
+    concurrency: int
+    rpm: int
+    tpm: Optional[int]  # None for image models
+
+
+# Defaults sized for a mid-tier OpenAI account. Override per model with
+# LLM_MODEL_LIMITS='{"gpt-4": {"concurrency": 4, "rpm": 200, "tpm": 20000}}'
+MODEL_LIMITS: Dict[str, ModelLimits] = {
+    "gpt-4": ModelLimits(concurrency=8, rpm=500, tpm=40_000),
+    "gpt-4-turbo": ModelLimits(concurrency=16, rpm=500, tpm=150_000),
+    "gpt-3.5-turbo": ModelLimits(concurrency=32, rpm=3500, tpm=200_000),
+    "dall-e-3": ModelLimits(concurrency=4, rpm=50, tpm=None),
+    "dall-e-2": ModelLimits(concurrency=4, rpm=50, tpm=None),
+}
+DEFAULT_LIMITS = ModelLimits(concurrency=16, rpm=500, tpm=150_000)
+
+for _model, _overrides in json.loads(os.getenv("LLM_MODEL_LIMITS", "{}")).items():
+    MODEL_LIMITS[_model] = MODEL_LIMITS.get(_model, DEFAULT_LIMITS)._replace(**_overrides)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> int:
+    """Rough prompt + completion token estimate (~4 characters per token)"""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (0 if it is now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    def __init__(self, priority: int, tokens: int, future: "asyncio.Future"):
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class Lease:
+    """A granted slot; pass the actual token usage back through release()"""
+
+    def __init__(self, queue: "_ModelQueue", tokens: int):
+        self._queue = queue
+        self.tokens = tokens
+        self._released = False
+
+    def release(self, used_tokens: Optional[int] = None):
+        if not self._released:
+            self._released = True
+            self._queue.release(self, used_tokens)
+
+
+class _ModelQueue:
+    """Priority queue, concurrency cap and rate buckets for one model"""
+
+    def __init__(self, model: str, limits: ModelLimits):
+        self.model = model
+        self.limits = limits
+        self.requests = TokenBucket(limits.rpm)
+        self.tokens = TokenBucket(limits.tpm) if limits.tpm else None
+        self.active = 0
+        self._heap: List[Any] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.metrics: Dict[str, Any] = {
+            "granted": 0,
+            "cancelled": 0,
+            "rate_limited": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "waits_by_priority": {name: {"granted": 0, "wait_seconds_total": 0.0} for name in PRIORITY_NAMES.values()},
+        }
+
+    def enqueue(self, waiter: _Waiter):
+        heapq.heappush(self._heap, (waiter.priority, next(self._sequence), waiter))
+        self.dispatch()
+
+    def dispatch(self):
+        """Grant slots to queued waiters in priority order while limits allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._heap and self.active < self.limits.concurrency:
+            waiter = self._heap[0][2]
+            if waiter.future.done():  # cancelled while queued
+                heapq.heappop(self._heap)
+                continue
+
+            wait = self.requests.wait_time(1)
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(waiter.tokens))
+            if wait > 0:
+                # Hold the line for the highest priority waiter until the buckets refill
+                self._timer = asyncio.get_running_loop().call_later(wait, self.dispatch)
+                return
+
+            heapq.heappop(self._heap)
+            self.requests.consume(1)
+            if self.tokens is not None:
+                self.tokens.consume(waiter.tokens)
+            self.active += 1
+            self._record_grant(waiter)
+            waiter.future.set_result(Lease(self, waiter.tokens))
+
+    def release(self, lease: Lease, used_tokens: Optional[int]):
+        self.active -= 1
+        if self.tokens is not None and used_tokens is not None:
+            # Settle the estimate against the reported usage
+            difference = lease.tokens - used_tokens
+            if difference > 0:
+                self.tokens.refund(difference)
+            else:
+                self.tokens.consume(-difference)
+        self.dispatch()
+
+    def _record_grant(self, waiter: _Waiter):
+        waited = time.monotonic() - waiter.enqueued_at
+        self.metrics["granted"] += 1
+        self.metrics["wait_seconds_total"] += waited
+        self.metrics["wait_seconds_max"] = max(self.metrics["wait_seconds_max"], waited)
+        by_priority = self.metrics["waits_by_priority"][PRIORITY_NAMES[waiter.priority]]
+        by_priority["granted"] += 1
+        by_priority["wait_seconds_total"] += waited
+
+    def stats(self) -> Dict[str, Any]:
+        granted = self.metrics["granted"]
+        return {
+            "queue_depth": sum(1 for _, _, waiter in self._heap if not waiter.future.done()),
+            "active": self.active,
+            "concurrency_limit": self.limits.concurrency,
+            "rpm_limit": self.limits.rpm,
+            "tpm_limit": self.limits.tpm,
+            **{key: value for key, value in self.metrics.items() if key != "wait_seconds_total"},
+            "wait_seconds_avg": round(self.metrics["wait_seconds_total"] / granted, 4) if granted else 0.0,
+            "wait_seconds_max": round(self.metrics["wait_seconds_max"], 4),
+        }
+
+
+class LLMScheduler:
+    """
+    Admission control for outgoing LLM calls.
+
+    Each model gets a concurrency cap plus requests/minute and tokens/minute
+    buckets. Callers wait in a per-model priority queue, so premium and
+    short interactive requests are admitted ahead of long batch generations
+    when the provider limits are the bottleneck.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, ModelLimits]] = None):
+        self.limits = limits if limits is not None else MODEL_LIMITS
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    def _queue_for(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = _ModelQueue(model, self.limits.get(model, DEFAULT_LIMITS))
+            self._queues[model] = queue
+        return queue
+
+    @staticmethod
+    def classify(tokens: int) -> int:
+        """Default priority for a request of this (estimated) size"""
+        return PRIORITY_BATCH if tokens > BATCH_TOKEN_THRESHOLD else PRIORITY_INTERACTIVE
+
+    async def acquire(self, model: str, tokens: int = 0, priority: Optional[int] = None) -> Lease:
+        """Wait for a slot on model; release the returned lease when the call finishes"""
+        if priority is None:
+            priority = self.classify(tokens)
+        elif priority not in PRIORITY_NAMES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {sorted(PRIORITY_NAMES)}")
+        queue = self._queue_for(model)
+        waiter = _Waiter(priority, tokens, asyncio.get_running_loop().create_future())
+        queue.enqueue(waiter)
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we were cancelled - hand the slot back
+                waiter.future.result().release(0)
+            queue.metrics["cancelled"] += 1
+            queue.dispatch()
+            raise
+
+    def record_rate_limited(self, model: str):
+        """Count a provider 429 that got through despite the local limits"""
+        self._queue_for(model).metrics["rate_limited"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model queue depth, wait times and limit counters"""
+        return {model: queue.stats() for model, queue in self._queues.items()}
@@ -1,10 +1,36 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables once, before any module reads its configuration
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import fusion_recipe, meal_plan, email, grocery, ingredient_substitution, recipe_scaling, recipe_analysis, recipe_sharing, ai_chef, global_cuisine, meal_prep, pantry
-import os
+from fastapi.responses import JSONResponse
+from app.routers import fusion_recipe, meal_plan, email, grocery, ingredient_substitution, recipe_scaling, recipe_analysis, recipe_sharing, ai_chef, global_cuisine, meal_prep, pantry, images, recipe_ratings
+from app.llm import llm_gateway, single_flight
+from app.services.image_jobs import image_jobs
+from app.services.image_store import image_store
+from app.services.recipe_of_the_day import recipe_of_the_day
+from app.services.amazon_service import amazon_client
+from app.database.database import async_engine
 
 app = FastAPI()
 
+# Generate the recipe of the day in the background and keep it refreshed
+@app.on_event("startup")
+async def start_recipe_of_the_day():
+    recipe_of_the_day.start()
+
+# Release the pooled LLM connections when the worker stops
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    await recipe_of_the_day.stop()
+    await llm_gateway.aclose()
+    await image_store.aclose()
+    await amazon_client.aclose()
+    await async_engine.dispose()
+
 # Add a root endpoint for health checks and debugging
 @app.get("/")
 async def root():
@@ -22,10 +48,26 @@ async def root():
             "/recipe-sharing",
             "/ai-chef",
             "/global-cuisine",
-            "/meal-prep"
+            "/meal-prep",
+            "/images"
         ]
     }
 
+# Readiness probe: checks the LLM gateway without blocking worker startup
+@app.get("/ready")
+async def ready():
+    llm = await llm_gateway.check_ready()
+    status_code = 200 if llm["ready"] else 503
+    return JSONResponse(
+        status_code=status_code,
+        content={"status": "ready" if llm["ready"] else "not_ready", "checks": {"llm_gateway": llm}}
+    )
+
+# LLM gateway metrics (completion cache, scheduler queues and request coalescing counters)
+@app.get("/llm/stats")
+async def llm_stats():
+    return {**llm_gateway.stats(), "single_flight": single_flight.stats(), "image_jobs": image_jobs.stats(), "image_store": image_store.stats(), "amazon_search": amazon_client.search_stats()}
+
 # Get allowed origins from environment or use defaults
 allowed_origins = os.environ.get(
     "ALLOWED_ORIGINS", 
@@ -85,3 +127,5 @@ app.include_router(ai_chef.router, prefix="/ai-chef", tags=["AI Personal Chef"])
 app.include_router(global_cuisine.router, prefix="/global-cuisine", tags=["Global Cuisine Explorer"])
 app.include_router(meal_prep.router, prefix="/meal-prep", tags=["Smart Meal Prep Assistant"])
 app.include_router(pantry.router, prefix="/pantry", tags=["Smart Pantry Management"])
+app.include_router(recipe_ratings.router, prefix="/recipe-ratings", tags=["Recipe Ratings"])
+app.include_router(images.router, prefix="/images", tags=["Images"])
@@ -98,4 +98,34 @@ class RecipeIngredientCheckResponse(BaseModel):
     can_make_recipe: bool
     missing_ingredients: List[MissingIngredientData] = []
     insufficient_ingredients: List[MissingIngredientData] = []
-    available_ingredients: List[PantryItem] = [] 
\ No newline at end of file
+    available_ingredients: List[PantryItem] = [] 
+
+
+class RecipeIngredients(BaseModel):
+    name: Optional[str] = None  # Used to label results; defaults to "Recipe <n>"
+    ingredients: List[Dict[str, str]]  # Same format as RecipeIngredientCheckRequest.recipe_ingredients
+
+
+class MultiRecipeCheckRequest(BaseModel):
+    user_id: Optional[str] = None
+    recipes: List[RecipeIngredients]
+
+
+class RecipeCheckResult(RecipeIngredientCheckResponse):
+    recipe: str
+
+
+class IngredientShortfall(BaseModel):
+    name: str
+    unit: QuantityUnit
+    count_label: Optional[str] = None  # What a count counts ("clove", "head"), when it says
+    required_quantity: float  # Across all recipes
+    available_quantity: float
+    shortfall_quantity: float
+    recipes: List[str] = []
+
+
+class MultiRecipeCheckResponse(BaseModel):
+    can_make_all: bool
+    recipes: List[RecipeCheckResult] = []
+    shortfall: List[IngredientShortfall] = []  # What to buy to make every recipe
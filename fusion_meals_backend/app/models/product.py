@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class AmazonProduct(BaseModel):
+    asin: str
+    title: str 
+    price: float
+    image_url: str
+    detail_url: str
+    availability: str
+    quantity_options: List[int] = [1, 2, 3, 4, 5]
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
 from sqlalchemy.sql import func
-from ..database import Base
+from ..database.database import Base
 
 class RecipeRating(Base):
     __tablename__ = "recipe_ratings"
@@ -2,20 +2,13 @@ from fastapi import APIRouter, HTTPException, Depends, Cookie
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway, single_flight, fingerprint, PRIORITY_PREMIUM
+from app.services.meal_plan_fanout import fan_out, merge_weekly_meal_plan, WEEK_DAYS
 import json
 import time
 import random
 from datetime import datetime, timedelta
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 # Mock premium user database
@@ -117,14 +110,23 @@ async def ai_personal_chef(req: AIChefRequest, user_data: Optional[Dict] = Depen
             "upgrade_url": "/subscription/upgrade"
         })
     
+    # Identical concurrent requests from the same user share one generation
+    return await single_flight.run(
+        fingerprint("ai-chef/premium/ai-chef", req, user_data["user_id"], user_data["subscription"]),
+        lambda: _generate_ai_chef_content(req, user_data)
+    )
+
+AI_CHEF_SYSTEM_PROMPT = "You are an AI Personal Chef assistant that creates premium culinary content for paying subscribers. Provide detailed, personalized responses in JSON format."
+
+async def _generate_ai_chef_content(req: AIChefRequest, user_data: Dict) -> Dict[str, Any]:
     # Get user preferences
     user_preferences = user_data["subscription"].get("preferences", {})
     
     # Prepare prompt based on request type
     if req.request_type == "meal_plan":
-        # Optimize meal plan generation for different timeframes
+        # Weekly plans are generated one day at a time (see _generate_weekly_meal_plan)
         if req.timeframe == "week":
-            prompt = generate_optimized_weekly_meal_plan_prompt(req, user_preferences)
+            prompt = None
         else:
             prompt = generate_meal_plan_prompt(req, user_preferences)
     elif req.request_type == "cooking_guidance":
@@ -141,25 +143,23 @@ async def ai_personal_chef(req: AIChefRequest, user_data: Optional[Dict] = Depen
         raise HTTPException(status_code=400, detail="Invalid request type")
     
     try:
-        # Set timeout parameters based on request complexity
-        timeout = 60  # Default 60 seconds
-        if req.request_type == "meal_plan" and req.timeframe == "week":
-            timeout = 120  # 2 minutes for weekly meal plans
-        
-        # Call OpenAI API with increased timeout
         start_time = time.time()
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            response_format={"type": "json_object"},
-            timeout=timeout,
-            messages=[
-                {"role": "system", "content": "You are an AI Personal Chef assistant that creates premium culinary content for paying subscribers. Provide detailed, personalized responses in JSON format."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        # Parse response
-        response_content = json.loads(response.choices[0].message.content)
+        if prompt is None:
+            response_content = await _generate_weekly_meal_plan(req, user_preferences)
+        else:
+            content = await llm_gateway.complete(
+                model="gpt-4-turbo",
+                priority=PRIORITY_PREMIUM,
+                response_format={"type": "json_object"},
+                timeout=60,
+                messages=[
+                    {"role": "system", "content": AI_CHEF_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            
+            # Parse response
+            response_content = json.loads(content)
         print(f"OpenAI API request completed in {time.time() - start_time:.2f} seconds")
         
         # Post-process the response based on request type
@@ -346,8 +346,9 @@ async def analyze_single_day_micronutrients(
         timeout = 30  # 30 seconds should be plenty for single-day analysis
         
         start_time = time.time()
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-4-turbo",
+            priority=PRIORITY_PREMIUM,
             response_format={"type": "json_object"},
             timeout=timeout,
             messages=[
@@ -357,7 +358,7 @@ async def analyze_single_day_micronutrients(
         )
         
         # Parse response
-        response_content = json.loads(response.choices[0].message.content)
+        response_content = json.loads(content)
         print(f"Micronutrient analysis completed in {time.time() - start_time:.2f} seconds")
         
         # Ensure proper formatting for micronutrients
@@ -767,9 +768,58 @@ def get_personalized_suggestions(request_type: str, user_preferences: Dict) -> L
     
     return suggestions
 
-def generate_optimized_weekly_meal_plan_prompt(req: AIChefRequest, user_preferences: Dict) -> str:
-    """Generate a more efficient prompt for weekly meal planning to avoid timeouts"""
-    cuisine_prefs = ", ".join(user_preferences.get("cuisine_preferences", []))
+# Main protein for each day of the week, so independent day generations don't repeat dinners
+WEEKLY_PROTEIN_ROTATION = ["chicken", "fish", "legumes", "beef or lamb", "eggs", "tofu or tempeh", "seafood"]
+
+async def _generate_weekly_meal_plan(req: AIChefRequest, user_preferences: Dict) -> Dict[str, Any]:
+    """
+    Generate a weekly meal plan as seven concurrent single-day generations.
+
+    Each day gets its own focus cuisine and protein so the days stay varied
+    without seeing each other; the results are merged and the weekly
+    nutrition summary is recomputed locally from the per-day numbers.
+    """
+    cuisines = user_preferences.get("cuisine_preferences") or [req.cuisine_type or "varied"]
+
+    def day_job(index: int, day_name: str):
+        prompt = generate_weekly_meal_plan_day_prompt(
+            req,
+            user_preferences,
+            day_name,
+            focus_cuisine=cuisines[index % len(cuisines)],
+            focus_protein=WEEKLY_PROTEIN_ROTATION[index % len(WEEKLY_PROTEIN_ROTATION)]
+        )
+
+        async def job() -> Dict[str, Any]:
+            content = await llm_gateway.complete(
+                model="gpt-4-turbo",
+                priority=PRIORITY_PREMIUM,
+                response_format={"type": "json_object"},
+                timeout=45,
+                messages=[
+                    {"role": "system", "content": AI_CHEF_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            result = json.loads(content)
+            # The model sometimes returns "day" as just the day's name
+            day = result.get("day")
+            result["day"] = {**(day if isinstance(day, dict) else {}), "day": day_name}
+            return result
+
+        return job
+
+    day_results = await fan_out([day_job(i, day) for i, day in enumerate(WEEK_DAYS)])
+    return merge_weekly_meal_plan(day_results)
+
+def generate_weekly_meal_plan_day_prompt(
+    req: AIChefRequest,
+    user_preferences: Dict,
+    day_name: str,
+    focus_cuisine: str,
+    focus_protein: str
+) -> str:
+    """Generate the prompt for one day of a weekly meal plan"""
     dietary = ", ".join(user_preferences.get("dietary_restrictions", []))
     household = user_preferences.get("household_size", 1)
     favorites = ", ".join(user_preferences.get("favorite_ingredients", []))
@@ -778,10 +828,11 @@ def generate_optimized_weekly_meal_plan_prompt(req: AIChefRequest, user_preferen
     budget = req.budget_level or "moderate"
     
     prompt = f"""
-    Create a simplified but premium personalized weekly meal plan with a {budget} budget.
+    Create {day_name}'s meals for a premium personalized weekly meal plan with a {budget} budget.
     
     User preferences:
-    - Cuisine preferences: {cuisine_prefs}
+    - Focus cuisine for {day_name}: {focus_cuisine}
+    - Main protein for {day_name}'s dinner: {focus_protein} (adapt to dietary restrictions)
     - Dietary restrictions: {dietary}
     - Household size: {household}
     - Favorite ingredients: {favorites}
@@ -789,67 +840,34 @@ def generate_optimized_weekly_meal_plan_prompt(req: AIChefRequest, user_preferen
     
     {f"Special occasion: {req.occasion}" if req.occasion else ""}
     
-    Provide a simplified 7-day meal plan with:
-    1. Daily meals (breakfast, lunch, dinner, snacks - keep descriptions brief)
-    2. Basic grocery list
-    3. Brief prep instructions
-    4. Estimated costs 
-    5. Brief nutritional information with micronutrients
-    
-    Focus on efficiency and brevity while maintaining quality.
+    Keep descriptions brief. Give nutrition per person for the whole day as plain numbers,
+    and micronutrients as a percentage of daily value.
     
     Return as a JSON object with the following structure:
     {{
-      "meal_plan": {{
-        "days": [
-          {{
-            "day": "Monday",
-            "breakfast": {{ "name": "", "description": "", "time_to_prepare": "", "calories": "" }},
-            "lunch": {{ "name": "", "description": "", "time_to_prepare": "", "calories": "" }},
-            "dinner": {{ "name": "", "description": "", "time_to_prepare": "", "calories": "", "wine_pairing": "" }},
-            "snacks": [{{ "name": "", "description": "", "calories": "" }}]
-          }}
-          // repeat for each day
-        ]
+      "day": {{
+        "day": "{day_name}",
+        "breakfast": {{ "name": "", "description": "", "time_to_prepare": "", "calories": "" }},
+        "lunch": {{ "name": "", "description": "", "time_to_prepare": "", "calories": "" }},
+        "dinner": {{ "name": "", "description": "", "time_to_prepare": "", "calories": "", "wine_pairing": "" }},
+        "snacks": [{{ "name": "", "description": "", "calories": "" }}]
       }},
-      "grocery_list": {{
+      "grocery_items": {{
         "produce": [""],
         "protein": [""],
         "dairy": [""],
         "grains": [""],
         "other": [""]
       }},
-      "meal_prep_guide": {{"day": "", "instructions": [""], "storage_tips": [""]}},
-      "estimated_total_cost": "",
-      "nutrition_summary": {{ 
-        "average_daily_calories": "", 
-        "protein_ratio": "", 
-        "carb_ratio": "", 
-        "fat_ratio": "",
-        "daily_macros": {{
-          "calories_breakdown": {{
-            "breakfast": "",
-            "lunch": "",
-            "dinner": "",
-            "snacks": ""
-          }},
-          "protein": {{
-            "grams": "",
-            "sources": [""]
-          }},
-          "carbohydrates": {{
-            "grams": "",
-            "sources": [""]
-          }},
-          "fats": {{
-            "grams": "",
-            "sources": [""]
-          }},
-          "fiber": {{
-            "grams": "",
-            "sources": [""]
-          }}
-        }},
+      "prep_ahead": [""],
+      "storage_tips": [""],
+      "estimated_cost": "",
+      "nutrition": {{
+        "calories": "",
+        "protein": {{ "grams": "", "sources": [""] }},
+        "carbohydrates": {{ "grams": "", "sources": [""] }},
+        "fats": {{ "grams": "", "sources": [""] }},
+        "fiber": {{ "grams": "", "sources": [""] }},
         "micronutrients": {{
           "vitamin_a": "",
           "vitamin_c": "",
@@ -2,12 +2,8 @@ from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
-from dotenv import load_dotenv
 import os
 
-# ✅ Load environment variables
-load_dotenv()
-
 router = APIRouter()
 
 class EmailRequest(BaseModel):
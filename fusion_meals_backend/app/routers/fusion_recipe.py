@@ -1,32 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-from typing import Optional, List
+import json
+import asyncio
+from contextlib import aclosing
+from typing import Optional, List, AsyncIterator
 from datetime import datetime
-import random
-
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-print(f"API Key found: {'Yes' if api_key else 'No'}")
-print(f"API Key starts with: {api_key[:10]}..." if api_key else "No API key")
-
-try:
-    client = OpenAI(api_key=api_key)
-    # Test the API key with a simple completion
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": "Say hello"}],
-        max_tokens=5
-    )
-    print("OpenAI API test succeeded")
-except Exception as e:
-    print(f"OpenAI API initialization error: {str(e)}")
-    raise ValueError(f"❌ Error initializing OpenAI client: {str(e)}")
+
+from app.llm import llm_gateway, single_flight, fingerprint, PRIORITY_PREMIUM
+from app.services.image_jobs import image_jobs
+from app.services.image_store import image_store, image_key
+from app.services.recipe_of_the_day import recipe_of_the_day, seconds_until_midnight
+from app.utils import etag_matches
 
 router = APIRouter()
 
@@ -38,7 +23,9 @@ async def get_recipes_info():
         "message": "Welcome to the Fusion Meals Recipe API",
         "endpoints": {
             "POST /generate": "Generate a fusion recipe",
-            "GET /recipe-of-the-day": "Get a random recipe of the day"
+            "POST /generate/stream": "Stream a fusion recipe as Server-Sent Events",
+            "GET /images/{job_id}": "Poll a background recipe image job",
+            "GET /recipe-of-the-day": "Get the recipe of the day"
         }
     }
 
@@ -54,6 +41,8 @@ class RecipeRequest(BaseModel):
 class RecipeResponse(BaseModel):
     recipe: str
     image_url: str | None = None
+    image_status: Optional[str] = None  # pending, ready or failed
+    image_job_id: Optional[str] = None
     nutritional_analysis: Optional[dict] = None
     cooking_tips: Optional[List[str]] = None
     wine_pairing: Optional[str] = None
@@ -62,9 +51,12 @@ class RecipeResponse(BaseModel):
 class RecipeOfTheDayResponse(BaseModel):
     recipe: str
     image_url: str | None = None
+    image_status: Optional[str] = None
+    image_job_id: Optional[str] = None
     title: str
     description: str
     cuisines: List[str]
+    date: Optional[str] = None
 
 # Dietary preference descriptions
 diet_instructions = {
@@ -78,20 +70,6 @@ diet_instructions = {
     "None": "No dietary restrictions."
 }
 
-# List of popular cuisine combinations for Recipe of the Day
-popular_cuisine_combos = [
-    ("Italian", "Japanese"),
-    ("Mexican", "Thai"),
-    ("Indian", "Mediterranean"),
-    ("Chinese", "French"),
-    ("Korean", "American"),
-    ("Lebanese", "Brazilian"),
-    ("Vietnamese", "Spanish"),
-    ("Greek", "Japanese"),
-    ("Moroccan", "Chinese"),
-    ("Ethiopian", "Italian")
-]
-
 @router.options("/generate")
 async def options_generate_fusion_recipe():
     """
@@ -100,252 +78,286 @@ async def options_generate_fusion_recipe():
     """
     return {}  # Return empty response with 200 status
 
-@router.post("/generate", response_model=RecipeResponse)
-async def generate_fusion_recipe(req: RecipeRequest):
-    try:
-        print(f"Recipe request received: {req}")
-        diet_instruction = diet_instructions.get(req.dietary_preference, "No dietary restrictions.")
-        
-        # Base prompt for all recipes
-        base_prompt = f"""
-        You are an AI chef specializing in fusion cuisine.
+def build_recipe_prompt(req: RecipeRequest) -> str:
+    """Build the markdown recipe prompt, including premium sections if requested"""
+    diet_instruction = diet_instructions.get(req.dietary_preference, "No dietary restrictions.")
+    
+    # Base prompt for all recipes
+    base_prompt = f"""
+    You are an AI chef specializing in fusion cuisine.
 
-        User has requested a fusion dish combining **{req.cuisine1} and {req.cuisine2}** cuisine.
-        Available ingredients: {req.ingredients}.
-        Serving size: {req.serving_size} people
-        Cooking skill level: {req.cooking_skill}
+    User has requested a fusion dish combining **{req.cuisine1} and {req.cuisine2}** cuisine.
+    Available ingredients: {req.ingredients}.
+    Serving size: {req.serving_size} people
+    Cooking skill level: {req.cooking_skill}
 
-        **Dietary Preference:** {diet_instruction}
+    **Dietary Preference:** {diet_instruction}
 
-        Generate the recipe in the following **markdown-formatted style**:
+    Generate the recipe in the following **markdown-formatted style**:
 
-        🍴 **Recipe Name**: [Recipe Name Here]
+    🍴 **Recipe Name**: [Recipe Name Here]
 
-        🛒 **Ingredients**:
-        - **Vegetables**: [List each vegetable as a bullet point]
-        - **Proteins**: [List each protein item]
-        - **Spices & Other**: [List spices and other ingredients]
+    🛒 **Ingredients**:
+    - **Vegetables**: [List each vegetable as a bullet point]
+    - **Proteins**: [List each protein item]
+    - **Spices & Other**: [List spices and other ingredients]
 
-        👩‍🍳 **Instructions**:
-        1. [Step 1 instructions]
-        2. [Step 2 instructions]
-        3. [Step 3 instructions]
+    👩‍🍳 **Instructions**:
+    1. [Step 1 instructions]
+    2. [Step 2 instructions]
+    3. [Step 3 instructions]
 
-        ⏰ **Cooking Time**: [Time in hours and minutes]
+    ⏰ **Cooking Time**: [Time in hours and minutes]
 
-        🔥 **Calories per Serving**: [Calories per serving]
+    🔥 **Calories per Serving**: [Calories per serving]
 
-        💪 **Macronutrients**:
-        - Protein: [Xg]
-        - Carbs: [Xg]
-        - Fats: [Xg]
+    💪 **Macronutrients**:
+    - Protein: [Xg]
+    - Carbs: [Xg]
+    - Fats: [Xg]
 
-        🏅 **Health Score**: [Health Score A/B/C]
+    🏅 **Health Score**: [Health Score A/B/C]
+    """
+
+    # Add premium features if requested
+    if req.is_premium:
+        base_prompt += """
+        🍷 **Wine Pairing**: [Suggest appropriate wine pairing]
+        
+        📊 **Detailed Nutritional Analysis**:
+        - Calories: [X] kcal
+        - Protein: [X]g ([X]% of daily value)
+        - Carbs: [X]g ([X]% of daily value)
+        - Fats: [X]g ([X]% of daily value)
+        - Fiber: [X]g
+        - Sugar: [X]g
+        - Sodium: [X]mg
+        
+        💡 **Cooking Tips**:
+        1. [Tip 1]
+        2. [Tip 2]
+        3. [Tip 3]
+        
+        📦 **Storage Instructions**:
+        [How to store leftovers and for how long]
         """
+    return base_prompt
+
+def extract_recipe_name(recipe_text: str) -> str:
+    """Extract the recipe name from generated markdown"""
+    if "**Recipe Name**:" in recipe_text:
+        return recipe_text.split("**Recipe Name**:")[1].split("\n")[0].strip()
+    return "Fusion Cuisine Dish"
+
+def parse_premium_sections(recipe_text: str) -> dict:
+    """Parse the premium sections out of generated markdown"""
+    nutritional_analysis = None
+    cooking_tips = None
+    wine_pairing = None
+    storage_instructions = None
+
+    # Extract nutritional analysis
+    if "**Detailed Nutritional Analysis**:" in recipe_text:
+        nutrition_section = recipe_text.split("**Detailed Nutritional Analysis**:")[1].split("**")[0].strip()
+        nutritional_analysis = {}
+        for line in nutrition_section.split('\n'):
+            if line.strip().startswith('-') and ':' in line:
+                key, value = line.replace('-', '').strip().split(':', 1)
+                nutritional_analysis[key.strip()] = value.strip()
+
+    # Extract cooking tips
+    if "**Cooking Tips**:" in recipe_text:
+        tips_section = recipe_text.split("**Cooking Tips**:")[1].split("**")[0].strip()
+        cooking_tips = [tip.strip().replace('-', '').strip() for tip in tips_section.split('\n') if tip.strip().startswith('-')]
+
+    # Extract wine pairing
+    if "**Wine Pairing**:" in recipe_text:
+        wine_pairing = recipe_text.split("**Wine Pairing**:")[1].split("**")[0].strip()
+
+    # Extract storage instructions
+    if "**Storage Instructions**:" in recipe_text:
+        storage_instructions = recipe_text.split("**Storage Instructions**:")[1].split("**")[0].strip()
 
-        # Add premium features if requested
-        if req.is_premium:
-            base_prompt += """
-            🍷 **Wine Pairing**: [Suggest appropriate wine pairing]
-            
-            📊 **Detailed Nutritional Analysis**:
-            - Calories: [X] kcal
-            - Protein: [X]g ([X]% of daily value)
-            - Carbs: [X]g ([X]% of daily value)
-            - Fats: [X]g ([X]% of daily value)
-            - Fiber: [X]g
-            - Sugar: [X]g
-            - Sodium: [X]mg
-            
-            💡 **Cooking Tips**:
-            1. [Tip 1]
-            2. [Tip 2]
-            3. [Tip 3]
-            
-            📦 **Storage Instructions**:
-            [How to store leftovers and for how long]
-            """
+    return {
+        "nutritional_analysis": nutritional_analysis,
+        "cooking_tips": cooking_tips,
+        "wine_pairing": wine_pairing,
+        "storage_instructions": storage_instructions
+    }
+
+def recipe_image_key(recipe_name: str, req: RecipeRequest) -> str:
+    """Image store key for a generated recipe's DALL-E 3 image"""
+    return image_key(recipe_name, req.cuisine1, req.cuisine2, "dall-e-3-1024")
+
+async def generate_recipe_image(recipe_name: str, req: RecipeRequest) -> Optional[str]:
+    """
+    Return an image URL for the recipe, returning None on failure.
+    Reuses the stored image when this recipe was illustrated before.
+    """
+    image_prompt = f"Professional food photography of {recipe_name}, {req.cuisine1} and {req.cuisine2} fusion cuisine, high quality, appetizing, well-lit, restaurant quality, 4k, detailed"
+    
+    try:
+        return await image_store.get_or_create(
+            recipe_image_key(recipe_name, req),
+            lambda: llm_gateway.generate_image(
+                prompt=image_prompt,
+                model="dall-e-3",
+                size="1024x1024",
+                quality="standard",
+            )
+        )
+    except Exception as e:
+        print(f"Image generation error: {str(e)}")
+        return None
+
+@router.post("/generate", response_model=RecipeResponse)
+async def generate_fusion_recipe(req: RecipeRequest):
+    # Identical concurrent requests (e.g. a shared recipe link) share one generation
+    return await single_flight.run(
+        fingerprint("recipes/generate", req),
+        lambda: _generate_fusion_recipe(req)
+    )
+
+async def _generate_fusion_recipe(req: RecipeRequest):
+    try:
+        print(f"Recipe request received: {req}")
+        base_prompt = build_recipe_prompt(req)
 
         # Generate recipe text
-        response = client.chat.completions.create(
+        recipe_text = await llm_gateway.complete(
             model="gpt-4",
             messages=[{"role": "user", "content": base_prompt}],
-            temperature=0.7
+            temperature=0.7,
+            priority=PRIORITY_PREMIUM if req.is_premium else None
         )
-
-        recipe_text = response.choices[0].message.content.strip()
+        recipe_text = recipe_text.strip()
 
         if not recipe_text or "recipe not found" in recipe_text.lower():
             return {"recipe": "⚠️ AI couldn't generate a recipe. Try modifying the ingredients!", "image_url": None}
 
-        # Extract recipe name for image generation
-        recipe_name = recipe_text.split("**Recipe Name**:")[1].split("\n")[0].strip() if "**Recipe Name**:" in recipe_text else "Fusion Cuisine Dish"
-        
-        # Generate image using DALL-E
-        image_prompt = f"Professional food photography of {recipe_name}, {req.cuisine1} and {req.cuisine2} fusion cuisine, high quality, appetizing, well-lit, restaurant quality, 4k, detailed"
-        
-        try:
-            image_response = client.images.generate(
-                model="dall-e-3",
-                prompt=image_prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
-            image_url = image_response.data[0].url
-        except Exception as e:
-            print(f"Image generation error: {str(e)}")
-            image_url = None
-
         # Parse premium features if available
-        nutritional_analysis = None
-        cooking_tips = None
-        wine_pairing = None
-        storage_instructions = None
-
-        if req.is_premium:
-            # Extract nutritional analysis
-            if "**Detailed Nutritional Analysis**:" in recipe_text:
-                nutrition_section = recipe_text.split("**Detailed Nutritional Analysis**:")[1].split("**")[0].strip()
-                nutritional_analysis = {}
-                for line in nutrition_section.split('\n'):
-                    if line.strip().startswith('-'):
-                        key, value = line.replace('-', '').strip().split(':', 1)
-                        nutritional_analysis[key.strip()] = value.strip()
-
-            # Extract cooking tips
-            if "**Cooking Tips**:" in recipe_text:
-                tips_section = recipe_text.split("**Cooking Tips**:")[1].split("**")[0].strip()
-                cooking_tips = [tip.strip().replace('-', '').strip() for tip in tips_section.split('\n') if tip.strip().startswith('-')]
-
-            # Extract wine pairing
-            if "**Wine Pairing**:" in recipe_text:
-                wine_section = recipe_text.split("**Wine Pairing**:")[1].split("**")[0].strip()
-                wine_pairing = wine_section
-
-            # Extract storage instructions
-            if "**Storage Instructions**:" in recipe_text:
-                storage_section = recipe_text.split("**Storage Instructions**:")[1].split("**")[0].strip()
-                storage_instructions = storage_section
+        premium_sections = parse_premium_sections(recipe_text) if req.is_premium else {}
+
+        # Serve a stored image straight away; otherwise generate it in the
+        # background and let clients poll /recipes/images/{job_id}
+        recipe_name = extract_recipe_name(recipe_text)
+        image_url = image_store.lookup(recipe_image_key(recipe_name, req))
+        if image_url:
+            return {
+                "recipe": recipe_text,
+                "image_url": image_url,
+                "image_status": "ready",
+                **premium_sections
+            }
+        image_job = image_jobs.submit(lambda: generate_recipe_image(recipe_name, req))
 
         return {
             "recipe": recipe_text,
-            "image_url": image_url,
-            "nutritional_analysis": nutritional_analysis,
-            "cooking_tips": cooking_tips,
-            "wine_pairing": wine_pairing,
-            "storage_instructions": storage_instructions
+            "image_url": None,
+            "image_status": image_job.status,
+            "image_job_id": image_job.job_id,
+            **premium_sections
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"❌ Error: {str(e)}")
 
-@router.get("/recipe-of-the-day", response_model=RecipeOfTheDayResponse)
-async def get_recipe_of_the_day():
+def format_sse(event: str, data: dict) -> str:
+    """Serialize one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/generate/stream")
+async def stream_fusion_recipe(req: RecipeRequest):
     """
-    Generates a special 'Recipe of the Day' with a random cuisine fusion combination.
-    This endpoint doesn't require specific ingredients, as it's meant to inspire users.
+    Stream a fusion recipe as Server-Sent Events.
+
+    Events, in order:
+    - token: {"text": ...} for each chunk of recipe markdown as it is generated
+    - recipe: {"recipe": ...} with the complete recipe text
+    - nutritional_analysis / cooking_tips / wine_pairing / storage_instructions:
+      the parsed premium sections (premium requests only)
+    - image: {"image_url": ...} once the DALL-E image resolves
+    - done: {} when the stream is complete, or error: {"detail": ...} on failure
     """
+    return StreamingResponse(
+        _recipe_event_stream(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _recipe_event_stream(req: RecipeRequest) -> AsyncIterator[str]:
+    image_task = None
+    chunks: List[str] = []
     try:
-        # Select a random cuisine combination
-        cuisine1, cuisine2 = random.choice(popular_cuisine_combos)
-        
-        # Create a prompt for recipe of the day
-        prompt = f"""
-        Create a special 'Recipe of the Day' combining {cuisine1} and {cuisine2} cuisines.
-        This should be an approachable recipe that most people can cook with common ingredients.
-        
-        Generate the recipe in the following format:
-        
-        TITLE: [Catchy recipe name]
-        
-        DESCRIPTION: [A brief, enticing description of the dish in 2-3 sentences]
-        
-        INGREDIENTS:
-        - [List main ingredients]
-        
-        INSTRUCTIONS:
-        1. [Step 1]
-        2. [Step 2]
-        3. [Step 3]
-        
-        COOKING TIME: [Total time]
-        DIFFICULTY: [Easy/Medium/Hard]
-        SERVES: [Number of people]
-        """
-        
-        # Generate recipe - using gpt-3.5-turbo instead of gpt-4 for more compatibility
-        try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.8
-            )
-            
-            recipe_text = response.choices[0].message.content.strip()
-            print(f"Recipe generation succeeded for {cuisine1}-{cuisine2}")
-        except Exception as recipe_error:
-            print(f"Recipe generation error: {recipe_error}")
-            # Provide a fallback recipe in case of error
-            recipe_text = f"""
-            TITLE: Simple {cuisine1}-{cuisine2} Fusion Dish
-            
-            DESCRIPTION: A delicious fusion dish combining elements from {cuisine1} and {cuisine2} cuisines. Perfect for a quick, flavorful meal.
-            
-            INGREDIENTS:
-            - Basic ingredients from both cuisines
-            - Common vegetables
-            - Protein of choice
-            - Herbs and spices
-            
-            INSTRUCTIONS:
-            1. Prepare all ingredients.
-            2. Cook according to basic techniques from both cuisines.
-            3. Combine and serve hot.
-            
-            COOKING TIME: 30 minutes
-            DIFFICULTY: Medium
-            SERVES: 4
-            """
-        
-        # Extract title for the image generation
-        title = recipe_text.split("TITLE:")[1].split("\n")[0].strip() if "TITLE:" in recipe_text else f"{cuisine1}-{cuisine2} Fusion Dish"
-        
-        # Extract description
-        description = recipe_text.split("DESCRIPTION:")[1].split("\n\n")[0].strip() if "DESCRIPTION:" in recipe_text else "A delicious fusion recipe combining the best of two culinary worlds."
-        
-        # Generate an image for the recipe - using a simpler approach
-        try:
-            image_prompt = f"Food photography of {title}, {cuisine1} and {cuisine2} fusion cuisine"
-            
-            image_response = client.images.generate(
-                model="dall-e-2",  # Using dall-e-2 instead of dall-e-3 for more compatibility
-                prompt=image_prompt,
-                n=1,
-                size="512x512"  # Smaller size
-            )
-            image_url = image_response.data[0].url
-            print(f"Image generation succeeded for {title}")
-        except Exception as image_error:
-            print(f"Image generation error: {str(image_error)}")
-            image_url = None
-            
-        return {
-            "recipe": recipe_text,
-            "image_url": image_url,
-            "title": title,
-            "description": description,
-            "cuisines": [cuisine1, cuisine2]
-        }
-        
+        # aclosing: on client disconnect the upstream stream and its scheduler
+        # lease are released right away, not when the generator is collected
+        async with aclosing(llm_gateway.stream_complete(
+            model="gpt-4",
+            messages=[{"role": "user", "content": build_recipe_prompt(req)}],
+            temperature=0.7,
+            priority=PRIORITY_PREMIUM if req.is_premium else None
+        )) as deltas:
+            async for delta in deltas:
+                chunks.append(delta)
+                yield format_sse("token", {"text": delta})
+
+                # Start the image as soon as the recipe name line is complete,
+                # so it renders while the rest of the recipe is still streaming
+                if image_task is None and "\n" in delta:
+                    partial_text = "".join(chunks)
+                    if "**Recipe Name**:" in partial_text and "\n" in partial_text.split("**Recipe Name**:", 1)[1]:
+                        image_task = asyncio.create_task(
+                            generate_recipe_image(extract_recipe_name(partial_text), req)
+                        )
+
+        recipe_text = "".join(chunks).strip()
+        if not recipe_text or "recipe not found" in recipe_text.lower():
+            yield format_sse("error", {"detail": "⚠️ AI couldn't generate a recipe. Try modifying the ingredients!"})
+            return
+
+        yield format_sse("recipe", {"recipe": recipe_text})
+
+        if req.is_premium:
+            for section, value in parse_premium_sections(recipe_text).items():
+                if value is not None:
+                    yield format_sse(section, {section: value})
+
+        if image_task is None:
+            image_task = asyncio.create_task(generate_recipe_image(extract_recipe_name(recipe_text), req))
+        yield format_sse("image", {"image_url": await image_task})
+        yield format_sse("done", {})
+
     except Exception as e:
-        print(f"Recipe of the day generation error: {str(e)}")
-        # Return a fallback recipe in case of any error
-        cuisine1, cuisine2 = "Italian", "Japanese"
-        return {
-            "recipe": "Simple fusion dish combining pasta and sushi elements.",
-            "image_url": None,
-            "title": "Italian-Japanese Fusion",
-            "description": "A simple yet delicious combination of Italian and Japanese flavors.",
-            "cuisines": [cuisine1, cuisine2]
-        }
+        print(f"Recipe stream error: {str(e)}")
+        yield format_sse("error", {"detail": f"❌ Error: {str(e)}"})
+    finally:
+        # Client disconnected or generation failed - don't leave the image running
+        if image_task is not None and not image_task.done():
+            image_task.cancel()
+
+@router.get("/images/{job_id}")
+async def get_recipe_image(job_id: str):
+    """
+    Poll a background recipe image job.
+    Returns the job status (pending, ready or failed) and the image URL once ready.
+    """
+    job = image_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Image job not found or expired")
+    return job.to_dict()
+
+@router.get("/recipe-of-the-day", response_model=RecipeOfTheDayResponse)
+async def get_recipe_of_the_day(request: Request):
+    """
+    Returns the day's 'Recipe of the Day', a fusion of one of the popular cuisine combinations.
+    The recipe is generated once per day (and pre-warmed before midnight), then served
+    from memory with an ETag so browsers and CDNs can cache it until the day rolls over.
+    """
+    recipe = await recipe_of_the_day.get()
+    headers = {
+        "ETag": recipe.etag,
+        "Cache-Control": f"public, max-age={60 if recipe.is_fallback else max(60, int(seconds_until_midnight()))}"
+    }
+    if etag_matches(request, recipe.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=recipe.body, media_type="application/json", headers=headers)
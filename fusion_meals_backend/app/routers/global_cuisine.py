@@ -2,18 +2,10 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway, single_flight, fingerprint
 import json
 import random
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 class CuisineRequest(BaseModel):
@@ -36,6 +28,12 @@ async def explore_cuisine(req: CuisineRequest):
     Explore a global cuisine with detailed information about its history,
     key dishes, cultural significance, and cooking techniques.
     """
+    return await single_flight.run(
+        fingerprint("global-cuisine/explore", req),
+        lambda: _explore_cuisine(req)
+    )
+
+async def _explore_cuisine(req: CuisineRequest):
     try:
         # Build the prompt based on request
         region_text = f"from the {req.region} region" if req.region else ""
@@ -116,17 +114,18 @@ async def explore_cuisine(req: CuisineRequest):
         """
         
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-4-turbo",
             response_format={"type": "json_object"},
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
-            ]
+            ],
+            endpoint="global_cuisine"
         )
         
         # Parse the response
-        cuisine_data = json.loads(response.choices[0].message.content)
+        cuisine_data = json.loads(content)
         
         # Return the response
         return cuisine_data
@@ -1,17 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
 import json
-from dotenv import load_dotenv
 import re
-from ..services.amazon_service import amazon_client, AmazonProduct
-
-# Load environment variables
-load_dotenv()
+import logging
+from ..services.amazon_service import amazon_client, AmazonProduct, AMAZON_CATEGORIES
+from ..services.grocery_parser import (
+    GrocerySectionParser,
+    categorize_items,
+    iter_grocery_items,
+    missing_category_placeholders,
+    aiter_lines,
+)
+from ..services.grocery_aggregator import aggregate_grocery_lists
+from ..services.price_estimator import price_estimator
+from ..services.product_matcher import fit_package_sizes
+from ..services.quantity_parser import parse_quantity
+from app.llm import llm_gateway
 
 router = APIRouter()
 
+logger = logging.getLogger("grocery")
+
+# Candidate products reported per checkout item, best first
+MATCH_CANDIDATES = 3
+
 class GroceryItem(BaseModel):
     name: str
     quantity: str
@@ -24,6 +40,9 @@ class GroceryListResponse(BaseModel):
     items: List[GroceryItem]
     estimated_total: float
 
+class GroceryAggregateRequest(BaseModel):
+    ingredient_lists: List[str]  # One per recipe: /parse-recipe markdown or plain "2 cups flour" lines
+
 class AmazonCheckoutRequest(BaseModel):
     items: List[GroceryItem]
     user_token: Optional[str] = None
@@ -53,176 +72,14 @@ async def parse_recipe_ingredients(req: GroceryListRequest):
             # Create a dictionary to store items by category
             categorized_items = {}
             
-            # Define the required categories
-            required_categories = ["Produce", "Meat & Seafood", "Dairy & Eggs", "Pantry", "Spices & Seasonings", "Beverages"]
-            
-            # Define common items for each category to help with categorization
-            category_items = {
-                "Produce": ["cabbage", "tomatoes", "cucumbers", "spinach", "greens", "cauliflower", "mushrooms", 
-                           "eggplant", "berries", "lettuce", "onion", "garlic", "potato", "carrot", "pepper", "broccoli",
-                           "ginger", "chili", "coriander", "cilantro", "lemon", "lime", "fruit", "vegetable", "beans",
-                           "zucchini", "squash", "peas", "corn", "asparagus", "brussels", "kale", "celery", "radish",
-                           "avocado", "apple", "banana", "orange", "grape", "melon", "berry", "salad"],
-                "Meat & Seafood": ["chicken", "beef", "pork", "lamb", "fish", "salmon", "shrimp", "tofu", "tempeh", "seitan",
-                                  "meat", "seafood", "turkey", "duck", "sausage", "bacon", "ham", "steak", "ground"],
-                "Dairy & Eggs": ["milk", "cheese", "yogurt", "butter", "cream", "eggs", "paneer", "cottage cheese", "sour cream",
-                                "dairy", "curd", "ghee", "buttermilk", "kefir", "whey", "ricotta", "mozzarella", "cheddar"],
-                "Pantry": ["rice", "pasta", "flour", "sugar", "oil", "vinegar", "sauce", "canned", "dried",
-                          "bread", "cereal", "grain", "nut", "seed", "noodle", "cracker", "chip", "snack",
-                          "honey", "syrup", "jam", "peanut butter", "condiment"],
-                "Spices & Seasonings": ["salt", "pepper", "cumin", "turmeric", "paprika", "cinnamon", "oregano", "basil", "thyme",
-                                       "spice", "herb", "seasoning", "masala", "powder", "extract", "vanilla", "bay leaf",
-                                       "chili powder", "curry", "garam masala", "cardamom", "clove", "nutmeg"],
-                "Beverages": ["water", "juice", "soda", "coffee", "tea", "wine", "beer", "drink", "beverage", "smoothie",
-                             "cocktail", "liquor", "spirit", "kombucha", "lemonade", "cider"]
-            }
-            
-            # Special case items that need specific categorization
-            special_cases = {
-                "paneer": "Dairy & Eggs",
-                "tofu": "Meat & Seafood",
-                "tempeh": "Meat & Seafood",
-                "seitan": "Meat & Seafood",
-                "yogurt": "Dairy & Eggs",
-                "curd": "Dairy & Eggs",
-                "ghee": "Dairy & Eggs"
-            }
-            
-            # Extract all items from the input first, regardless of their original category
-            all_extracted_items = []
-            
-            # Clean up the input - remove any leading/trailing whitespace
-            cleaned_input = req.recipe_ingredients.strip()
-            
-            # Split the input into sections based on markdown headers
-            # First normalize the headers to ensure they all start with ##
-            normalized_input = cleaned_input
-            if not normalized_input.startswith("##"):
-                # Check if the first line is a category
-                first_line_end = normalized_input.find("\n")
-                if first_line_end > 0:
-                    first_line = normalized_input[:first_line_end].strip()
-                    # If it's a category name without ##, add ##
-                    if any(category in first_line for category in required_categories):
-                        normalized_input = "## " + normalized_input
-            
-            # Split by section headers (## Category)
-            sections = re.split(r'\n##\s+|\n#\s+|^##\s+', normalized_input)
-            # Remove any empty sections
-            sections = [s.strip() for s in sections if s.strip()]
-            
-            print(f"Found {len(sections)} sections to process")
-            
-            # Process each section
-            for section in sections:
-                lines = section.strip().split('\n')
-                if not lines:
-                    continue
-                
-                # Extract category name from the first line
-                category_line = lines[0].strip()
-                category = category_line.replace(':', '').strip()
-                
-                # Skip if no valid category
-                if not category:
-                    continue
-                    
-                print(f"Processing category: {category}")
-                
-                # Process items in this category
-                for i in range(1, len(lines)):
-                    line = lines[i].strip()
-                    if not line or line.startswith('#'):
-                        continue
-                        
-                    # Try different formats for item-quantity pairs
-                    # Format 1: "- Item - Quantity"
-                    if line.startswith('-'):
-                        line = line[1:].strip()
-                        
-                    # Format 2: "Item - Quantity"
-                    if ' - ' in line:
-                        parts = line.split(' - ', 1)
-                        name = parts[0].strip()
-                        quantity = parts[1].strip() if len(parts) > 1 else "1"
-                        
-                        # Add to all extracted items
-                        all_extracted_items.append({"name": name, "quantity": quantity, "original_category": category})
-                        continue
-                    
-                    # Format 3: Just try to split on last hyphen
-                    if '-' in line:
-                        last_hyphen = line.rfind('-')
-                        name = line[:last_hyphen].strip()
-                        quantity = line[last_hyphen+1:].strip()
-                        if name and quantity:
-                            # Add to all extracted items
-                            all_extracted_items.append({"name": name, "quantity": quantity, "original_category": category})
-                            continue
-                    
-                    # Format 4: Just use the whole line as the item name
-                    name = line.strip()
-                    if name:
-                        # Add to all extracted items
-                        all_extracted_items.append({"name": name, "quantity": "1", "original_category": category})
-            
-            # Now categorize all extracted items
-            # First, create a set to track items we've already categorized to avoid duplicates
-            categorized_item_names = set()
-            
-            # Process items in a specific order of categories to ensure proper categorization
-            # This helps ensure items like "green beans" go to Produce instead of Pantry
-            category_priority = ["Dairy & Eggs", "Meat & Seafood", "Produce", "Spices & Seasonings", "Pantry", "Beverages"]
-            
-            # First pass: categorize items based on their original category and keywords
-            for item in all_extracted_items:
-                name = item["name"]
-                quantity = item["quantity"]
-                item_lower = name.lower()
-                
-                # Skip if we've already categorized this item
-                if item_lower in categorized_item_names:
-                    continue
-                
-                # Check for special cases first
-                correct_category = None
-                for special_item, special_category in special_cases.items():
-                    if special_item in item_lower:
-                        correct_category = special_category
-                        break
-                
-                # If not a special case, check each category in priority order
-                if not correct_category:
-                    for cat in category_priority:
-                        keywords = category_items.get(cat, [])
-                        if any(keyword in item_lower for keyword in keywords):
-                            correct_category = cat
-                            break
-                
-                # If no category matched, use the original category
-                if not correct_category:
-                    correct_category = item["original_category"]
-                
-                # Add the item to the correct category
-                if correct_category not in categorized_items:
-                    categorized_items[correct_category] = []
-                
-                categorized_items[correct_category].append({"name": name, "quantity": quantity, "category": correct_category})
-                categorized_item_names.add(item_lower)
-            
-            # Check if we have all required categories
-            # If not, use OpenAI to fill in the missing ones
-            missing_categories = [cat for cat in required_categories if cat not in categorized_items]
+            # Parse section by section and categorize each item as it is extracted
+            for item in iter_grocery_items(req.recipe_ingredients.strip().split('\n')):
+                categorized_items.setdefault(item["category"], []).append(item)
             
-            # Add empty lists for missing categories
-            for missing_cat in missing_categories:
-                categorized_items[missing_cat] = []
-                # Add a placeholder item to ensure the category appears in the output
-                categorized_items[missing_cat].append({
-                    "name": f"No {missing_cat.lower()} items needed",
-                    "quantity": "",
-                    "category": missing_cat
-                })
+            # Add a placeholder item for each missing required category
+            # to ensure the category appears in the output
+            for placeholder in missing_category_placeholders(categorized_items):
+                categorized_items[placeholder["category"]] = [placeholder]
             
             # DISABLED: No longer generating suggestions for missing categories
             # This ensures we ONLY use items from the original input
@@ -249,8 +106,6 @@ async def parse_recipe_ingredients(req: GroceryListRequest):
             # Fall back to OpenAI parsing if direct parsing fails
             
         # Use OpenAI as a fallback
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
         prompt = f"""You are a helpful AI that converts recipe ingredients into a structured grocery list.
 
@@ -284,18 +139,19 @@ async def parse_recipe_ingredients(req: GroceryListRequest):
         }}
         """
 
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a JSON-only response assistant specializing in grocery lists. You MUST ALWAYS include these categories in your response: Produce, Meat & Seafood, Dairy & Eggs, Pantry, Spices & Seasonings, and Beverages. IMPORTANT: For categories that exist in the input, use EXACTLY the items listed in those categories without modification. Only add reasonable items for categories that are completely missing from the input."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.2,  # Lower temperature for more deterministic results
-            max_tokens=2000  # Increase token limit to handle larger lists
+            max_tokens=2000,  # Increase token limit to handle larger lists
+            endpoint="grocery_parse"
         )
 
         # Get the response content
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
         print("\n=== OpenAI Response ===")
         print(content)
         print("======================\n")
@@ -441,6 +297,82 @@ async def parse_recipe_ingredients(req: GroceryListRequest):
         print("!!!!!!!!!!!!!!!!!!\n")
         raise HTTPException(status_code=500, detail=f"Error parsing ingredients: {str(e)}")
 
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator is still reading the request body.
+
+    The stock response listens for disconnects on receive() while streaming,
+    which would steal the request's body chunks; here the iterator owns
+    receive() and sees a disconnect through request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+@router.post("/parse-recipe/stream")
+async def stream_recipe_ingredients(request: Request):
+    """
+    Streaming variant of /parse-recipe for very large grocery lists.
+
+    The request body is the raw markdown list (send it chunked as text/plain);
+    it is parsed section by section as it arrives. The response is NDJSON, one
+    GroceryItem per line, written as soon as each item is categorized, followed
+    by placeholder items for any required category that never appeared.
+    """
+    return RequestStreamingResponse(_stream_grocery_items(request), media_type="application/x-ndjson")
+
+async def _stream_grocery_items(request: Request):
+    categories = set()
+    async for item in _aiter_grocery_items(aiter_lines(request.stream())):
+        categories.add(item["category"])
+        yield GroceryItem(**item).model_dump_json() + "\n"
+    for placeholder in missing_category_placeholders(categories):
+        yield GroceryItem(**placeholder).model_dump_json() + "\n"
+
+async def _aiter_grocery_items(lines):
+    parser = GrocerySectionParser()
+    seen = set()
+    async for line in lines:
+        item = parser.feed(line)
+        if item is not None:
+            for categorized in categorize_items([item], seen):
+                yield categorized
+
+def is_placeholder(item: GroceryItem) -> bool:
+    return item.name.startswith("No ") and item.name.endswith("items needed")
+
+def estimate_prices(items: List[GroceryItem]):
+    """Price estimates for the non-placeholder items, as (item, estimate) pairs"""
+    items = [item for item in items if not is_placeholder(item)]
+    estimates = price_estimator.estimate_many([(item.name, item.quantity, item.category) for item in items])
+    return list(zip(items, estimates))
+
+@router.post("/aggregate", response_model=GroceryListResponse)
+async def aggregate_grocery_lists_endpoint(req: GroceryAggregateRequest):
+    """
+    Merge the ingredient lists of many recipes into one grocery list.
+
+    Duplicate items are merged by normalized name and their quantities summed
+    with unit conversion ("2 cups flour" + "500 g flour"); the six required
+    categories are always present. Runs locally, with no LLM call.
+    """
+    if not any(ingredients.strip() for ingredients in req.ingredient_lists):
+        raise HTTPException(status_code=400, detail="No ingredients provided")
+
+    try:
+        items = [GroceryItem(**item) for item in aggregate_grocery_lists(req.ingredient_lists)]
+        return GroceryListResponse(
+            items=items,
+            estimated_total=round(sum(estimate.price for _, estimate in estimate_prices(items)), 2)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error aggregating grocery lists: {str(e)}")
+
 @router.post("/add-to-cart")
 async def add_to_cart(items: List[GroceryItem]):
     """
@@ -480,45 +412,12 @@ async def add_to_cart(items: List[GroceryItem]):
             }
         }
         
-        # Calculate estimated prices for the grocery items
-        estimated_prices = {}
-        for item in items:
-            # Skip placeholder items
-            if item.name.startswith("No ") and item.name.endswith("items needed"):
-                continue
-                
-            # Very simple price estimation based on typical costs
-            category_base_prices = {
-                "Produce": 2.99,
-                "Meat & Seafood": 7.99,
-                "Dairy & Eggs": 3.99,
-                "Pantry": 4.99,
-                "Spices & Seasonings": 3.49,
-                "Beverages": 4.29
-            }
-            
-            # Extract quantity number if possible
-            quantity_str = item.quantity.lower()
-            quantity_num = 1.0
-            
-            # Try to extract numeric quantity
-            import re
-            quantity_match = re.search(r'(\d+\.?\d*)', quantity_str)
-            if quantity_match:
-                try:
-                    quantity_num = float(quantity_match.group(1))
-                except:
-                    quantity_num = 1.0
-            
-            # Adjust for units
-            if "kg" in quantity_str or "kilo" in quantity_str:
-                quantity_num *= 2.2  # Convert to pounds
-            
-            base_price = category_base_prices.get(item.category, 3.99)
-            estimated_prices[item.name] = round(base_price * quantity_num, 2)
+        # Price every item (placeholders skipped) against the product catalog in one pass
+        priced = estimate_prices(items)
+        estimated_prices = {item.name: estimate.price for item, estimate in priced}
         
         # Calculate total price
-        total_price = sum(estimated_prices.values())
+        total_price = sum(estimate.price for _, estimate in priced)
         
         # Simulate storing cart in a database
         cart_id = "cart_" + str(hash("".join([item.name for item in items])))[:8]
@@ -530,6 +429,10 @@ async def add_to_cart(items: List[GroceryItem]):
             "estimated_total": round(total_price, 2),
             "supported_services": service_details,
             "estimated_prices": estimated_prices,
+            "price_estimates": [
+                {"name": item.name, "quantity": item.quantity, **estimate._asdict()}
+                for item, estimate in priced
+            ],
             "next_steps": [
                 "Review your cart and make any adjustments",
                 "Select a delivery service",
@@ -547,13 +450,7 @@ async def amazon_checkout(req: AmazonCheckoutRequest):
         actual_items = []
         for item in req.items:
             # Extract quantity number for better matching
-            quantity_match = re.search(r'(\d+\.?\d*)', item.quantity)
-            quantity = 1
-            if quantity_match:
-                try:
-                    quantity = int(float(quantity_match.group(1)))
-                except:
-                    quantity = 1
+            quantity = int(parse_quantity(item.quantity).amount) or 1
             
             # Limit quantity to reasonable amount
             quantity = min(quantity, 10)
@@ -567,28 +464,34 @@ async def amazon_checkout(req: AmazonCheckoutRequest):
         # Initialize matched products list
         matched_products = []
         
+        # Search for every item concurrently, in the appropriate Amazon category
+        search_results = await amazon_client.search_many(
+            [(item.name, AMAZON_CATEGORIES.get(item.category, "Grocery")) for item in actual_items]
+        )
+        
         # Process each item
-        for item in actual_items:
-            # Get the appropriate Amazon category for this item
-            amazon_category = "Grocery"
-            if item.category == "Produce":
-                amazon_category = "GroceryFresh"
-            elif item.category == "Meat & Seafood":
-                amazon_category = "GroceryFresh"
-            
-            # Search for products on Amazon (using mock data)
-            search_term = f"{item.name}"
-            products = amazon_client.search_products(search_term, amazon_category)
-            
-            if products:
-                # Take the first matching product
-                best_match = products[0]
+        for item, requested, matches in zip(actual_items, req.items, search_results):
+            # Rerank by how well each pack size covers the requested quantity
+            matches = fit_package_sizes(matches, requested.quantity, item.name)
+            if matches:
+                # Take the best matching product, in as many packs as the quantity needs
+                best_match = matches[0].product
                 
                 matched_products.append({
                     "asin": best_match.asin,
                     "title": best_match.title,
                     "price": best_match.price,
-                    "quantity": int(item.quantity),
+                    "quantity": min(matches[0].packs, 10) if matches[0].packs else int(item.quantity),
+                    "score": matches[0].score,
+                    "candidates": [
+                        {
+                            "asin": match.product.asin,
+                            "title": match.product.title,
+                            "price": match.product.price,
+                            "score": match.score,
+                            "packs": match.packs
+                        } for match in matches[:MATCH_CANDIDATES]
+                    ],
                     "original_item": {
                         "name": item.name,
                         "quantity": item.quantity,
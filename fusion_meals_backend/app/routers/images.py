@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from app.services.image_store import image_store
+from app.utils import etag_matches
+
+router = APIRouter()
+
+# Stored images never change for a given hash, so browsers and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.get("/{image_hash}")
+async def get_image(image_hash: str, request: Request):
+    """
+    Serve a stored recipe image by its content hash.
+    Supports conditional requests via If-None-Match.
+    """
+    etag = f'"{image_hash}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+    stored = await image_store.read(image_hash)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    path, media_type = stored
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -2,18 +2,10 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway, single_flight, fingerprint
 import json
 import re
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 class SubstituteRequest(BaseModel):
@@ -41,6 +33,12 @@ async def get_ingredient_substitutes(req: SubstituteRequest):
     Get appropriate substitutes for an ingredient based on dietary restrictions,
     cooking purpose, and nutritional equivalence.
     """
+    return await single_flight.run(
+        fingerprint("ingredient-substitution/find", req),
+        lambda: _find_substitutes(req)
+    )
+
+async def _find_substitutes(req: SubstituteRequest) -> SubstituteResponse:
     try:
         # Clean up ingredient name
         ingredient = req.ingredient.strip().lower()
@@ -88,15 +86,16 @@ async def get_ingredient_substitutes(req: SubstituteRequest):
         """
         
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            endpoint="ingredient_substitution"
         )
         
         # Extract and clean the response
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
         
         # Parse the JSON into substitutes
         data = json.loads(content)
@@ -1,23 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
 import os
-from dotenv import load_dotenv
 import traceback
 
-# Load environment variables from the project root
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-print("Current working directory:", os.getcwd())  # Debug print
-print("API Key found:", "Yes" if api_key else "No")  # Debug print
-print("API Key starts with:", api_key[:10] if api_key else "None")  # Debug print
-
-if not api_key:
-    raise ValueError("OpenAI API key not found in environment variables")
-
-client = OpenAI(api_key=api_key)
+from app.llm import llm_gateway, single_flight, fingerprint
 
 router = APIRouter()
 
@@ -41,6 +27,12 @@ async def options_generate_meal_plan():
 # ✅ Generate meal plan endpoint
 @router.post("/generate", response_model=MealPlanResponse)
 async def generate_meal_plan(req: MealPlanRequest):
+    return await single_flight.run(
+        fingerprint("meal-plans/generate", req),
+        lambda: _generate_meal_plan(req)
+    )
+
+async def _generate_meal_plan(req: MealPlanRequest):
     try:
         print(f"Meal plan request received: {req}")
         prompt = f"""
@@ -101,14 +93,13 @@ async def generate_meal_plan(req: MealPlanRequest):
         12. Account for ingredients used in multiple meals
         """
 
-        # ✅ Updated OpenAI Chat Completion call
-        response = client.chat.completions.create(
+        # ✅ Non-blocking OpenAI Chat Completion call through the shared gateway
+        meal_plan_text = await llm_gateway.complete(
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7
         )
-
-        meal_plan_text = response.choices[0].message.content.strip()
+        meal_plan_text = meal_plan_text.strip()
 
         # ✅ Ensure line breaks are properly rendered
         meal_plan_text = meal_plan_text.replace("\\n", "\n").replace("\\t", "\t").replace("\\r", "\n")
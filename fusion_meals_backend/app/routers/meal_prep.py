@@ -2,18 +2,10 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway
 import json
 import random
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 class MealPrepRequest(BaseModel):
@@ -119,7 +111,7 @@ async def create_batch_cooking_plan(request: MealPrepRequest):
         """
 
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-4-turbo",
             response_format={"type": "json_object"},
             messages=[
@@ -129,7 +121,7 @@ async def create_batch_cooking_plan(request: MealPrepRequest):
         )
         
         # Parse and return the response
-        plan_data = json.loads(response.choices[0].message.content)
+        plan_data = json.loads(content)
         return plan_data
     
     except Exception as e:
@@ -200,7 +192,7 @@ async def get_time_optimized_recipes(request: TimeOptimizedRecipeRequest):
         """
 
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-4-turbo",
             response_format={"type": "json_object"},
             messages=[
@@ -210,7 +202,7 @@ async def get_time_optimized_recipes(request: TimeOptimizedRecipeRequest):
         )
         
         # Parse and return the response
-        recipes_data = json.loads(response.choices[0].message.content)
+        recipes_data = json.loads(content)
         return recipes_data
     
     except Exception as e:
@@ -274,7 +266,7 @@ async def transform_leftovers(request: LeftoverTransformRequest):
         """
 
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-4-turbo",
             response_format={"type": "json_object"},
             messages=[
@@ -284,7 +276,7 @@ async def transform_leftovers(request: LeftoverTransformRequest):
         )
         
         # Parse and return the response
-        transformation_data = json.loads(response.choices[0].message.content)
+        transformation_data = json.loads(content)
         return transformation_data
     
     except Exception as e:
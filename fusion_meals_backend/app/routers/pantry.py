@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Optional
 from datetime import date
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.pantry import (
     PantryItem, 
@@ -10,10 +10,12 @@ from app.models.pantry import (
     UpdatePantryItemRequest,
     RemovePantryItemRequest,
     RecipeIngredientCheckRequest,
-    RecipeIngredientCheckResponse
+    RecipeIngredientCheckResponse,
+    MultiRecipeCheckRequest,
+    MultiRecipeCheckResponse
 )
 
-from app.database.database import get_db
+from app.database.database import get_async_db
 from app.services import db_pantry_service as pantry_service
 
 # Create router
@@ -30,7 +32,7 @@ async def get_current_user_id() -> str:
 
 # Get pantry inventory
 @router.get("/inventory", response_model=PantryInventory)
-async def get_inventory(user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def get_inventory(user_id: str = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Get the current user's pantry inventory.
     
@@ -40,7 +42,7 @@ async def get_inventory(user_id: str = Depends(get_current_user_id), db: Session
 
 # Add item to pantry
 @router.post("/items", response_model=PantryItem)
-async def add_item(item: AddPantryItemRequest, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def add_item(item: AddPantryItemRequest, user_id: str = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Add a new item to the pantry.
     
@@ -50,7 +52,7 @@ async def add_item(item: AddPantryItemRequest, user_id: str = Depends(get_curren
 
 # Update item in pantry
 @router.put("/items", response_model=PantryItem)
-async def update_item(item: UpdatePantryItemRequest, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def update_item(item: UpdatePantryItemRequest, user_id: str = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Update an existing pantry item.
     
@@ -63,7 +65,7 @@ async def update_item(item: UpdatePantryItemRequest, user_id: str = Depends(get_
 
 # Remove item from pantry
 @router.delete("/items/{item_id}", response_model=bool)
-async def remove_item(item_id: str, user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def remove_item(item_id: str, user_id: str = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Remove an item from the pantry.
     
@@ -76,7 +78,7 @@ async def remove_item(item_id: str, user_id: str = Depends(get_current_user_id),
 
 # Get expired items
 @router.get("/expired", response_model=List[PantryItem])
-async def get_expired(user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def get_expired(user_id: str = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Get all expired items in the pantry.
     
@@ -86,7 +88,7 @@ async def get_expired(user_id: str = Depends(get_current_user_id), db: Session =
 
 # Get low stock items
 @router.get("/low-stock", response_model=List[PantryItem])
-async def get_low_stock(user_id: str = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def get_low_stock(user_id: str = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Get all items that are low in stock.
     
@@ -99,7 +101,7 @@ async def get_low_stock(user_id: str = Depends(get_current_user_id), db: Session
 async def check_recipe_ingredients(
     request: RecipeIngredientCheckRequest,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Check if all ingredients for a recipe are available in the pantry.
@@ -107,16 +109,32 @@ async def check_recipe_ingredients(
     Compares the recipe ingredients with the pantry inventory and returns 
     a list of missing or insufficient ingredients.
     """
-    # This endpoint needs to be implemented in db_pantry_service.py
-    # For now, it will return a 501 Not Implemented error
-    raise HTTPException(status_code=501, detail="Not implemented yet")
+    return await pantry_service.check_recipe_ingredients(db, user_id, request.recipe_ingredients)
+
+# Check many recipes at once
+@router.post("/check-recipes", response_model=MultiRecipeCheckResponse)
+async def check_recipes(
+    request: MultiRecipeCheckRequest,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Check a batch of recipes (e.g. a week's meal plan) against the pantry.
+    
+    The pantry is loaded once and every recipe is checked in one pass.
+    Returns each recipe's missing and insufficient ingredients, plus the
+    combined shortfall: what to buy to make all of the recipes.
+    """
+    if not request.recipes:
+        raise HTTPException(status_code=400, detail="No recipes provided")
+    return await pantry_service.check_recipes(db, user_id, request.recipes)
 
 # Get recipe suggestions
 @router.get("/recipe-suggestions", response_model=List[Dict])
 async def get_recipe_suggestions(
     limit: int = Query(5, description="Maximum number of suggestions to return"),
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get recipe suggestions based on what's in the user's pantry.
@@ -133,7 +151,7 @@ async def get_recipe_suggestions(
 async def update_from_grocery(
     grocery_items: List[Dict],
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update the pantry inventory after grocery shopping.
@@ -2,17 +2,9 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway
 import json
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 class RecipeAnalysisRequest(BaseModel):
@@ -147,15 +139,16 @@ async def analyze_recipe(req: RecipeAnalysisRequest):
         """
         
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,  # Lower temperature for more consistent analysis
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            endpoint="recipe_analysis"
         )
         
         # Extract and process the response
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
         data = json.loads(content)
         
         # Create the response
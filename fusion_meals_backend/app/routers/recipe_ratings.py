@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
-from ..database import get_db
+from ..database.database import get_async_db
 from ..models.recipe_rating import RecipeRating, RecipeSimilarity
 
 router = APIRouter()
@@ -23,14 +24,14 @@ class RatingResponse(BaseModel):
 @router.post("/rate", response_model=RatingResponse)
 async def rate_recipe(
     request: RatingRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # Check if user has already rated this recipe
-        existing_rating = db.query(RecipeRating).filter(
+        existing_rating = await db.scalar(select(RecipeRating).where(
             RecipeRating.recipe_id == request.recipe_id,
             RecipeRating.user_id == request.user_id
-        ).first()
+        ))
 
         if existing_rating:
             existing_rating.rating = request.rating
@@ -45,12 +46,12 @@ async def rate_recipe(
             )
             db.add(new_rating)
 
-        db.commit()
+        await db.commit()
 
         # Get updated statistics
-        ratings = db.query(RecipeRating).filter(
+        ratings = (await db.scalars(select(RecipeRating).where(
             RecipeRating.recipe_id == request.recipe_id
-        ).all()
+        ))).all()
 
         reviews = [
             {
@@ -72,18 +73,18 @@ async def rate_recipe(
         }
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{recipe_id}/reviews", response_model=RatingResponse)
 async def get_reviews(
     recipe_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        ratings = db.query(RecipeRating).filter(
+        ratings = (await db.scalars(select(RecipeRating).where(
             RecipeRating.recipe_id == recipe_id
-        ).all()
+        ))).all()
 
         reviews = [
             {
@@ -110,12 +111,12 @@ async def get_reviews(
 @router.get("/{recipe_id}/similar")
 async def get_similar_recipes(
     recipe_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        similarities = db.query(RecipeSimilarity).filter(
+        similarities = (await db.scalars(select(RecipeSimilarity).where(
             RecipeSimilarity.recipe_id == recipe_id
-        ).order_by(RecipeSimilarity.similarity_score.desc()).limit(5).all()
+        ).order_by(RecipeSimilarity.similarity_score.desc()).limit(5))).all()
 
         return {
             "success": True,
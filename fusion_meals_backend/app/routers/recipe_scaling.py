@@ -3,17 +3,9 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
 import re
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway
 import json
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 class ScalingRequest(BaseModel):
@@ -192,15 +184,16 @@ async def scale_recipe(req: ScalingRequest):
             """
         
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,  # Lower temperature for more precise calculations
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            endpoint="recipe_scaling"
         )
         
         # Extract and clean the response
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
         print(f"API response: {content[:200]}...")  # Print truncated response for debugging
         
         try:
@@ -2,17 +2,9 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.llm import llm_gateway
 import json
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
 router = APIRouter()
 
 class SharingRequest(BaseModel):
@@ -148,7 +140,7 @@ async def generate_sharing_content(req: SharingRequest):
         """
         
         # Call OpenAI API
-        response = client.chat.completions.create(
+        content = await llm_gateway.complete(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,  # Higher temperature for more creative outputs
@@ -156,7 +148,7 @@ async def generate_sharing_content(req: SharingRequest):
         )
         
         # Extract and process the response
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
         data = json.loads(content)
         
         # Create the response
@@ -1,5 +1,6 @@
 import os
 import time
+import asyncio
 import hmac
 import hashlib
 import base64
@@ -7,7 +8,9 @@ import urllib.parse
 import urllib.request
 import json
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import httpx
 from dotenv import load_dotenv
 try:
     import requests
@@ -15,8 +18,12 @@ except ImportError:
     # Handle the case where requests is not installed
     requests = None
     print("Warning: 'requests' module not installed. Mock data will be used for Amazon services.")
-from pydantic import BaseModel
 import logging
+from app.models.product import AmazonProduct
+from app.services.product_catalog import ProductCatalog
+from app.services.product_index import load_catalog
+from app.services.product_matcher import ProductMatch, ProductMatcher
+from app.llm import single_flight
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -25,17 +32,34 @@ logger = logging.getLogger("amazon_service")
 # Load environment variables
 load_dotenv()
 
-class AmazonProduct(BaseModel):
-    asin: str
-    title: str 
-    price: float
-    image_url: str
-    detail_url: str
-    availability: str
-    quantity_options: List[int] = [1, 2, 3, 4, 5]
-    
+# Product matching: concurrent searches per checkout and a per-term result cache
+SEARCH_CONCURRENCY = int(os.getenv("AMAZON_SEARCH_CONCURRENCY", "5"))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("AMAZON_SEARCH_CACHE_TTL_SECONDS", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("AMAZON_SEARCH_CACHE_MAX_ENTRIES", "2048"))
+# Most catalog products returned per search
+SEARCH_RESULT_LIMIT = 10
+
+# Grocery list categories searched in Amazon Fresh; everything else is "Grocery"
+AMAZON_CATEGORIES = {
+    "Produce": "GroceryFresh",
+    "Meat & Seafood": "GroceryFresh",
+    "Dairy & Eggs": "GroceryFresh",
+}
+
+# PA-API search indexes for our grocery categories
+PAAPI_SEARCH_INDEXES = {
+    "Grocery": "GroceryAndGourmetFood",
+    "GroceryFresh": "AmazonFresh",
+}
+PAAPI_SEARCH_RESOURCES = [
+    "ItemInfo.Title",
+    "Images.Primary.Large",
+    "Offers.Listings.Price",
+    "Offers.Listings.Availability.Message",
+]
+
 class AmazonApiClient:
-    def __init__(self):
+    def __init__(self, catalog: Optional[ProductCatalog] = None):
         # Amazon Product Advertising API credentials
         self.access_key = os.getenv("AMAZON_ACCESS_KEY")
         self.secret_key = os.getenv("AMAZON_SECRET_KEY")
@@ -65,7 +89,20 @@ class AmazonApiClient:
         
         domain = region_domain_map.get(self.region, "com")
         self.endpoint = f"webservices.amazon.{domain}"
+        self.marketplace = f"www.amazon.{domain}"
         self.uri = "/paapi5/searchitems"
+        
+        # Products are loaded and indexed once, not rebuilt per search
+        self.catalog = catalog if catalog is not None else load_catalog()
+        self.matcher = ProductMatcher(self.catalog)
+        
+        # Live PA-API searches are opt-in even with credentials
+        self.use_paapi = bool(self.access_key and self.secret_key and self.partner_tag) and \
+            os.getenv("AMAZON_PAAPI_ENABLED", "false").lower() == "true"
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._search_semaphore: Optional[asyncio.Semaphore] = None
+        self._search_cache: "OrderedDict[str, Tuple[float, List[ProductMatch]]]" = OrderedDict()
+        self._search_counters = {"cache_hits": 0, "cache_misses": 0, "remote_searches": 0, "remote_failures": 0}
     
     def _get_timestamp(self):
         """Get ISO8601 timestamp for Amazon API requests"""
@@ -127,146 +164,170 @@ class AmazonApiClient:
     
     def _get_mock_products(self, search_term: str, category: str) -> List[AmazonProduct]:
         """Return mock products for demo purposes"""
-        logger.info(f"Using mock data for search: {search_term} in {category}")
+        return [match.product for match in self._match_catalog(search_term, category)]
+    
+    def _match_catalog(self, search_term: str, category: str) -> List[ProductMatch]:
+        """Fuzzy-matched, scored catalog products; placeholders scored 0 when nothing is close"""
+        matches = self.matcher.match(search_term, category, k=SEARCH_RESULT_LIMIT)
+        return matches or [ProductMatch(product, 0.0) for product in self._get_default_products(search_term)]
+    
+    def _get_default_products(self, search_term: str) -> List[AmazonProduct]:
+        """Generic placeholder products for terms the catalog doesn't know"""
+        return [
+            AmazonProduct(
+                asin=f"B00DEFAULT{i}",
+                title=f"Amazon Fresh {search_term.title()} - Premium Quality",
+                price=round(4.99 + (i * 1.5), 2),
+                image_url=f"https://via.placeholder.com/500x500.png?text={search_term.replace(' ', '+')}",
+                detail_url=f"https://www.amazon.com/dp/B00DEFAULT{i}",
+                availability="In Stock"
+            ) for i in range(1, 4)
+        ]
+    
+    # Concurrent, cached search (used by /grocery/amazon-checkout)
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(max_connections=SEARCH_CONCURRENCY, max_keepalive_connections=SEARCH_CONCURRENCY)
+            )
+        return self._http_client
+    
+    def _cache_get(self, key: str) -> Optional[List[ProductMatch]]:
+        entry = self._search_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, matches = entry
+        if expires_at <= time.monotonic():
+            del self._search_cache[key]
+            return None
+        self._search_cache.move_to_end(key)
+        return matches
+    
+    def _cache_put(self, key: str, matches: List[ProductMatch]):
+        self._search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL_SECONDS, matches)
+        self._search_cache.move_to_end(key)
+        while len(self._search_cache) > SEARCH_CACHE_MAX_ENTRIES:
+            self._search_cache.popitem(last=False)
+    
+    async def search_products_async(self, search_term: str, category: str = "Grocery") -> List[AmazonProduct]:
+        """Search for products, best first (see search_matches_async)"""
+        return [match.product for match in await self.search_matches_async(search_term, category)]
+    
+    async def search_matches_async(self, search_term: str, category: str = "Grocery") -> List[ProductMatch]:
+        """
+        Search for scored product matches, serving repeated terms from a TTL cache.
         
-        # Create mock products based on the search term
-        mock_products = []
-        search_lower = search_term.lower()
+        Concurrent searches for the same term share one request, and at most
+        SEARCH_CONCURRENCY requests run at once. A failed live search falls
+        back to the local catalog and is not cached.
+        """
+        key = f"{category}:{' '.join(search_term.lower().split())}"
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._search_counters["cache_hits"] += 1
+            return cached
+        self._search_counters["cache_misses"] += 1
+        
+        async def fetch() -> List[ProductMatch]:
+            if not self.use_paapi:
+                matches = self._match_catalog(search_term, category)
+                self._cache_put(key, matches)
+                return matches
+            if self._search_semaphore is None:
+                self._search_semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+            try:
+                async with self._search_semaphore:
+                    products = await self._search_paapi(search_term, category)
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                logger.warning(f"PA-API search failed for {search_term}: {str(e)}")
+                self._search_counters["remote_failures"] += 1
+                return self._match_catalog(search_term, category)
+            # Amazon ranks live results itself; they carry no local score
+            matches = [ProductMatch(product, None) for product in products or self._get_default_products(search_term)]
+            self._cache_put(key, matches)
+            return matches
+        
+        return await single_flight.run(f"amazon-search:{key}", fetch)
+    
+    async def search_many(self, queries: List[Tuple[str, str]]) -> List[List[ProductMatch]]:
+        """
+        Run (search_term, category) searches concurrently; results are in query order.
         
-        # Map common grocery items to mock data
-        mock_data = {
-            "spinach": [
-                AmazonProduct(
-                    asin="B07JLF9NB7",
-                    title="Fresh Brand – Organic Baby Spinach, 16 oz",
-                    price=4.99,
-                    image_url="https://m.media-amazon.com/images/I/71S+8RKViyL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B07JLF9NB7",
-                    availability="In Stock"
-                ),
-                AmazonProduct(
-                    asin="B074H6X6K7",
-                    title="365 by Whole Foods Market, Organic Baby Spinach, 16 Ounce",
-                    price=5.49,
-                    image_url="https://m.media-amazon.com/images/I/71pZ36LNX+L._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B074H6X6K7",
-                    availability="In Stock"
-                )
-            ],
-            "avocado": [
-                AmazonProduct(
-                    asin="B00QGWM5HC",
-                    title="Organic Hass Avocados, 4 Count",
-                    price=7.99,
-                    image_url="https://m.media-amazon.com/images/I/81LR4wRl+QL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B00QGWM5HC",
-                    availability="In Stock"
-                )
-            ],
-            "tomato": [
-                AmazonProduct(
-                    asin="B000RROJ7S",
-                    title="Fresh Roma Tomatoes, 2lb",
-                    price=3.49,
-                    image_url="https://m.media-amazon.com/images/I/71wt+-YIjgL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B000RROJ7S",
-                    availability="In Stock"
-                )
-            ],
-            "onion": [
-                AmazonProduct(
-                    asin="B07QK1GVPR",
-                    title="Yellow Onions, 3 lb Bag",
-                    price=2.99,
-                    image_url="https://m.media-amazon.com/images/I/81LJrQqh9sL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B07QK1GVPR",
-                    availability="In Stock"
-                )
-            ],
-            "potato": [
-                AmazonProduct(
-                    asin="B0787KT368",
-                    title="Russet Potatoes, 5 lb Bag",
-                    price=4.79,
-                    image_url="https://m.media-amazon.com/images/I/71T0qkU4KdL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B0787KT368",
-                    availability="In Stock"
-                )
-            ],
-            "carrot": [
-                AmazonProduct(
-                    asin="B074H5CKXD",
-                    title="Organic Carrots, 2 lb Bag",
-                    price=2.49,
-                    image_url="https://m.media-amazon.com/images/I/71Tgfp7ztDL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B074H5CKXD",
-                    availability="In Stock"
-                )
-            ],
-            "rice": [
-                AmazonProduct(
-                    asin="B00ZP3NIBI",
-                    title="Basmati Rice, 5 lb Bag",
-                    price=19.99,
-                    image_url="https://m.media-amazon.com/images/I/71t3z3hN3GL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B00ZP3NIBI",
-                    availability="In Stock"
-                )
-            ],
-            "chicken": [
-                AmazonProduct(
-                    asin="B07QK1GVPR",
-                    title="Organic Chicken Breast, 2 lb",
-                    price=12.99,
-                    image_url="https://m.media-amazon.com/images/I/71LJrQqh9sL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B07QK1GVPR",
-                    availability="In Stock"
-                )
-            ],
-            "beef": [
-                AmazonProduct(
-                    asin="B0787KT368",
-                    title="Ground Beef, 1 lb",
-                    price=6.99,
-                    image_url="https://m.media-amazon.com/images/I/71T0qkU4KdL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B0787KT368",
-                    availability="In Stock"
-                )
-            ],
-            "fish": [
-                AmazonProduct(
-                    asin="B074H5CKXD",
-                    title="Fresh Salmon Fillet, 1 lb",
-                    price=14.99,
-                    image_url="https://m.media-amazon.com/images/I/71Tgfp7ztDL._SL1500_.jpg",
-                    detail_url="https://www.amazon.com/dp/B074H5CKXD",
-                    availability="In Stock"
-                )
-            ],
-            "default": [
-                AmazonProduct(
-                    asin=f"B00DEFAULT{i}",
-                    title=f"Amazon Fresh {search_term.title()} - Premium Quality",
-                    price=round(4.99 + (i * 1.5), 2),
-                    image_url=f"https://via.placeholder.com/500x500.png?text={search_term.replace(' ', '+')}",
-                    detail_url=f"https://www.amazon.com/dp/B00DEFAULT{i}",
-                    availability="In Stock"
-                ) for i in range(1, 4)
-            ]
+        PA-API SearchItems takes one keyword query per request, so there is no
+        multi-keyword batch call; duplicate terms are coalesced instead.
+        """
+        return list(await asyncio.gather(*(self.search_matches_async(term, category) for term, category in queries)))
+    
+    def _paapi_headers(self, payload: str, target: str) -> Dict[str, str]:
+        """AWS Signature Version 4 headers for a PA-API 5 POST request"""
+        amz_date = self._get_timestamp()
+        date_stamp = amz_date[:8]
+        headers = {
+            "content-encoding": "amz-1.0",
+            "content-type": "application/json; charset=utf-8",
+            "host": self.endpoint,
+            "x-amz-date": amz_date,
+            "x-amz-target": f"com.amazon.paapi5.v1.ProductAdvertisingAPIv1.{target}",
         }
+        signed_headers = ";".join(sorted(headers))
+        canonical_headers = "".join(f"{name}:{headers[name]}\n" for name in sorted(headers))
+        payload_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        canonical_request = f"POST\n{self.uri}\n\n{canonical_headers}\n{signed_headers}\n{payload_hash}"
         
-        # Find matching mock products
-        found_match = False
-        for key, products in mock_data.items():
-            if key in search_lower:
-                mock_products.extend(products)
-                found_match = True
+        credential_scope = f"{date_stamp}/{self.region}/ProductAdvertisingAPI/aws4_request"
+        string_to_sign = f"AWS4-HMAC-SHA256\n{amz_date}\n{credential_scope}\n{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+        k_date = self._sign(f"AWS4{self.secret_key}".encode("utf-8"), date_stamp)
+        k_signing = self._sign(self._sign(self._sign(k_date, self.region), "ProductAdvertisingAPI"), "aws4_request")
+        signature = hmac.new(k_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
         
-        # Use default if no match found
-        if not found_match:
-            mock_products.extend(mock_data["default"])
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{credential_scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+    
+    async def _search_paapi(self, search_term: str, category: str) -> List[AmazonProduct]:
+        """One SearchItems call over the pooled HTTP client"""
+        self._search_counters["remote_searches"] += 1
+        payload = json.dumps({
+            "Keywords": search_term,
+            "SearchIndex": PAAPI_SEARCH_INDEXES.get(category, "GroceryAndGourmetFood"),
+            "ItemCount": 3,
+            "PartnerTag": self.partner_tag,
+            "PartnerType": "Associates",
+            "Marketplace": self.marketplace,
+            "Resources": PAAPI_SEARCH_RESOURCES,
+        })
+        response = await self.http_client.post(
+            f"https://{self.endpoint}{self.uri}",
+            content=payload,
+            headers=self._paapi_headers(payload, "SearchItems")
+        )
+        response.raise_for_status()
         
-        return mock_products
+        products = []
+        for item in response.json().get("SearchResult", {}).get("Items", []):
+            listing = (item.get("Offers", {}).get("Listings") or [{}])[0]
+            products.append(AmazonProduct(
+                asin=item["ASIN"],
+                title=item.get("ItemInfo", {}).get("Title", {}).get("DisplayValue", search_term.title()),
+                price=listing.get("Price", {}).get("Amount", 0.0),
+                image_url=item.get("Images", {}).get("Primary", {}).get("Large", {}).get("URL", ""),
+                detail_url=item.get("DetailPageURL", f"https://{self.marketplace}/dp/{item['ASIN']}"),
+                availability=listing.get("Availability", {}).get("Message", "Unknown")
+            ))
+        return products
+    
+    def search_stats(self) -> Dict[str, Any]:
+        """Search cache counters for monitoring"""
+        return {**self._search_counters, "cached_terms": len(self._search_cache), "live": self.use_paapi}
+    
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
     
     def create_cart(self, items: List[Dict], user_token: Optional[str] = None) -> Dict[str, Any]:
         """Create a cart with the specified items"""
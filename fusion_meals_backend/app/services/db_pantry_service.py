@@ -1,4 +1,7 @@
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from sqlalchemy import and_, case, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Optional
 import uuid
@@ -12,12 +15,22 @@ from app.models.pantry import (
     AddPantryItemRequest,
     UpdatePantryItemRequest,
     MissingIngredientData,
-    RecipeIngredientCheckResponse
+    RecipeIngredientCheckResponse,
+    RecipeIngredients,
+    RecipeCheckResult,
+    MultiRecipeCheckResponse
 )
+from app.services.grocery_aggregator import normalize_name
+from app.services.pantry_index import PantryIndex
+from app.services.quantity_parser import parse_ingredient_quantity
+from app.services.unit_conversion import convert
+
+# Grocery items carry dates as ISO strings; parse them the way request models do
+_DATE = TypeAdapter(Optional[date])
 
 # Helper function to convert DB model to Pydantic model
-def db_to_pydantic_pantry_item(db_item: DBPantryItem) -> PantryItem:
-    """Convert database model to Pydantic model"""
+def db_to_pydantic_pantry_item(db_item: DBPantryItem, status: Optional[str] = None) -> PantryItem:
+    """Convert database model to Pydantic model, optionally with a status computed at read time"""
     return PantryItem(
         id=db_item.id,
         name=db_item.name,
@@ -26,16 +39,70 @@ def db_to_pydantic_pantry_item(db_item: DBPantryItem) -> PantryItem:
         unit=QuantityUnit(db_item.unit),
         purchase_date=db_item.purchase_date,
         expiry_date=db_item.expiry_date,
-        status=PantryItemStatus(db_item.status),
+        status=PantryItemStatus(status or db_item.status),
         threshold_quantity=db_item.threshold_quantity,
         notes=db_item.notes,
         barcode=db_item.barcode
     )
 
+def effective_status(today: Optional[date] = None):
+    """
+    SQL expression for an item's status as of today.
+
+    Stored statuses are set when an item is written; expiry and low stock
+    can change with the date alone, so reads derive them in the query
+    instead of rewriting rows on every GET.
+    """
+    today = today or date.today()
+    return case(
+        (and_(DBPantryItem.expiry_date.isnot(None), DBPantryItem.expiry_date < today), PantryItemStatus.EXPIRED.value),
+        (
+            and_(
+                DBPantryItem.status != PantryItemStatus.OUT_OF_STOCK.value,
+                DBPantryItem.threshold_quantity.isnot(None),
+                DBPantryItem.threshold_quantity != 0,
+                DBPantryItem.quantity <= DBPantryItem.threshold_quantity
+            ),
+            PantryItemStatus.LOW.value
+        ),
+        else_=DBPantryItem.status
+    )
+
+def pantry_items_query(user_id: str, status: Optional[PantryItemStatus] = None) -> Select:
+    """
+    SELECT of a user's items (optionally only those with status) and their
+    statuses derived in SQL.
+
+    The CASE expression can't use an index, so status filters also get a
+    plain-column condition the composite indexes can: expired items are
+    past expiry or stored as expired ((user_id, expiry_date) and (user_id,
+    status)), and statuses the CASE never derives come only from the stored
+    one. Low stock compares two columns, so it narrows by user_id alone.
+    """
+    today = date.today()
+    current_status = effective_status(today)
+    query = select(DBPantryItem, current_status.label("effective_status")).where(DBPantryItem.user_id == user_id)
+    if status == PantryItemStatus.EXPIRED:
+        # user_id in each branch, so each is a range scan on its own index
+        query = query.where(or_(
+            and_(DBPantryItem.user_id == user_id, DBPantryItem.expiry_date < today),
+            and_(DBPantryItem.user_id == user_id, DBPantryItem.status == status.value)
+        ))
+    elif status is not None and status != PantryItemStatus.LOW:
+        query = query.where(DBPantryItem.status == status.value)
+    if status is not None:
+        query = query.where(current_status == status.value)
+    return query
+
+async def _query_with_status(db: AsyncSession, user_id: str, status: Optional[PantryItemStatus] = None) -> List[PantryItem]:
+    """Read-only query of a user's items, with statuses derived in SQL"""
+    result = await db.execute(pantry_items_query(user_id, status))
+    return [db_to_pydantic_pantry_item(item, item_status) for item, item_status in result.all()]
+
 # Get or create user
-async def get_or_create_user(db: Session, user_id: str) -> User:
-    """Get an existing user or create a new one if not found"""
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_or_create_user(db: AsyncSession, user_id: str, commit: bool = True) -> User:
+    """Get an existing user or create a new one if not found (flushed, not committed, when commit is False)"""
+    user = await db.get(User, user_id)
     if not user:
         # Create a new user with the provided ID
         user = User(
@@ -44,31 +111,32 @@ async def get_or_create_user(db: Session, user_id: str) -> User:
             email=f"user_{user_id[:8]}@example.com"  # Placeholder email
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        if commit:
+            await db.commit()
+            await db.refresh(user)
+        else:
+            await db.flush()
     return user
 
+def _derive_status(quantity: float, expiry_date: Optional[date], threshold_quantity: Optional[float]) -> PantryItemStatus:
+    """Status for an item being written, when the caller doesn't give one"""
+    if quantity <= 0:
+        return PantryItemStatus.OUT_OF_STOCK
+    if expiry_date and expiry_date < date.today():
+        return PantryItemStatus.EXPIRED
+    if threshold_quantity and quantity <= threshold_quantity:
+        return PantryItemStatus.LOW
+    return PantryItemStatus.AVAILABLE
+
 # Pantry service functions
-async def get_pantry_inventory(db: Session, user_id: str) -> PantryInventory:
-    """Get the user's pantry inventory from database"""
-    # Ensure the user exists
-    await get_or_create_user(db, user_id)
-    
-    # Get all pantry items for the user
-    db_items = db.query(DBPantryItem).filter(DBPantryItem.user_id == user_id).all()
-    
-    # Update status of items based on expiry dates
-    for item in db_items:
-        if item.expiry_date and item.expiry_date < date.today():
-            item.status = PantryItemStatus.EXPIRED.value
-        elif item.status != PantryItemStatus.OUT_OF_STOCK.value and item.threshold_quantity and item.quantity <= item.threshold_quantity:
-            item.status = PantryItemStatus.LOW.value
+async def get_pantry_inventory(db: AsyncSession, user_id: str) -> PantryInventory:
+    """
+    Get the user's pantry inventory from database.
     
-    # Commit any status changes
-    db.commit()
-    
-    # Convert to Pydantic models
-    items = [db_to_pydantic_pantry_item(item) for item in db_items]
+    A pure read: no user upsert and no commit. Expired and low-stock
+    statuses are computed in the query (see effective_status).
+    """
+    items = await _query_with_status(db, user_id)
     
     return PantryInventory(
         user_id=user_id,
@@ -76,34 +144,26 @@ async def get_pantry_inventory(db: Session, user_id: str) -> PantryInventory:
         last_updated=datetime.now()
     )
 
-async def add_pantry_item(db: Session, user_id: str, item_data: AddPantryItemRequest) -> PantryItem:
+async def add_pantry_item(db: AsyncSession, user_id: str, item_data: AddPantryItemRequest) -> PantryItem:
     """Add a new item to the user's pantry in database"""
     # Ensure the user exists
     await get_or_create_user(db, user_id)
     
     # Determine status if not provided
-    status = item_data.status
-    if not status:
-        if item_data.quantity <= 0:
-            status = PantryItemStatus.OUT_OF_STOCK
-        elif item_data.expiry_date and item_data.expiry_date < date.today():
-            status = PantryItemStatus.EXPIRED
-        elif item_data.threshold_quantity and item_data.quantity <= item_data.threshold_quantity:
-            status = PantryItemStatus.LOW
-        else:
-            status = PantryItemStatus.AVAILABLE
+    status = item_data.status or _derive_status(item_data.quantity, item_data.expiry_date, item_data.threshold_quantity)
     
     # Create a new pantry item
     db_item = DBPantryItem(
         id=str(uuid.uuid4()),
         user_id=user_id,
         name=item_data.name,
+        name_norm=normalize_name(item_data.name),
         category=item_data.category,
         quantity=item_data.quantity,
         unit=item_data.unit.value,
         purchase_date=item_data.purchase_date or date.today(),
         expiry_date=item_data.expiry_date,
-        status=status.value if status else PantryItemStatus.AVAILABLE.value,
+        status=status.value,
         threshold_quantity=item_data.threshold_quantity,
         notes=item_data.notes,
         barcode=item_data.barcode
@@ -111,19 +171,19 @@ async def add_pantry_item(db: Session, user_id: str, item_data: AddPantryItemReq
     
     # Add to database
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
     
     # Return as Pydantic model
     return db_to_pydantic_pantry_item(db_item)
 
-async def update_pantry_item(db: Session, user_id: str, update_data: UpdatePantryItemRequest) -> Optional[PantryItem]:
+async def update_pantry_item(db: AsyncSession, user_id: str, update_data: UpdatePantryItemRequest) -> Optional[PantryItem]:
     """Update an existing pantry item in the database"""
     # Find the item to update
-    db_item = db.query(DBPantryItem).filter(
+    db_item = await db.scalar(select(DBPantryItem).where(
         DBPantryItem.id == update_data.id,
         DBPantryItem.user_id == user_id
-    ).first()
+    ))
     
     if not db_item:
         return None
@@ -131,6 +191,7 @@ async def update_pantry_item(db: Session, user_id: str, update_data: UpdatePantr
     # Update fields that are provided
     if update_data.name:
         db_item.name = update_data.name
+        db_item.name_norm = normalize_name(update_data.name)
     if update_data.category:
         db_item.category = update_data.category
     if update_data.quantity is not None:
@@ -152,100 +213,158 @@ async def update_pantry_item(db: Session, user_id: str, update_data: UpdatePantr
     
     # Automatically update status if not explicitly provided
     if not update_data.status:
-        if db_item.quantity <= 0:
-            db_item.status = PantryItemStatus.OUT_OF_STOCK.value
-        elif db_item.expiry_date and db_item.expiry_date < date.today():
-            db_item.status = PantryItemStatus.EXPIRED.value
-        elif db_item.threshold_quantity and db_item.quantity <= db_item.threshold_quantity:
-            db_item.status = PantryItemStatus.LOW.value
-        else:
-            db_item.status = PantryItemStatus.AVAILABLE.value
+        db_item.status = _derive_status(db_item.quantity, db_item.expiry_date, db_item.threshold_quantity).value
     
     # Save to database
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
     
     # Return as Pydantic model
     return db_to_pydantic_pantry_item(db_item)
 
-async def remove_pantry_item(db: Session, user_id: str, item_id: str) -> bool:
+async def remove_pantry_item(db: AsyncSession, user_id: str, item_id: str) -> bool:
     """Remove an item from the user's pantry in the database"""
     # Find the item to remove
-    db_item = db.query(DBPantryItem).filter(
+    db_item = await db.scalar(select(DBPantryItem).where(
         DBPantryItem.id == item_id,
         DBPantryItem.user_id == user_id
-    ).first()
+    ))
     
     if not db_item:
         return False
     
     # Remove from database
-    db.delete(db_item)
-    db.commit()
+    await db.delete(db_item)
+    await db.commit()
     
     return True
 
-async def get_expired_items(db: Session, user_id: str) -> List[PantryItem]:
+async def get_expired_items(db: AsyncSession, user_id: str) -> List[PantryItem]:
     """Get all expired items in the user's pantry from the database"""
-    db_items = db.query(DBPantryItem).filter(
-        DBPantryItem.user_id == user_id,
-        DBPantryItem.status == PantryItemStatus.EXPIRED.value
-    ).all()
-    
-    return [db_to_pydantic_pantry_item(item) for item in db_items]
+    return await _query_with_status(db, user_id, PantryItemStatus.EXPIRED)
 
-async def get_low_stock_items(db: Session, user_id: str) -> List[PantryItem]:
+async def get_low_stock_items(db: AsyncSession, user_id: str) -> List[PantryItem]:
     """Get all items that are low in stock from the database"""
-    db_items = db.query(DBPantryItem).filter(
-        DBPantryItem.user_id == user_id,
-        DBPantryItem.status == PantryItemStatus.LOW.value
-    ).all()
+    return await _query_with_status(db, user_id, PantryItemStatus.LOW)
+
+async def check_recipe_ingredients(db: AsyncSession, user_id: str, recipe_ingredients: List[Dict[str, str]]) -> RecipeIngredientCheckResponse:
+    """Check if the user has all the ingredients needed for a recipe"""
+    return PantryIndex(await _query_with_status(db, user_id)).check(recipe_ingredients)
+
+async def check_recipes(db: AsyncSession, user_id: str, recipes: List[RecipeIngredients]) -> MultiRecipeCheckResponse:
+    """
+    Check many recipes (e.g. a week's meal plan) against the pantry in one pass.
     
-    return [db_to_pydantic_pantry_item(item) for item in db_items]
+    The pantry is read once into a PantryIndex. Each recipe gets its own
+    result, and the shortfall lists what to buy to make all of them.
+    """
+    index = PantryIndex(await _query_with_status(db, user_id))
+    labels = [recipe.name or f"Recipe {position + 1}" for position, recipe in enumerate(recipes)]
+    responses, shortfall = index.check_many([recipe.ingredients for recipe in recipes], labels)
+    
+    return MultiRecipeCheckResponse(
+        can_make_all=not shortfall,
+        recipes=[
+            RecipeCheckResult(recipe=label, **response.model_dump())
+            for label, response in zip(labels, responses)
+        ],
+        shortfall=shortfall
+    )
 
-async def update_pantry_from_grocery_list(db: Session, user_id: str, grocery_items: List[Dict]) -> List[PantryItem]:
-    """Update pantry inventory after a grocery list purchase using the database"""
-    updated_items = []
+async def update_pantry_from_grocery_list(db: AsyncSession, user_id: str, grocery_items: List[Dict]) -> List[PantryItem]:
+    """
+    Update pantry inventory after a grocery list purchase using the database.
+    
+    All names are resolved in one IN query on the normalized-name column;
+    existing items get the purchased amount added (converted into the
+    item's unit when possible) and new ones are inserted. Changes go out
+    as one executemany UPDATE and one multi-row INSERT, committed in a
+    single transaction. Returns each changed item once.
+    """
+    if not grocery_items:
+        return []
     
-    for grocery_item in grocery_items:
-        # Try to find the item in the pantry
-        db_item = db.query(DBPantryItem).filter(
-            DBPantryItem.user_id == user_id,
-            DBPantryItem.name.ilike(grocery_item["name"])
-        ).first()
+    valid_statuses = {status.value for status in PantryItemStatus}
+    today = date.today()
+    
+    # Ensure the user exists, in the same transaction
+    await get_or_create_user(db, user_id, commit=False)
+    
+    keys = [normalize_name(grocery_item["name"]) for grocery_item in grocery_items]
+    existing: Dict[str, DBPantryItem] = {}
+    for db_item in await db.scalars(select(DBPantryItem).where(
+        DBPantryItem.user_id == user_id,
+        DBPantryItem.name_norm.in_(sorted(set(keys)))
+    ).order_by(DBPantryItem.created_at, DBPantryItem.id)):
+        existing.setdefault(db_item.name_norm, db_item)
+    
+    # New column values per changed row, by normalized name
+    updates: Dict[str, Dict] = {}
+    inserts: Dict[str, Dict] = {}
+    for key, grocery_item in zip(keys, grocery_items):
+        # "2 lbs", or "2" with a separate unit field
+        quantity = parse_ingredient_quantity(grocery_item.get("quantity", 1), grocery_item.get("unit"))
+        purchase_date = _DATE.validate_python(grocery_item.get("purchase_date")) if "purchase_date" in grocery_item else today
+        expiry_date = _DATE.validate_python(grocery_item.get("expiry_date")) if "expiry_date" in grocery_item else None
+        status_value = grocery_item.get("status")
+        status = PantryItemStatus(status_value) if status_value in valid_statuses else None
         
-        if db_item:
-            # Update the existing item
-            update_req = UpdatePantryItemRequest(
-                id=db_item.id,
-                quantity=db_item.quantity + float(grocery_item.get("quantity", 1)),
-                purchase_date=grocery_item.get("purchase_date") if "purchase_date" in grocery_item else date.today(),
-                expiry_date=grocery_item.get("expiry_date") if "expiry_date" in grocery_item else None,
-                status=PantryItemStatus(grocery_item["status"]) if "status" in grocery_item and grocery_item["status"] in [e.value for e in PantryItemStatus] else PantryItemStatus.AVAILABLE
-            )
-            
-            updated_item = await update_pantry_item(db, user_id, update_req)
-            if updated_item:
-                updated_items.append(updated_item)
+        if key in existing or key in inserts:
+            # Add the purchase to the item, in the item's unit when it converts
+            row = inserts.get(key)
+            if row is None:
+                db_item = existing[key]
+                row = updates.setdefault(key, {
+                    "id": db_item.id,
+                    "quantity": db_item.quantity,
+                    "purchase_date": db_item.purchase_date,
+                    "expiry_date": db_item.expiry_date,
+                    "status": db_item.status
+                })
+            unit = QuantityUnit(inserts[key]["unit"] if key in inserts else existing[key].unit)
+            amount = convert(quantity.amount, quantity.unit, unit, key)
+            row["quantity"] += quantity.amount if amount is None else amount
+            if purchase_date:
+                row["purchase_date"] = purchase_date
+            if expiry_date:
+                row["expiry_date"] = expiry_date
+            row["status"] = (status or PantryItemStatus.AVAILABLE).value
         else:
             # Add as a new pantry item
-            unit_value = grocery_item.get("unit", "count")
-            unit = QuantityUnit(unit_value) if unit_value in [e.value for e in QuantityUnit] else QuantityUnit.COUNT
-            
-            status_value = grocery_item.get("status", "available")
-            status = PantryItemStatus(status_value) if status_value in [e.value for e in PantryItemStatus] else None
-            
-            new_item_req = AddPantryItemRequest(
-                name=grocery_item["name"],
-                category=grocery_item.get("category", "Pantry"),
-                quantity=float(grocery_item.get("quantity", 1)),
-                unit=unit,
-                purchase_date=grocery_item.get("purchase_date") if "purchase_date" in grocery_item else date.today(),
-                expiry_date=grocery_item.get("expiry_date") if "expiry_date" in grocery_item else None,
-                status=status
-            )
-            
-            new_item = await add_pantry_item(db, user_id, new_item_req)
-            updated_items.append(new_item)
-    
-    return updated_items 
\ No newline at end of file
+            inserts[key] = {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "name": grocery_item["name"],
+                "name_norm": key,
+                "category": grocery_item.get("category", "Pantry"),
+                "quantity": quantity.amount,
+                "unit": quantity.unit.value,
+                "purchase_date": purchase_date or today,
+                "expiry_date": expiry_date,
+                "status": (status or _derive_status(quantity.amount, expiry_date, None)).value,
+                "threshold_quantity": None,
+                "notes": None,
+                "barcode": None
+            }
+    
+    if updates:
+        await db.execute(update(DBPantryItem), list(updates.values()))
+    if inserts:
+        await db.execute(insert(DBPantryItem), list(inserts.values()))
+    await db.commit()
+    
+    # Changed rows in the order their names first appeared
+    updated_items = []
+    for key in dict.fromkeys(keys):
+        if key in updates:
+            row = {column: value for column, value in updates[key].items() if column != "id"}
+            updated_items.append(db_to_pydantic_pantry_item(existing[key]).model_copy(update={
+                **row, "status": PantryItemStatus(row["status"])
+            }))
+        elif key in inserts:
+            row = inserts[key]
+            updated_items.append(PantryItem(
+                **{column: value for column, value in row.items() if column not in ("user_id", "name_norm")}
+            ))
+    
+    return updated_items
\ No newline at end of file
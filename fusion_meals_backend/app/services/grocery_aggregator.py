@@ -0,0 +1,183 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.pantry import QuantityUnit
+from app.services.grocery_categorizer import grocery_categorizer, REQUIRED_CATEGORIES
+from app.services.grocery_parser import HEADER_PATTERN, iter_extracted_items, missing_category_placeholders
+from app.services.quantity_parser import ParsedQuantity, format_count_label, parse_quantity, split_ingredient_line
+from app.services.unit_conversion import canonical_unit, convert_many
+
+# Items without a known category end up here
+DEFAULT_CATEGORY = "Pantry"
+
+_BULLET_PATTERN = re.compile(r"^\s*(?:[-*•]+|\d+[.)])\s+")
+_PARENTHETICAL_PATTERN = re.compile(r"\([^)]*\)")
+_NON_WORD_PATTERN = re.compile(r"[^\w\s]+")
+_SPACE_PATTERN = re.compile(r"\s+")
+_AS_NEEDED_PATTERN = re.compile(r"[\s,]*\b(?:to taste|as needed|for garnish|optional)\s*$", re.IGNORECASE)
+_STARTS_WITH_QUANTITY = re.compile(r"^\s*[\d½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅛⅜⅝⅞.]")
+
+
+@lru_cache(maxsize=8192)
+def normalize_name(name: str) -> str:
+    """Merge key for an item: "Red Onions (large), chopped" -> "red onion" """
+    name = _PARENTHETICAL_PATTERN.sub(" ", name.lower()).split(",")[0]
+    name = _SPACE_PATTERN.sub(" ", _NON_WORD_PATTERN.sub(" ", name)).strip()
+    words = name.split(" ")
+    words[-1] = singular(words[-1])
+    return " ".join(words)
+
+
+def singular(word: str) -> str:
+    """Naive English singular, shared by merge keys and catalog tokens: "tomatoes" -> "tomato" """
+    if len(word) <= 3 or word.endswith("ss") or word.endswith("us"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _display_name(name: str) -> str:
+    return _SPACE_PATTERN.sub(" ", _PARENTHETICAL_PATTERN.sub(" ", name).split(",")[0]).strip() or name.strip()
+
+
+def iter_list_items(text: str) -> Iterator[Dict[str, str]]:
+    """
+    Extract {"name", "quantity", "original_category"} items from one list.
+
+    Markdown grocery lists (the /parse-recipe format) go through the section
+    parser; plain recipe ingredient lines ("2 cups flour") are split on
+    their leading quantity.
+    """
+    lines = text.split("\n")
+    if any(HEADER_PATTERN.match(line) for line in lines):
+        items = iter_extracted_items(lines)
+    else:
+        items = (
+            {"name": line, "quantity": "", "original_category": None}
+            for line in (_BULLET_PATTERN.sub("", line).strip() for line in lines)
+            if line
+        )
+    for item in items:
+        name, quantity = _split_item(item["name"], item["quantity"])
+        yield {"name": name, "quantity": quantity, "original_category": item["original_category"]}
+
+
+@lru_cache(maxsize=8192)
+def _split_item(name: str, quantity: str) -> Tuple[str, str]:
+    if " - " in name:
+        name, quantity = (part.strip() for part in name.split(" - ", 1))
+    elif not quantity or (quantity == "1" and _STARTS_WITH_QUANTITY.match(name)):
+        as_needed = _AS_NEEDED_PATTERN.search(name)
+        if as_needed and as_needed.start() > 0:
+            name, quantity = name[:as_needed.start()], "as needed"
+        else:
+            name, quantity = split_ingredient_line(name)
+    return name, quantity
+
+
+def format_amount(amount: float, unit: QuantityUnit, label: Optional[str] = None) -> str:
+    text = f"{amount:.2f}".rstrip("0").rstrip(".")
+    if label:
+        return f"{text} {format_count_label(amount, label)}"
+    return text if unit == QuantityUnit.COUNT else f"{text} {unit.value}"
+
+
+@lru_cache(maxsize=8192)
+def _canonical_row(key: str, quantity_text: str) -> Tuple[ParsedQuantity, QuantityUnit, bool]:
+    """(parsed quantity, unit to sum in, whether it has an amount to add)"""
+    quantity = parse_quantity(quantity_text)
+    to_unit = canonical_unit(quantity.unit, key)
+    # "to taste", "as needed": nothing to add up
+    measured = quantity.numeric or quantity.unit != QuantityUnit.COUNT or bool(quantity.label)
+    return quantity, to_unit, measured
+
+
+def aggregate_grocery_lists(ingredient_lists: Iterable[str]) -> List[Dict[str, str]]:
+    """
+    Merge many ingredient lists into one grocery list.
+
+    Items are merged by normalized name. Quantities of the same item are
+    converted to grams or milliliters (grams for both when the ingredient's
+    density is known) in one vectorized call, summed per item with
+    np.bincount, and reported in the unit the item was first listed in.
+    Quantities that can't be converted into each other ("2 cans" and
+    "1 cup"), and counts of different things ("4 cloves" and "1 head"),
+    stay separate rows. Items come back grouped by category in
+    REQUIRED_CATEGORIES order, with a placeholder for any empty category.
+    """
+    group_index: Dict[Tuple[str, QuantityUnit, Optional[str]], int] = {}
+    group_ids: List[int] = []
+    firsts = []  # (name, original category, display unit) per group
+    keys, amounts, from_units, to_units, measured = [], [], [], [], []
+    for text in ingredient_lists:
+        for item in iter_list_items(text):
+            key = normalize_name(item["name"])
+            if not key:
+                continue
+            quantity, to_unit, has_amount = _canonical_row(key, item["quantity"])
+            group = group_index.setdefault((key, to_unit, quantity.label), len(group_index))
+            if group == len(firsts):
+                firsts.append((item["name"], item["original_category"], quantity.unit))
+            group_ids.append(group)
+            keys.append(key)
+            amounts.append(quantity.amount)
+            from_units.append(quantity.unit)
+            to_units.append(to_unit)
+            measured.append(has_amount)
+
+    if not group_ids:
+        return missing_category_placeholders([])
+
+    # Convert every row in one call, then sum per group
+    converted = convert_many(amounts, from_units, to_units, keys)
+    measured_mask = np.asarray(measured)
+    totals = np.bincount(group_ids, weights=np.where(measured_mask, converted, 0.0), minlength=len(firsts))
+    has_total = np.bincount(group_ids, weights=measured_mask, minlength=len(firsts)) > 0
+
+    # Convert every total back to its display unit in one call
+    groups = list(group_index)
+    display_amounts = convert_many(
+        totals,
+        [unit for _, unit, _ in groups],
+        [display_unit for _, _, display_unit in firsts],
+        [key for key, _, _ in groups],
+    )
+
+    # An "as needed" mention is dropped when the item also has a real amount
+    measured_keys = {groups[index][0] for index in np.flatnonzero(has_total)}
+
+    by_category: Dict[str, List[Dict[str, str]]] = {}
+    for index, (key, unit, label) in enumerate(groups):
+        name, original_category, display_unit = firsts[index]
+        if has_total[index]:
+            if np.isnan(display_amounts[index]):
+                quantity_text = format_amount(float(totals[index]), unit, label)
+            else:
+                quantity_text = format_amount(float(display_amounts[index]), display_unit, label)
+        elif key in measured_keys:
+            continue
+        else:
+            quantity_text = "as needed"
+        # Categorize the name as listed, like /parse-recipe; the singular merge
+        # key would miss plural keywords ("eggs", "tomatoes")
+        category = grocery_categorizer.categorize(name.lower()) or original_category or DEFAULT_CATEGORY
+        by_category.setdefault(category, []).append(
+            {"name": _display_name(name), "quantity": quantity_text, "category": category}
+        )
+
+    # Placeholders keep the six required categories present, in order
+    placeholders = {item["category"]: item for item in missing_category_placeholders(by_category)}
+    items = []
+    for category in REQUIRED_CATEGORIES:
+        items.extend(by_category.get(category) or [placeholders[category]])
+    for category in sorted(set(by_category) - set(REQUIRED_CATEGORIES)):
+        items.extend(by_category[category])
+    return items
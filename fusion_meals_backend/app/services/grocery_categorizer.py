@@ -0,0 +1,139 @@
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Optional
+
+# Categories every parsed grocery list must contain
+REQUIRED_CATEGORIES = ["Produce", "Meat & Seafood", "Dairy & Eggs", "Pantry", "Spices & Seasonings", "Beverages"]
+
+# Common items for each category to help with categorization
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "Produce": ["cabbage", "tomatoes", "cucumbers", "spinach", "greens", "cauliflower", "mushrooms",
+               "eggplant", "berries", "lettuce", "onion", "garlic", "potato", "carrot", "pepper", "broccoli",
+               "ginger", "chili", "coriander", "cilantro", "lemon", "lime", "fruit", "vegetable", "beans",
+               "zucchini", "squash", "peas", "corn", "asparagus", "brussels", "kale", "celery", "radish",
+               "avocado", "apple", "banana", "orange", "grape", "melon", "berry", "salad"],
+    "Meat & Seafood": ["chicken", "beef", "pork", "lamb", "fish", "salmon", "shrimp", "tofu", "tempeh", "seitan",
+                      "meat", "seafood", "turkey", "duck", "sausage", "bacon", "ham", "steak", "ground"],
+    "Dairy & Eggs": ["milk", "cheese", "yogurt", "butter", "cream", "eggs", "paneer", "cottage cheese", "sour cream",
+                    "dairy", "curd", "ghee", "buttermilk", "kefir", "whey", "ricotta", "mozzarella", "cheddar"],
+    "Pantry": ["rice", "pasta", "flour", "sugar", "oil", "vinegar", "sauce", "canned", "dried",
+              "bread", "cereal", "grain", "nut", "seed", "noodle", "cracker", "chip", "snack",
+              "honey", "syrup", "jam", "peanut butter", "condiment"],
+    "Spices & Seasonings": ["salt", "pepper", "cumin", "turmeric", "paprika", "cinnamon", "oregano", "basil", "thyme",
+                           "spice", "herb", "seasoning", "masala", "powder", "extract", "vanilla", "bay leaf",
+                           "chili powder", "curry", "garam masala", "cardamom", "clove", "nutmeg"],
+    "Beverages": ["water", "juice", "soda", "coffee", "tea", "wine", "beer", "drink", "beverage", "smoothie",
+                 "cocktail", "liquor", "spirit", "kombucha", "lemonade", "cider"]
+}
+
+# Special case items that need specific categorization; these win over any category keyword
+SPECIAL_CASES: Dict[str, str] = {
+    "paneer": "Dairy & Eggs",
+    "tofu": "Meat & Seafood",
+    "tempeh": "Meat & Seafood",
+    "seitan": "Meat & Seafood",
+    "yogurt": "Dairy & Eggs",
+    "curd": "Dairy & Eggs",
+    "ghee": "Dairy & Eggs"
+}
+
+# Categories are tried in this order, so items like "green beans" go to Produce instead of Pantry
+CATEGORY_PRIORITY = ["Dairy & Eggs", "Meat & Seafood", "Produce", "Spices & Seasonings", "Pantry", "Beverages"]
+
+_NO_MATCH = 1 << 30
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a keyword -> score lexicon.
+
+    best_score() scans a string once and returns the lowest score of any
+    keyword occurring in it as a substring. Each state stores the best
+    score reachable through its failure chain, so no output walk is
+    needed at match time.
+    """
+
+    def __init__(self, scores: Dict[str, int]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._best: List[int] = [_NO_MATCH]
+
+        for keyword, score in scores.items():
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._best.append(_NO_MATCH)
+                state = next_state
+            self._best[state] = min(self._best[state], score)
+
+        # Breadth-first pass to set failure links and fold their scores in
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._best[next_state] = min(self._best[next_state], self._best[self._fail[next_state]])
+                queue.append(next_state)
+
+    def best_score(self, text: str) -> Optional[int]:
+        goto, fail, best_scores = self._goto, self._fail, self._best
+        state = 0
+        best = _NO_MATCH
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best_scores[state] < best:
+                best = best_scores[state]
+        return best if best != _NO_MATCH else None
+
+
+class GroceryCategorizer:
+    """
+    Assigns grocery items to a store category in one pass over the name.
+
+    Every keyword gets a score: special cases score by their position in
+    SPECIAL_CASES, category keywords score len(SPECIAL_CASES) + the
+    category's position in CATEGORY_PRIORITY. The lowest score found wins,
+    which matches trying special cases first and then categories in
+    priority order.
+    """
+
+    def __init__(
+        self,
+        category_keywords: Dict[str, List[str]] = CATEGORY_KEYWORDS,
+        special_cases: Dict[str, str] = SPECIAL_CASES,
+        category_priority: List[str] = CATEGORY_PRIORITY,
+        cache_size: int = 4096,
+    ):
+        scores: Dict[str, int] = {}
+        self._score_categories: Dict[int, str] = {}
+
+        def add(keyword: str, score: int, category: str):
+            keyword = keyword.lower()
+            scores[keyword] = min(scores.get(keyword, _NO_MATCH), score)
+            self._score_categories[score] = category
+
+        for index, (keyword, category) in enumerate(special_cases.items()):
+            add(keyword, index, category)
+        for rank, category in enumerate(category_priority):
+            for keyword in category_keywords.get(category, []):
+                add(keyword, len(special_cases) + rank, category)
+
+        self._automaton = KeywordAutomaton(scores)
+        self.categorize = lru_cache(maxsize=cache_size)(self._categorize)
+
+    def _categorize(self, name: str) -> Optional[str]:
+        score = self._automaton.best_score(name.lower())
+        return self._score_categories[score] if score is not None else None
+
+
+# Shared categorizer, built once at import
+grocery_categorizer = GroceryCategorizer()
@@ -0,0 +1,136 @@
+import re
+import codecs
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.services.grocery_categorizer import grocery_categorizer, REQUIRED_CATEGORIES
+
+# "## Produce" or "# Produce" starts a new section. A bare "#"/"##" header
+# takes its name from the next non-blank line.
+HEADER_PATTERN = re.compile(r'^##?(?:\s+|$)')
+# Only "##" headers are recognized on the very first line
+FIRST_HEADER_PATTERN = re.compile(r'^##(?:\s+|$)')
+
+
+def parse_item_line(line: str) -> Optional[Tuple[str, str]]:
+    """Split one grocery line into (name, quantity); None for blank lines"""
+    # Format 1: "- Item - Quantity"
+    if line.startswith('-'):
+        line = line[1:].strip()
+
+    # Format 2: "Item - Quantity"
+    if ' - ' in line:
+        name, quantity = line.split(' - ', 1)
+        return name.strip(), quantity.strip()
+
+    # Format 3: Just try to split on last hyphen
+    if '-' in line:
+        last_hyphen = line.rfind('-')
+        name = line[:last_hyphen].strip()
+        quantity = line[last_hyphen+1:].strip()
+        if name and quantity:
+            return name, quantity
+
+    # Format 4: Just use the whole line as the item name
+    name = line.strip()
+    return (name, "1") if name else None
+
+
+class GrocerySectionParser:
+    """
+    Incremental parser for markdown grocery lists, fed one line at a time.
+
+    The first non-blank line and every "# "/"## " header name a category;
+    the lines under it are items. Memory use doesn't depend on input size.
+    """
+
+    def __init__(self):
+        self.category: Optional[str] = None
+        self._started = False
+        self._expect_category = False
+
+    def _header(self, match: "re.Match", line: str):
+        name = line[match.end():]
+        if name.strip():
+            self.category = name.replace(':', '').strip()
+        else:
+            self._expect_category = True
+
+    def feed(self, raw_line: str) -> Optional[Dict[str, str]]:
+        """Consume a line and return the item it contains, if any"""
+        if not self._started or self._expect_category:
+            if not raw_line.strip():
+                return None
+            if not self._started:
+                self._started = True
+                match = FIRST_HEADER_PATTERN.match(raw_line.lstrip())
+                if match:
+                    self._header(match, raw_line.lstrip())
+                    return None
+            self._expect_category = False
+            self.category = raw_line.strip().replace(':', '').strip()
+            return None
+
+        match = HEADER_PATTERN.match(raw_line)
+        if match:
+            self._header(match, raw_line)
+            return None
+
+        line = raw_line.strip()
+        # Skip items without a valid category
+        if not self.category or not line or line.startswith('#'):
+            return None
+
+        parsed = parse_item_line(line)
+        if parsed is None:
+            return None
+        return {"name": parsed[0], "quantity": parsed[1], "original_category": self.category}
+
+
+def categorize_items(items: Iterable[Dict[str, str]], seen: Optional[Set[str]] = None) -> Iterator[Dict[str, str]]:
+    """Assign each extracted item its store category, dropping repeated names"""
+    seen = set() if seen is None else seen
+    for item in items:
+        item_lower = item["name"].lower()
+        if item_lower in seen:
+            continue
+        seen.add(item_lower)
+        # Special cases first, then categories in priority order; else keep the section's category
+        category = grocery_categorizer.categorize(item_lower) or item["original_category"]
+        yield {"name": item["name"], "quantity": item["quantity"], "category": category}
+
+
+def iter_extracted_items(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    parser = GrocerySectionParser()
+    for line in lines:
+        item = parser.feed(line)
+        if item is not None:
+            yield item
+
+
+def iter_grocery_items(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Parse and categorize grocery list lines, one item at a time"""
+    return categorize_items(iter_extracted_items(lines))
+
+
+def missing_category_placeholders(categories: Iterable[str]) -> List[Dict[str, str]]:
+    """Placeholder items so every required category appears in the output"""
+    present = set(categories)
+    return [
+        {"name": f"No {category.lower()} items needed", "quantity": "", "category": category}
+        for category in REQUIRED_CATEGORIES
+        if category not in present
+    ]
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Reassemble a chunked UTF-8 body into lines"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
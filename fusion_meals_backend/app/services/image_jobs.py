@@ -0,0 +1,96 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("image_jobs")
+
+# Finished jobs are kept this long so clients can poll for the result
+JOB_TTL_SECONDS = int(os.getenv("IMAGE_JOB_TTL_SECONDS", "3600"))
+MAX_JOBS = int(os.getenv("IMAGE_JOB_MAX_JOBS", "1000"))
+
+
+class ImageJob:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.status = "pending"  # pending -> ready | failed
+        self.image_url: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.task: Optional["asyncio.Task"] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "image_url": self.image_url,
+            "error": self.error,
+        }
+
+
+class ImageJobManager:
+    """
+    Runs image generations as background tasks addressable by job id.
+
+    Routers submit a coroutine factory and return the job id immediately;
+    clients poll get() (via /recipes/images/{job_id}) until the job is
+    ready or failed. Old jobs are dropped after JOB_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: int = JOB_TTL_SECONDS, max_jobs: int = MAX_JOBS):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, ImageJob]" = OrderedDict()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if job.created_at >= cutoff and len(self._jobs) < self.max_jobs:
+                break
+            self._jobs.popitem(last=False)
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    async def _run(self, job: ImageJob, generate: Callable[[], Awaitable[Optional[str]]]):
+        try:
+            job.image_url = await generate()
+            if job.image_url:
+                job.status = "ready"
+            else:
+                job.status = "failed"
+                job.error = "No image was generated"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Image job {job.job_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+
+    def submit(self, generate: Callable[[], Awaitable[Optional[str]]]) -> ImageJob:
+        """Start generate() in the background and return its job"""
+        self._prune()
+        job = ImageJob(uuid.uuid4().hex)
+        job.task = asyncio.create_task(self._run(job, generate))
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ImageJob]:
+        """Look up a job by id"""
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts by status for monitoring"""
+        counts = {"pending": 0, "ready": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+
+# Shared job manager used by the recipe routers
+image_jobs = ImageJobManager()
@@ -0,0 +1,175 @@
+import os
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
+
+import httpx
+
+from app.llm import single_flight
+
+logger = logging.getLogger("image_store")
+
+DEFAULT_IMAGE_DIR = os.getenv("IMAGE_STORE_DIR", "data/images")
+DEFAULT_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Prefix for the URLs handed to clients, e.g. https://api.example.com.
+# Empty means URLs are relative to this API (/images/{hash}).
+PUBLIC_BASE_URL = os.getenv("IMAGE_STORE_PUBLIC_URL", "").rstrip("/")
+
+_MEDIA_TYPES = [
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"RIFF", "image/webp"),
+]
+
+
+def image_key(recipe_name: str, cuisine1: str, cuisine2: str, variant: str = "") -> str:
+    """Content address for a recipe image: the normalized prompt inputs, hashed"""
+    parts = [recipe_name, cuisine1, cuisine2, variant]
+    normalized = "|".join(" ".join(part.lower().split()) for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def sniff_media_type(head: bytes) -> str:
+    """Guess an image media type from its first bytes"""
+    for magic, media_type in _MEDIA_TYPES:
+        if head.startswith(magic):
+            return media_type
+    return "application/octet-stream"
+
+
+class ImageStore:
+    """
+    Size-bounded local store for generated images.
+
+    Images are keyed by image_key() and written once; since a key's bytes
+    never change, the key doubles as a strong ETag. File mtimes track last
+    use, and the least recently used files are evicted once the directory
+    grows past max_bytes.
+    """
+
+    def __init__(self, root: str = DEFAULT_IMAGE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._counters = {"hits": 0, "misses": 0, "stored": 0, "evictions": 0, "download_failures": 0}
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=30)
+        return self._http_client
+
+    def path_for(self, key: str) -> Optional[str]:
+        """Filesystem path for a key, or None if the key isn't a valid hash"""
+        if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+            return None
+        return os.path.join(self.root, key)
+
+    def public_url(self, key: str) -> str:
+        return f"{PUBLIC_BASE_URL}/images/{key}"
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the public URL for a stored image and mark it as recently used"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except (OSError, TypeError):
+            self._counters["misses"] += 1
+            return None
+        self._counters["hits"] += 1
+        return self.public_url(key)
+
+    def _scan(self) -> int:
+        os.makedirs(self.root, exist_ok=True)
+        return sum(entry.stat().st_size for entry in os.scandir(self.root) if entry.is_file())
+
+    def _write(self, key: str, data: bytes):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path_for(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _evict(self, keep: str) -> int:
+        """Delete least recently used files until under budget; returns bytes freed"""
+        entries = sorted(
+            (entry for entry in os.scandir(self.root) if entry.is_file() and entry.name != keep),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        freed = 0
+        for entry in entries:
+            if self._total_bytes - freed <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            freed += size
+            self._counters["evictions"] += 1
+        return freed
+
+    async def store(self, key: str, data: bytes) -> str:
+        """Persist image bytes under key and return its public URL"""
+        async with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = await asyncio.to_thread(self._scan)
+            await asyncio.to_thread(self._write, key, data)
+            self._total_bytes += len(data)
+            self._counters["stored"] += 1
+            if self._total_bytes > self.max_bytes:
+                self._total_bytes -= await asyncio.to_thread(self._evict, key)
+        return self.public_url(key)
+
+    async def _download_and_store(self, key: str, url: str) -> str:
+        response = await self.http_client.get(url)
+        response.raise_for_status()
+        return await self.store(key, response.content)
+
+    async def get_or_create(self, key: str, generate: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Return the stored image for key, generating and persisting it on a miss.
+
+        generate() returns a (temporary) remote image URL. If the download
+        fails, that remote URL is returned as-is so the caller still gets an
+        image. Concurrent misses for the same key share one generation.
+        """
+        stored_url = self.lookup(key)
+        if stored_url:
+            return stored_url
+
+        async def create() -> Optional[str]:
+            remote_url = await generate()
+            if not remote_url:
+                return None
+            try:
+                return await self._download_and_store(key, remote_url)
+            except (httpx.HTTPError, OSError) as e:
+                logger.warning(f"Could not persist image {key}: {str(e)}")
+                self._counters["download_failures"] += 1
+                return remote_url
+
+        return await single_flight.run(f"image:{key}", create)
+
+    async def read(self, key: str) -> Optional[Tuple[str, str]]:
+        """Return (path, media_type) for a stored image, or None"""
+        path = self.path_for(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            head = f.read(16)
+        return path, sniff_media_type(head)
+
+    def stats(self) -> Dict[str, Any]:
+        """Store counters for monitoring"""
+        return {**self._counters, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+
+
+# Shared image store used by the recipe routers
+image_store = ImageStore()
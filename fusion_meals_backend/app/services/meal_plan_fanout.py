@@ -0,0 +1,220 @@
+import os
+import re
+import asyncio
+import logging
+from typing import List, Dict, Any, Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger("meal_plan_fanout")
+
+T = TypeVar("T")
+
+WEEK_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MEAL_TYPES = ["breakfast", "lunch", "dinner"]
+GROCERY_SECTIONS = ["produce", "protein", "dairy", "grains", "other"]
+
+# How many day generations run at once. Seven lets a whole week go out in one
+# wave; lower it if the OpenAI account's rate limits are tight.
+DEFAULT_CONCURRENCY = int(os.getenv("AI_CHEF_FANOUT_CONCURRENCY", "7"))
+
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+async def fan_out(
+    jobs: List[Callable[[], Awaitable[T]]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = 1,
+) -> List[T]:
+    """
+    Run jobs concurrently, at most `concurrency` at a time, preserving order.
+
+    Each job is retried up to `retries` times before its exception propagates;
+    the first failure cancels the jobs that are still running.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, job: Callable[[], Awaitable[T]]) -> T:
+        async with semaphore:
+            for attempt in range(retries + 1):
+                try:
+                    return await job()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if attempt == retries:
+                        raise
+                    logger.warning(f"Fan-out job {index} failed ({str(e)}), retrying")
+
+    tasks = [asyncio.ensure_future(run(i, job)) for i, job in enumerate(jobs)]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """Pull the first number out of an LLM value like "450 kcal" or "25g" """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER_PATTERN.search(value.replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def _mapping(value: Any, scalar_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    An LLM value that should be an object. A bare number or string ("30g")
+    becomes {scalar_key: value} when scalar_key is given; anything else that
+    isn't a dict is treated as empty.
+    """
+    if isinstance(value, dict):
+        return value
+    if scalar_key is not None and isinstance(value, (int, float, str)):
+        return {scalar_key: value}
+    return {}
+
+
+def _string_list(value: Any) -> List[str]:
+    """Sources given as a list, or as one comma-separated string"""
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",")]
+    return list(value) if isinstance(value, list) else []
+
+
+def _average(values: List[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return sum(present) / len(present) if present else None
+
+
+def _format_amount(value: Optional[float], suffix: str = "") -> str:
+    return f"{round(value)}{suffix}" if value is not None else ""
+
+
+def _unique(items: List[str], limit: Optional[int] = None) -> List[str]:
+    """De-duplicate case-insensitively, keeping first-seen order"""
+    seen = set()
+    result = []
+    for item in items:
+        if not isinstance(item, str) or not item.strip():
+            continue
+        key = item.strip().lower()
+        if key not in seen:
+            seen.add(key)
+            result.append(item.strip())
+    return result[:limit] if limit else result
+
+
+def _meal_calories(day: Dict[str, Any], meal_type: str) -> Optional[float]:
+    if meal_type == "snacks":
+        snacks = [parse_number(snack.get("calories")) for snack in day.get("snacks", []) if isinstance(snack, dict)]
+        snacks = [s for s in snacks if s is not None]
+        return sum(snacks) if snacks else None
+    meal = day.get(meal_type)
+    return parse_number(meal.get("calories")) if isinstance(meal, dict) else None
+
+
+def summarize_nutrition(day_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Recompute the weekly nutrition_summary from the per-day nutrition blocks.
+
+    Daily values are averaged across the week; macro ratios are derived from
+    the averaged grams (4/4/9 kcal per gram) rather than trusted from the model.
+    """
+    nutrition = [_mapping(result.get("nutrition")) for result in day_results]
+    days = [_mapping(result.get("day")) for result in day_results]
+
+    calories = _average([parse_number(n.get("calories")) for n in nutrition])
+    if calories is None:
+        calories = _average([
+            sum(filter(None, (_meal_calories(day, meal) for meal in MEAL_TYPES + ["snacks"]))) or None
+            for day in days
+        ])
+
+    daily_macros: Dict[str, Any] = {
+        "calories_breakdown": {
+            meal: _format_amount(_average([_meal_calories(day, meal) for day in days]))
+            for meal in MEAL_TYPES + ["snacks"]
+        }
+    }
+    grams: Dict[str, Optional[float]] = {}
+    for macro in ["protein", "carbohydrates", "fats", "fiber"]:
+        # A macro may come back as just its amount: "protein": "30g"
+        blocks = [_mapping(n.get(macro), "grams") for n in nutrition]
+        grams[macro] = _average([parse_number(block.get("grams")) for block in blocks])
+        sources: List[str] = []
+        for block in blocks:
+            sources.extend(_string_list(block.get("sources")))
+        daily_macros[macro] = {"grams": _format_amount(grams[macro]), "sources": _unique(sources, limit=5)}
+
+    macro_calories = {
+        "protein_ratio": (grams["protein"] or 0) * 4,
+        "carb_ratio": (grams["carbohydrates"] or 0) * 4,
+        "fat_ratio": (grams["fats"] or 0) * 9,
+    }
+    macro_total = sum(macro_calories.values())
+    ratios = {
+        key: f"{round(100 * value / macro_total)}%" if macro_total else ""
+        for key, value in macro_calories.items()
+    }
+
+    micronutrients: Dict[str, str] = {}
+    daily_micronutrients = [_mapping(n.get("micronutrients")) for n in nutrition]
+    nutrient_keys = _unique([key for values in daily_micronutrients for key in values])
+    for key in nutrient_keys:
+        values = [day_values.get(key) for day_values in daily_micronutrients]
+        if key.endswith("_sources"):
+            sources = []
+            for value in values:
+                if isinstance(value, str):
+                    sources.extend(part.strip() for part in value.split(","))
+            micronutrients[key] = ", ".join(_unique(sources, limit=3))
+        else:
+            average = _average([parse_number(value) for value in values])
+            micronutrients[key] = f"{round(average)}% DV" if average is not None else ""
+
+    return {
+        "average_daily_calories": _format_amount(calories),
+        **ratios,
+        "daily_macros": daily_macros,
+        "micronutrients": micronutrients,
+    }
+
+
+def merge_weekly_meal_plan(day_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-day generations into the weekly meal plan response schema.
+
+    Each result is expected to carry "day", "nutrition", "grocery_items",
+    "estimated_cost", "prep_ahead" and "storage_tips" keys; anything missing
+    is treated as empty.
+    """
+    grocery_list: Dict[str, List[str]] = {section: [] for section in GROCERY_SECTIONS}
+    prep_instructions: List[str] = []
+    storage_tips: List[str] = []
+    total_cost = 0.0
+    cost_found = False
+
+    for result in day_results:
+        for section, items in _mapping(result.get("grocery_items")).items():
+            section = section if section in grocery_list else "other"
+            grocery_list[section].extend(_string_list(items))
+        prep_instructions.extend(result.get("prep_ahead", []) or [])
+        storage_tips.extend(result.get("storage_tips", []) or [])
+        cost = parse_number(result.get("estimated_cost"))
+        if cost is not None:
+            total_cost += cost
+            cost_found = True
+
+    return {
+        "meal_plan": {"days": [result.get("day", {}) for result in day_results]},
+        "grocery_list": {section: _unique(items) for section, items in grocery_list.items()},
+        "meal_prep_guide": {
+            "day": "Sunday",
+            "instructions": _unique(prep_instructions, limit=8),
+            "storage_tips": _unique(storage_tips, limit=6),
+        },
+        "estimated_total_cost": f"${total_cost:.2f}" if cost_found else "",
+        "nutrition_summary": summarize_nutrition(day_results),
+    }
@@ -0,0 +1,204 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.pantry import (
+    PantryItem,
+    PantryItemStatus,
+    QuantityUnit,
+    MissingIngredientData,
+    RecipeIngredientCheckResponse,
+    IngredientShortfall,
+)
+from app.services.grocery_aggregator import normalize_name
+from app.services.quantity_parser import ParsedQuantity, parse_ingredient_quantity
+from app.services.unit_conversion import canonical_unit, convert, convert_many
+
+
+class _Stock:
+    """Pantry items of one name whose quantities add up in one unit"""
+    __slots__ = ("unit", "quantity", "items")
+
+    def __init__(self, unit: QuantityUnit):
+        self.unit = unit
+        self.quantity = 0.0
+        self.items: List[PantryItem] = []
+
+    def as_item(self) -> PantryItem:
+        """The item to report: the pantry item itself, or a merged copy of several"""
+        if len(self.items) == 1:
+            return self.items[0]
+        return self.items[0].model_copy(update={"quantity": round(self.quantity, 4), "unit": self.unit})
+
+
+class _Requirement:
+    __slots__ = ("recipe", "key", "name", "quantity", "stock", "amount")
+
+    def __init__(self, recipe: int, key: str, name: str, quantity: ParsedQuantity):
+        self.recipe = recipe
+        self.key = key
+        self.name = name
+        self.quantity = quantity
+        self.stock: Optional[_Stock] = None
+        self.amount = quantity.amount  # In the stock's unit once matched
+
+
+class PantryIndex:
+    """
+    A user's pantry loaded once for answering ingredient checks.
+
+    Items are keyed by normalized name ("Red Onions" and "red onion" are
+    the same key) and their quantities converted to a canonical unit and
+    summed (grams, milliliters, or the item's own count/container unit).
+    Expired items are left out. Checks look names up in the hash index
+    and convert every requirement in one vectorized call, so checking a
+    week of recipes costs one pass over their ingredients.
+    """
+
+    def __init__(self, items: Iterable[PantryItem]):
+        usable = [item for item in items if item.status != PantryItemStatus.EXPIRED]
+        keys = [normalize_name(item.name) for item in usable]
+        units = [canonical_unit(item.unit, key) for item, key in zip(usable, keys)]
+        amounts = convert_many([item.quantity for item in usable], [item.unit for item in usable], units, keys)
+
+        self._stocks: Dict[str, List[_Stock]] = {}
+        for item, key, unit, amount in zip(usable, keys, units, amounts.tolist()):
+            stocks = self._stocks.setdefault(key, [])
+            stock = next((stock for stock in stocks if stock.unit == unit), None)
+            if stock is None:
+                stock = _Stock(unit)
+                stocks.append(stock)
+            stock.quantity += amount
+            stock.items.append(item)
+
+    def __len__(self) -> int:
+        return len(self._stocks)
+
+    def _resolve(self, requirements: List[_Requirement]):
+        """Match each requirement to a stock and convert it into that stock's unit"""
+        pairs: List[Tuple[_Requirement, _Stock]] = [
+            (requirement, stock) for requirement in requirements for stock in self._stocks.get(requirement.key, ())
+        ]
+        if not pairs:
+            return
+        converted = convert_many(
+            [requirement.quantity.amount for requirement, _ in pairs],
+            [requirement.quantity.unit for requirement, _ in pairs],
+            [stock.unit for _, stock in pairs],
+            [requirement.key for requirement, _ in pairs],
+        )
+        for (requirement, stock), amount in zip(pairs, converted.tolist()):
+            if requirement.stock is None and not np.isnan(amount):
+                requirement.stock, requirement.amount = stock, amount
+        # Units that can't be converted (cups vs cans) are compared as-is
+        for requirement in requirements:
+            if requirement.stock is None and requirement.key in self._stocks:
+                requirement.stock = self._stocks[requirement.key][0]
+
+    def check_many(
+        self, recipes: Sequence[Sequence[Dict[str, str]]], labels: Optional[Sequence[str]] = None
+    ) -> Tuple[List[RecipeIngredientCheckResponse], List[IngredientShortfall]]:
+        """
+        Check every recipe against the pantry.
+
+        Returns one response per recipe (each recipe checked on its own)
+        and the combined shortfall: what's missing or short when all the
+        recipes are made from the same pantry.
+        """
+        labels = list(labels) if labels is not None else [f"Recipe {index + 1}" for index in range(len(recipes))]
+        requirements = []
+        for recipe_index, ingredients in enumerate(recipes):
+            for ingredient in ingredients:
+                name = (ingredient.get("name") or "").strip()
+                key = normalize_name(name)
+                if not key:
+                    continue
+                # "1 1/2" + "cups", or "1 1/2 cups" with no unit field
+                quantity = parse_ingredient_quantity(ingredient.get("quantity", "1"), ingredient.get("unit"))
+                requirements.append(_Requirement(recipe_index, key, name, quantity))
+        self._resolve(requirements)
+
+        responses = [RecipeIngredientCheckResponse(can_make_recipe=True) for _ in recipes]
+        for requirement in requirements:
+            response = responses[requirement.recipe]
+            if requirement.stock is None:
+                response.missing_ingredients.append(MissingIngredientData(
+                    ingredient=PantryItem(
+                        id=None,
+                        name=requirement.name,
+                        category="Unknown",  # We don't know the category
+                        quantity=0,
+                        unit=requirement.quantity.unit,
+                        status=PantryItemStatus.OUT_OF_STOCK
+                    ),
+                    required_quantity=requirement.quantity.amount,
+                    required_unit=requirement.quantity.unit,
+                    sufficient=False
+                ))
+            elif requirement.stock.quantity >= requirement.amount:
+                response.available_ingredients.append(requirement.stock.as_item())
+            else:
+                response.insufficient_ingredients.append(MissingIngredientData(
+                    ingredient=requirement.stock.as_item(),
+                    required_quantity=requirement.quantity.amount,
+                    required_unit=requirement.quantity.unit,
+                    sufficient=False
+                ))
+        for response in responses:
+            response.can_make_recipe = not response.missing_ingredients and not response.insufficient_ingredients
+
+        return responses, self._shortfall(requirements, labels)
+
+    def check(self, recipe_ingredients: Sequence[Dict[str, str]]) -> RecipeIngredientCheckResponse:
+        """Check a single recipe"""
+        responses, _ = self.check_many([recipe_ingredients])
+        return responses[0]
+
+    def _shortfall(self, requirements: List[_Requirement], labels: Sequence[str]) -> List[IngredientShortfall]:
+        # Demand per stock and count label ("4 cloves" and "1 head" don't add
+        # up), plus per missing name in the unit it was first asked for
+        demand: Dict[Tuple[int, str], List] = {}
+        missing: Dict[str, List[List]] = {}
+        for requirement in requirements:
+            label = requirement.quantity.label
+            if requirement.stock is not None:
+                entry = demand.setdefault((id(requirement.stock), label), [requirement.stock, 0.0, set(), label])
+                entry[1] += requirement.amount
+                entry[2].add(requirement.recipe)
+                continue
+            entries = missing.setdefault(requirement.key, [])
+            for entry in entries:
+                if entry[4] != label:
+                    continue
+                amount = convert(requirement.quantity.amount, requirement.quantity.unit, entry[1], requirement.key)
+                if amount is not None:
+                    entry[2] += amount
+                    entry[3].add(requirement.recipe)
+                    break
+            else:
+                entries.append([requirement.name, requirement.quantity.unit, requirement.quantity.amount, {requirement.recipe}, label])
+
+        shortfall = []
+        for stock, required, recipes, label in demand.values():
+            if required > stock.quantity + 1e-9:
+                shortfall.append(IngredientShortfall(
+                    name=stock.items[0].name,
+                    unit=stock.unit,
+                    count_label=label,
+                    required_quantity=round(required, 4),
+                    available_quantity=round(stock.quantity, 4),
+                    shortfall_quantity=round(required - stock.quantity, 4),
+                    recipes=[labels[index] for index in sorted(recipes)]
+                ))
+        for entries in missing.values():
+            for name, unit, required, recipes, label in entries:
+                shortfall.append(IngredientShortfall(
+                    name=name,
+                    unit=unit,
+                    count_label=label,
+                    required_quantity=round(required, 4),
+                    available_quantity=0.0,
+                    shortfall_quantity=round(required, 4),
+                    recipes=[labels[index] for index in sorted(recipes)]
+                ))
+        return shortfall
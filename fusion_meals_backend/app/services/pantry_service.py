@@ -12,6 +12,8 @@ from app.models.pantry import (
     MissingIngredientData,
     RecipeIngredientCheckResponse
 )
+from app.services.quantity_parser import parse_ingredient_quantity
+from app.services.pantry_index import PantryIndex
 
 # Mock database for development
 MOCK_PANTRY_DB: Dict[str, PantryInventory] = {}
@@ -263,91 +265,7 @@ async def get_low_stock_items(user_id: str) -> List[PantryItem]:
 async def check_recipe_ingredients(user_id: str, recipe_ingredients: List[Dict[str, str]]) -> RecipeIngredientCheckResponse:
     """Check if the user has all the ingredients needed for a recipe"""
     inventory = await get_pantry_inventory(user_id)
-    
-    # Prepare response
-    response = RecipeIngredientCheckResponse(can_make_recipe=False)
-    
-    # Helper function to normalize ingredient names for comparison
-    def normalize_name(name: str) -> str:
-        return name.lower().strip()
-    
-    # Helper function to convert units if needed
-    def convert_units(quantity: float, from_unit: QuantityUnit, to_unit: QuantityUnit) -> float:
-        # For simplicity, we're only handling direct matches
-        # In a real app, you'd have a more sophisticated unit conversion system
-        if from_unit == to_unit:
-            return quantity
-        
-        # TODO: Implement unit conversions as needed
-        return quantity  # For now, just return the original quantity
-    
-    missing = []
-    insufficient = []
-    available = []
-    
-    for ingredient_data in recipe_ingredients:
-        ingredient_name = normalize_name(ingredient_data["name"])
-        try:
-            required_quantity = float(ingredient_data.get("quantity", "1"))
-        except ValueError:
-            required_quantity = 1.0
-            
-        required_unit = ingredient_data.get("unit", "count")
-        
-        # Try to find the ingredient in the pantry
-        found = False
-        for pantry_item in inventory.items:
-            if normalize_name(pantry_item.name) == ingredient_name and pantry_item.status != PantryItemStatus.EXPIRED:
-                found = True
-                
-                # Check if there's enough
-                # In real implementation, handle unit conversions
-                converted_quantity = convert_units(
-                    required_quantity, 
-                    QuantityUnit(required_unit) if required_unit in [e.value for e in QuantityUnit] else QuantityUnit.OTHER,
-                    pantry_item.unit
-                )
-                
-                if pantry_item.quantity >= converted_quantity:
-                    available.append(pantry_item)
-                else:
-                    insufficient.append(
-                        MissingIngredientData(
-                            ingredient=pantry_item,
-                            required_quantity=required_quantity,
-                            required_unit=QuantityUnit(required_unit) if required_unit in [e.value for e in QuantityUnit] else QuantityUnit.OTHER,
-                            sufficient=False
-                        )
-                    )
-                break
-        
-        if not found:
-            # Create a placeholder item for the missing ingredient
-            missing_item = PantryItem(
-                id=None,
-                name=ingredient_data["name"],
-                category="Unknown",  # We don't know the category
-                quantity=0,
-                unit=QuantityUnit(required_unit) if required_unit in [e.value for e in QuantityUnit] else QuantityUnit.OTHER,
-                status=PantryItemStatus.OUT_OF_STOCK
-            )
-            
-            missing.append(
-                MissingIngredientData(
-                    ingredient=missing_item,
-                    required_quantity=required_quantity,
-                    required_unit=QuantityUnit(required_unit) if required_unit in [e.value for e in QuantityUnit] else QuantityUnit.OTHER,
-                    sufficient=False
-                )
-            )
-    
-    # Update response
-    response.missing_ingredients = missing
-    response.insufficient_ingredients = insufficient
-    response.available_ingredients = available
-    response.can_make_recipe = len(missing) == 0 and len(insufficient) == 0
-    
-    return response
+    return PantryIndex(inventory.items).check(recipe_ingredients)
 
 # Function to get recipe suggestions based on pantry
 async def get_recipe_suggestions(user_id: str, limit: int = 5) -> List[Dict]:
@@ -424,12 +342,14 @@ async def update_pantry_from_grocery_list(user_id: str, grocery_items: List[Dict
         inventory = await get_pantry_inventory(user_id)
         item_found = False
         
+        quantity = parse_ingredient_quantity(grocery_item.get("quantity", 1), grocery_item.get("unit"))
+        
         for pantry_item in inventory.items:
             if pantry_item.name.lower() == grocery_item["name"].lower():
                 # Update the existing item
                 update_req = UpdatePantryItemRequest(
                     id=pantry_item.id,
-                    quantity=pantry_item.quantity + float(grocery_item.get("quantity", 1)),
+                    quantity=pantry_item.quantity + quantity.amount,
                     purchase_date=grocery_item.get("purchase_date", date.today()),
                     expiry_date=grocery_item.get("expiry_date", None),
                     status=PantryItemStatus(grocery_item.get("status", "available")) if grocery_item.get("status") in [e.value for e in PantryItemStatus] else PantryItemStatus.AVAILABLE
@@ -446,8 +366,8 @@ async def update_pantry_from_grocery_list(user_id: str, grocery_items: List[Dict
             new_item_req = AddPantryItemRequest(
                 name=grocery_item["name"],
                 category=grocery_item.get("category", "Pantry"),
-                quantity=float(grocery_item.get("quantity", 1)),
-                unit=QuantityUnit(grocery_item.get("unit", "count")) if grocery_item.get("unit") in [e.value for e in QuantityUnit] else QuantityUnit.COUNT,
+                quantity=quantity.amount,
+                unit=quantity.unit,
                 purchase_date=grocery_item.get("purchase_date", date.today()),
                 expiry_date=grocery_item.get("expiry_date", None),
                 status=grocery_item.get("status", None)  # Status will be determined automatically in add_pantry_item if not provided
@@ -0,0 +1,134 @@
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.pantry import QuantityUnit
+from app.services.amazon_service import AMAZON_CATEGORIES, amazon_client
+from app.services.product_catalog import tokenize
+from app.services.product_matcher import ProductMatcher
+from app.services.quantity_parser import ParsedQuantity, parse_package_size, parse_quantity
+from app.services.unit_conversion import UNIT_INDEX, UNITS, convert_many
+
+# Fallback when no catalog product matches: a typical price per unit (or per
+# pound) for the item's grocery category
+CATEGORY_BASE_PRICES = {
+    "Produce": 2.99,
+    "Meat & Seafood": 7.99,
+    "Dairy & Eggs": 3.99,
+    "Pantry": 4.99,
+    "Spices & Seasonings": 3.49,
+    "Beverages": 4.29
+}
+DEFAULT_BASE_PRICE = 3.99
+
+# Metric weights are priced by the pound in the fallback
+POUNDS_PER_UNIT = {
+    QuantityUnit.KILOGRAMS: 2.2,
+    QuantityUnit.GRAMS: 0.0022,
+}
+_POUND_FACTORS = np.array([POUNDS_PER_UNIT.get(unit, 1.0) for unit in UNITS])
+
+# Confidence by how a line was priced; catalog confidences are scaled by how
+# much of the item name the matched product's title covers
+SIZED_CONFIDENCE = 0.9      # catalog price, packs worked out from the pack size
+PACK_CONFIDENCE = 0.6       # catalog price, one pack assumed
+CATEGORY_CONFIDENCE = 0.3   # category base price times the quantity
+
+
+class PriceEstimate(NamedTuple):
+    """Estimated line price, how much to trust it, and where it came from"""
+    price: float
+    confidence: float
+    source: str  # "catalog" or "category"
+    product: Optional[str] = None
+    packs: Optional[int] = None
+
+
+class _CatalogPrice(NamedTuple):
+    price: float
+    size: Optional[ParsedQuantity]
+    coverage: float
+    title: str
+
+
+class PriceEstimator:
+    """
+    Estimates grocery line prices from the product catalog.
+
+    Each item is matched to its best catalog product once (lookups are
+    cached by name and category); the cart's line totals are then computed
+    together: one vectorized conversion of every quantity into its
+    product's pack unit, whole packs per line, and the category fallback
+    for items with no trustworthy match, all as array operations.
+    """
+
+    def __init__(self, matcher: ProductMatcher, cache_size: int = 4096):
+        self.matcher = matcher
+        self._lookup = lru_cache(maxsize=cache_size)(self._catalog_price)
+
+    def _catalog_price(self, name: str, category: str) -> Optional[_CatalogPrice]:
+        matches = self.matcher.match(name, AMAZON_CATEGORIES.get(category, "Grocery"), k=1)
+        if not matches or matches[0].product.price <= 0:
+            return None
+        product = matches[0].product
+        tokens = tokenize(name)
+        title_tokens = set(tokenize(product.title))
+        covered = [any(term in title_tokens for term, _ in self.matcher.expand(token)) for token in tokens]
+        # The last word names the item ("chicken stock" is stock, not chicken)
+        if not covered or not covered[-1]:
+            return None
+        coverage = sum(covered) / len(covered)
+        return _CatalogPrice(product.price, parse_package_size(product.title), coverage, product.title)
+
+    def estimate_many(self, items: Sequence[Tuple[str, str, str]]) -> List[PriceEstimate]:
+        """Estimates for (name, quantity, grocery category) items, in order"""
+        if not items:
+            return []
+        quantities = [parse_quantity(quantity) for _, quantity, _ in items]
+        catalog = [self._lookup(name, category) for name, _, category in items]
+
+        amounts = np.array([quantity.amount for quantity in quantities])
+        numeric = np.array([quantity.numeric for quantity in quantities])
+        from_units = [quantity.unit for quantity in quantities]
+        matched = np.array([entry is not None for entry in catalog])
+        prices = np.array([entry.price if entry else 0.0 for entry in catalog])
+        coverage = np.array([entry.coverage if entry else 0.0 for entry in catalog])
+        pack_sizes = np.array([entry.size.amount if entry and entry.size else np.nan for entry in catalog])
+        # Items without a pack size convert to OTHER, which always gives NaN
+        pack_units = [entry.size.unit if entry and entry.size else QuantityUnit.OTHER for entry in catalog]
+        # Counts of different things ("4 cloves" and a "3 Heads" pack) don't compare
+        same_label = np.array([
+            not entry or not entry.size or entry.size.label == quantity.label
+            for entry, quantity in zip(catalog, quantities)
+        ])
+
+        # Catalog lines: whole packs covering the quantity, one pack when the
+        # quantity can't be compared with the pack size
+        in_pack_units = convert_many(amounts, from_units, pack_units, [name for name, _, _ in items])
+        sized = matched & numeric & same_label & (in_pack_units > 0)
+        packs = np.ones(len(items))
+        packs[sized] = np.maximum(1, np.ceil(in_pack_units[sized] / pack_sizes[sized] - 1e-9))
+        catalog_lines = prices * packs
+
+        # Fallback lines: category base price per unit, metric weights per pound
+        base_prices = np.array([CATEGORY_BASE_PRICES.get(category, DEFAULT_BASE_PRICE) for _, _, category in items])
+        unit_index = np.fromiter((UNIT_INDEX[unit] for unit in from_units), dtype=np.intp, count=len(items))
+        category_lines = base_prices * amounts * _POUND_FACTORS[unit_index]
+
+        lines = np.where(matched, catalog_lines, category_lines).round(2)
+        confidence = np.where(
+            matched, np.where(sized, SIZED_CONFIDENCE, PACK_CONFIDENCE) * coverage, CATEGORY_CONFIDENCE
+        ).round(2)
+
+        return [
+            PriceEstimate(price, score, "catalog", entry.title, pack_count)
+            if entry else PriceEstimate(price, score, "category")
+            for entry, price, score, pack_count in zip(
+                catalog, lines.tolist(), confidence.tolist(), packs.astype(int).tolist()
+            )
+        ]
+
+
+# Shared estimator used by the grocery router, matching against the Amazon client's catalog
+price_estimator = PriceEstimator(amazon_client.matcher)
@@ -0,0 +1,146 @@
+import os
+import re
+import csv
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from app.models.product import AmazonProduct
+from app.services.grocery_aggregator import singular
+
+logger = logging.getLogger("product_catalog")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CATALOG_PATH = os.getenv("PRODUCT_CATALOG_PATH", os.path.join(BACKEND_DIR, "data", "product_catalog.json"))
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, singular word tokens: "Roma Tomatoes, 2lb" -> ["roma", "tomato", "2lb"]"""
+    return [singular(token) for token in _TOKEN_PATTERN.findall(text.lower())]
+
+
+def load_catalog_records(path: str) -> List[Dict]:
+    """Read product records from a JSON list or a CSV with the same columns"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return list(csv.DictReader(f))
+        return json.load(f)
+
+
+def record_keywords(record: Dict) -> List[str]:
+    """A record's keywords; CSV files separate them with "|" """
+    keywords = record.get("keywords") or []
+    return keywords.split("|") if isinstance(keywords, str) else list(keywords)
+
+
+class ProductCatalog(ABC):
+    """
+    Interface shared by product catalogs: the bundled mock catalog and any
+    real one (e.g. a local mirror of PA-API results) answer the same calls.
+    A catalog missing one of them fails when it is instantiated. Matching
+    and ranking live in product_matcher, on top of this index access.
+    """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def vocabulary(self) -> List[str]:
+        """Every indexed term, sorted"""
+
+    @abstractmethod
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted ids of the products with term in their keywords, and in their title"""
+
+    @abstractmethod
+    def document_lengths(self) -> np.ndarray:
+        """Indexed keyword plus title terms per product, by product id"""
+
+    @abstractmethod
+    def in_category(self, product_ids: Sequence[int], category: str) -> np.ndarray:
+        """Boolean mask of the given products that are in category"""
+
+    @abstractmethod
+    def product(self, product_id: int) -> AmazonProduct:
+        """
+        The product with this id. Returned products are shared, so callers
+        must not modify them.
+        """
+
+
+class IndexedProductCatalog(ProductCatalog):
+    """
+    Products loaded once into memory with an inverted token index.
+
+    Each product lists match keywords ("onion", "ground beef"); keyword and
+    title tokens get separate postings, so the matcher only touches the
+    products that share a term with the query. Each product's category
+    ("Grocery", "GroceryFresh") is kept for the matcher's category prior.
+    """
+
+    def __init__(self, records: Iterable[Dict]):
+        self._products: List[AmazonProduct] = []
+        self._categories: List[str] = []
+        self._keyword_postings: Dict[str, List[int]] = defaultdict(list)
+        self._title_postings: Dict[str, List[int]] = defaultdict(list)
+        lengths: List[int] = []
+
+        for record in records:
+            category = record.get("category") or "Grocery"
+            keywords = record_keywords(record)
+            record = {key: value for key, value in record.items() if key not in ("category", "keywords")}
+            product_id = len(self._products)
+            self._products.append(AmazonProduct(**record))
+            self._categories.append(category)
+            keyword_tokens = {token for keyword in keywords for token in tokenize(keyword)}
+            title_tokens = set(tokenize(record["title"]))
+            for token in keyword_tokens:
+                self._keyword_postings[token].append(product_id)
+            for token in title_tokens:
+                self._title_postings[token].append(product_id)
+            lengths.append(len(keyword_tokens) + len(title_tokens))
+        self._lengths = np.array(lengths, dtype=float)
+        self._category_array = np.array(self._categories, dtype=object)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_CATALOG_PATH) -> "IndexedProductCatalog":
+        """Load a catalog from a JSON list of products or a CSV with the same columns"""
+        catalog = cls(load_catalog_records(path))
+        logger.info(f"Loaded {len(catalog)} products from {path}")
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def vocabulary(self) -> List[str]:
+        return sorted(set(self._keyword_postings) | set(self._title_postings))
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            np.asarray(self._keyword_postings.get(term, ()), dtype=np.intp),
+            np.asarray(self._title_postings.get(term, ()), dtype=np.intp),
+        )
+
+    def document_lengths(self) -> np.ndarray:
+        return self._lengths
+
+    def in_category(self, product_ids: Sequence[int], category: str) -> np.ndarray:
+        return self._category_array[np.asarray(product_ids, dtype=np.intp)] == category
+
+    def product(self, product_id: int) -> AmazonProduct:
+        return self._products[product_id]
+
+
+def load_default_catalog() -> ProductCatalog:
+    try:
+        return IndexedProductCatalog.from_file(DEFAULT_CATALOG_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load product catalog from {DEFAULT_CATALOG_PATH}: {str(e)}")
+        return IndexedProductCatalog([])
@@ -0,0 +1,270 @@
+import os
+import json
+import mmap
+import struct
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.product import AmazonProduct
+from app.services.product_catalog import (
+    BACKEND_DIR,
+    ProductCatalog,
+    load_default_catalog,
+    record_keywords,
+    tokenize,
+)
+
+logger = logging.getLogger("product_index")
+
+# Compiled catalog built by build_product_index.py; used instead of the JSON
+# catalog when present
+DEFAULT_INDEX_PATH = os.getenv("PRODUCT_INDEX_PATH", os.path.join(BACKEND_DIR, "data", "product_catalog.idx"))
+
+# Bumped whenever the layout changes, so stale indexes are rejected
+MAGIC = b"FMPIDX02"
+# Magic, then the length of the JSON metadata block that follows it
+_HEADER = struct.Struct("<8sQ")
+_ALIGNMENT = 8
+
+# One fixed-width row per product; strings live in a shared UTF-8 blob
+PRODUCT_DTYPE = np.dtype([
+    ("asin", "S16"),
+    ("price", "<f8"),
+    ("title_offset", "<u4"),
+    ("image_url_offset", "<u4"),
+    ("detail_url_offset", "<u4"),
+    ("title_length", "<u2"),
+    ("image_url_length", "<u2"),
+    ("detail_url_length", "<u2"),
+    ("category", "<u2"),
+    ("availability", "<u2"),
+    ("term_count", "<u2"),
+])
+# Per term, the slices of the keyword and title postings arrays it owns
+TERM_DTYPE = np.dtype([
+    ("keyword_start", "<u4"),
+    ("keyword_count", "<u4"),
+    ("title_start", "<u4"),
+    ("title_count", "<u4"),
+])
+POSTING_DTYPE = np.dtype("<u4")
+
+
+def write_product_index(records: Iterable[Dict], path: str) -> Dict[str, int]:
+    """
+    Compile product records into the on-disk index at path.
+
+    Layout: header, JSON metadata (labels and section offsets), then
+    8-byte-aligned sections: the product table, the string blob, the sorted
+    term dictionary (offsets + UTF-8 blob), per-term postings ranges and
+    the keyword/title postings arrays. Returns counts for reporting.
+    """
+    labels: List[str] = []
+    label_ids: Dict[str, int] = {}
+    strings = bytearray()
+    keyword_postings: Dict[str, List[int]] = defaultdict(list)
+    title_postings: Dict[str, List[int]] = defaultdict(list)
+    rows = []
+
+    def label(value: str) -> int:
+        if value not in label_ids:
+            label_ids[value] = len(labels)
+            labels.append(value)
+        return label_ids[value]
+
+    def add_string(value: str):
+        encoded = value.encode("utf-8")[:0xFFFF]
+        offset = len(strings)
+        strings.extend(encoded)
+        return offset, len(encoded)
+
+    for product_id, record in enumerate(records):
+        title_offset, title_length = add_string(record["title"])
+        image_offset, image_length = add_string(record.get("image_url", ""))
+        detail_offset, detail_length = add_string(record.get("detail_url", ""))
+        keyword_tokens = {token for keyword in record_keywords(record) for token in tokenize(keyword)}
+        title_tokens = set(tokenize(record["title"]))
+        rows.append((
+            str(record["asin"]).encode("ascii")[:16],
+            float(record.get("price") or 0.0),
+            title_offset, image_offset, detail_offset,
+            title_length, image_length, detail_length,
+            label(record.get("category") or "Grocery"),
+            label(record.get("availability") or "Unknown"),
+            min(len(keyword_tokens) + len(title_tokens), 0xFFFF),
+        ))
+        for token in keyword_tokens:
+            keyword_postings[token].append(product_id)
+        for token in title_tokens:
+            title_postings[token].append(product_id)
+    if len(strings) > 0xFFFFFFFF:
+        raise ValueError("Catalog strings exceed 4 GiB; split the catalog")
+
+    terms = sorted(set(keyword_postings) | set(title_postings))
+    term_blob = bytearray()
+    term_offsets = np.zeros(len(terms) + 1, dtype="<u8")
+    term_ranges = np.zeros(len(terms), dtype=TERM_DTYPE)
+    keyword_array: List[int] = []
+    title_array: List[int] = []
+    for index, term in enumerate(terms):
+        term_blob.extend(term.encode("utf-8"))
+        term_offsets[index + 1] = len(term_blob)
+        term_ranges[index] = (
+            len(keyword_array), len(keyword_postings.get(term, ())),
+            len(title_array), len(title_postings.get(term, ())),
+        )
+        keyword_array.extend(keyword_postings.get(term, ()))
+        title_array.extend(title_postings.get(term, ()))
+
+    sections = [
+        ("products", np.array(rows, dtype=PRODUCT_DTYPE).tobytes()),
+        ("strings", bytes(strings)),
+        ("term_offsets", term_offsets.tobytes()),
+        ("terms", bytes(term_blob)),
+        ("term_ranges", term_ranges.tobytes()),
+        ("keyword_postings", np.array(keyword_array, dtype=POSTING_DTYPE).tobytes()),
+        ("title_postings", np.array(title_array, dtype=POSTING_DTYPE).tobytes()),
+    ]
+
+    # Section offsets depend on the metadata length, so lay out relative
+    # offsets first and shift them once the metadata size is known
+    relative, position = {}, 0
+    for name, data in sections:
+        relative[name] = [position, len(data)]
+        position += len(data) + (-len(data) % _ALIGNMENT)
+    metadata = {"version": 2, "products": len(rows), "terms": len(terms), "labels": labels, "sections": relative}
+    encoded = b""
+    while True:
+        base = _HEADER.size + len(encoded)
+        base += -base % _ALIGNMENT
+        metadata["sections"] = {name: [base + offset, length] for name, (offset, length) in relative.items()}
+        previous, encoded = encoded, json.dumps(metadata).encode("utf-8")
+        if len(encoded) == len(previous):
+            break
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (base - f.tell()))
+        for _, data in sections:
+            f.write(data)
+            f.write(b"\0" * (-len(data) % _ALIGNMENT))
+    os.replace(temp_path, path)
+    return {"products": len(rows), "terms": len(terms), "postings": len(keyword_array) + len(title_array)}
+
+
+class _TermDictionary:
+    """Sorted terms as a sequence of bytes, so bisect can search them in place"""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]])
+
+    def find(self, term: str) -> Optional[int]:
+        encoded = term.encode("utf-8")
+        index = bisect_left(self, encoded)
+        return index if index < len(self) and self[index] == encoded else None
+
+
+class MmapProductCatalog(ProductCatalog):
+    """
+    Read-only catalog over a compiled index file.
+
+    The file is memory-mapped and every table is a NumPy view of the map, so
+    opening it costs nothing per product and all workers share one copy in
+    the page cache. AmazonProduct objects are only built for the products a
+    match returns. Postings match IndexedProductCatalog's, so the matcher
+    ranks both the same.
+    """
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, metadata_length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a product index")
+        metadata = json.loads(self._map[_HEADER.size:_HEADER.size + metadata_length])
+        self._labels: List[str] = metadata["labels"]
+        self._label_ids = {value: index for index, value in enumerate(self._labels)}
+
+        buffer = memoryview(self._map)
+
+        def section(name: str, dtype=None):
+            offset, length = metadata["sections"][name]
+            if dtype is None:
+                return buffer[offset:offset + length]
+            return np.frombuffer(self._map, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+        self._products = section("products", PRODUCT_DTYPE)
+        self._strings = section("strings")
+        self._terms = _TermDictionary(section("term_offsets", "<u8"), section("terms"))
+        self._term_ranges = section("term_ranges", TERM_DTYPE)
+        self._keyword_postings = section("keyword_postings", POSTING_DTYPE)
+        self._title_postings = section("title_postings", POSTING_DTYPE)
+        self._cached_product = lru_cache(maxsize=cache_size)(self._product)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def _string(self, offset: int, length: int) -> str:
+        return bytes(self._strings[offset:offset + length]).decode("utf-8", errors="ignore")
+
+    def _product(self, product_id: int) -> AmazonProduct:
+        row = self._products[product_id]
+        return AmazonProduct(
+            asin=row["asin"].decode("ascii"),
+            title=self._string(row["title_offset"], row["title_length"]),
+            price=float(row["price"]),
+            image_url=self._string(row["image_url_offset"], row["image_url_length"]),
+            detail_url=self._string(row["detail_url_offset"], row["detail_url_length"]),
+            availability=self._labels[row["availability"]],
+        )
+
+    def product(self, product_id: int) -> AmazonProduct:
+        return self._cached_product(product_id)
+
+    def vocabulary(self) -> List[str]:
+        return [self._terms[index].decode("utf-8") for index in range(len(self._terms))]
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        index = self._terms.find(term)
+        if index is None:
+            return self._keyword_postings[:0], self._title_postings[:0]
+        start, count, title_start, title_count = self._term_ranges[index].tolist()
+        return self._keyword_postings[start:start + count], self._title_postings[title_start:title_start + title_count]
+
+    def document_lengths(self) -> np.ndarray:
+        return self._products["term_count"]
+
+    def in_category(self, product_ids: Sequence[int], category: str) -> np.ndarray:
+        if category not in self._label_ids:
+            return np.zeros(len(product_ids), dtype=bool)
+        return self._products["category"][np.asarray(product_ids, dtype=np.intp)] == self._label_ids[category]
+
+
+def load_catalog() -> ProductCatalog:
+    """The compiled index when one has been built, else the JSON catalog"""
+    if os.path.exists(DEFAULT_INDEX_PATH):
+        try:
+            catalog = MmapProductCatalog(DEFAULT_INDEX_PATH)
+            logger.info(f"Mapped {len(catalog)} products from {DEFAULT_INDEX_PATH}")
+            return catalog
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not open product index {DEFAULT_INDEX_PATH}: {str(e)}")
+    return load_default_catalog()
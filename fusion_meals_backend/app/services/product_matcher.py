@@ -0,0 +1,204 @@
+import math
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.models.product import AmazonProduct
+from app.services.product_catalog import ProductCatalog, tokenize
+from app.services.quantity_parser import parse_package_size, parse_quantity
+from app.services.unit_conversion import convert_many
+
+logger = logging.getLogger("product_matcher")
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A keyword hit counts as this many title hits
+KEYWORD_TERM_FREQUENCY = 2.0
+
+# Unknown query words are replaced by indexed terms sharing enough character
+# trigrams (Dice coefficient), weighted by that similarity
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_MAX_EXPANSIONS = 3
+
+# Terms on more postings than this ("organic", "fresh" in a large catalog)
+# only add to the scores of products found through rarer query terms
+COMMON_TERM_MIN_POSTINGS = 1000
+COMMON_TERM_FRACTION = 0.05
+
+# Score multiplier for products in the item's Amazon category
+CATEGORY_PRIOR = 1.25
+# Up to this much extra score for a pack size that covers the quantity with
+# little left over
+SIZE_FIT_WEIGHT = 0.25
+
+
+class ProductMatch(NamedTuple):
+    """
+    A candidate product for a grocery item.
+
+    score is the relevance (None for live PA-API results, which come ranked
+    by Amazon); packs is how many of the product cover the quantity asked
+    for, when the pack size and quantity can be compared.
+    """
+    product: AmazonProduct
+    score: Optional[float]
+    packs: Optional[int] = None
+
+
+def trigrams(term: str) -> List[str]:
+    """Character trigrams of a term padded with spaces: "egg" -> [" eg", "egg", "gg "]"""
+    padded = f" {term} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class ProductMatcher:
+    """
+    Fuzzy, scored product matching over a ProductCatalog.
+
+    Query words are stemmed like the catalog's tokens. Words the catalog
+    indexes are used as is; others (typos, unseen plurals) are expanded to
+    the closest indexed terms through a character-trigram index over the
+    vocabulary. Products are scored with BM25 over their keyword and title
+    terms, so a rare word like "cherry" outweighs a common one like
+    "tomato", and products in the preferred category get a prior boost.
+    Work is proportional to the postings touched, not the catalog size.
+    """
+
+    def __init__(self, catalog: ProductCatalog):
+        self.catalog = catalog
+        self._count = len(catalog)
+        self._lengths = np.asarray(catalog.document_lengths(), dtype=float)
+        self._average_length = float(self._lengths.mean()) if self._count else 1.0
+        self._common_postings = max(COMMON_TERM_MIN_POSTINGS, int(COMMON_TERM_FRACTION * self._count))
+        self._vocabulary: Optional[List[str]] = None
+        self._trigram_index: Dict[str, np.ndarray] = {}
+        self._trigram_counts: Optional[np.ndarray] = None
+        self.expand = lru_cache(maxsize=8192)(self._expand)
+        self._term_scores = lru_cache(maxsize=1024)(self._score_term)
+
+    def _build_trigram_index(self):
+        # Built on the first unknown word; exact matches never need it
+        vocabulary = self.catalog.vocabulary()
+        postings: Dict[str, List[int]] = defaultdict(list)
+        counts = []
+        for index, term in enumerate(vocabulary):
+            grams = trigrams(term)
+            counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(index)
+        self._trigram_index = {gram: np.array(ids, dtype=np.intp) for gram, ids in postings.items()}
+        self._trigram_counts = np.array(counts, dtype=float)
+        self._vocabulary = vocabulary
+        logger.info(f"Built trigram index over {len(vocabulary)} catalog terms")
+
+    def _expand(self, token: str) -> Tuple[Tuple[str, float], ...]:
+        """Indexed terms to search for token, with their similarity to it"""
+        keyword_ids, title_ids = self.catalog.postings(token)
+        if len(keyword_ids) or len(title_ids):
+            return ((token, 1.0),)
+        if self._vocabulary is None:
+            self._build_trigram_index()
+        grams = [self._trigram_index[gram] for gram in trigrams(token) if gram in self._trigram_index]
+        if not grams:
+            return ()
+        term_ids, shared = np.unique(np.concatenate(grams), return_counts=True)
+        similarity = 2 * shared / (len(trigrams(token)) + self._trigram_counts[term_ids])
+        keep = similarity >= FUZZY_MIN_SIMILARITY
+        term_ids, similarity = term_ids[keep], similarity[keep]
+        best = np.argsort(-similarity, kind="stable")[:FUZZY_MAX_EXPANSIONS]
+        return tuple((self._vocabulary[term_ids[i]], float(similarity[i])) for i in best)
+
+    def _score_term(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(sorted product ids, BM25 score of term for each)"""
+        keyword_ids, title_ids = self.catalog.postings(term)
+        ids = np.concatenate([keyword_ids, title_ids]).astype(np.intp)
+        weights = np.concatenate([np.full(len(keyword_ids), KEYWORD_TERM_FREQUENCY), np.ones(len(title_ids))])
+        product_ids, inverse = np.unique(ids, return_inverse=True)
+        frequency = np.bincount(inverse, weights=weights, minlength=len(product_ids))
+
+        documents = len(product_ids)
+        idf = math.log(1 + (self._count - documents + 0.5) / (documents + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[product_ids] / self._average_length)
+        return product_ids, idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+    def match(self, query: str, category: Optional[str] = None, k: int = 10) -> List[ProductMatch]:
+        """Up to k products for query, best first; empty when nothing is close"""
+        terms = [
+            (*self._term_scores(term), similarity)
+            for token in set(tokenize(query))
+            for term, similarity in self.expand(token)
+        ]
+        terms = [term for term in terms if len(term[0])]
+        if not terms:
+            return []
+
+        # Candidates come from the selective terms when there are any
+        drivers = [product_ids for product_ids, _, _ in terms if len(product_ids) <= self._common_postings]
+        drivers = drivers or [product_ids for product_ids, _, _ in terms]
+        candidates = drivers[0] if len(drivers) == 1 else np.unique(np.concatenate(drivers))
+        totals = np.zeros(len(candidates))
+        for product_ids, term_scores, similarity in terms:
+            positions = np.searchsorted(product_ids, candidates).clip(max=len(product_ids) - 1)
+            found = product_ids[positions] == candidates
+            totals[found] += term_scores[positions[found]] * similarity
+        if category is not None:
+            totals = np.where(self.catalog.in_category(candidates, category), totals * CATEGORY_PRIOR, totals)
+
+        if len(candidates) > k:
+            # Only sort the candidates that can make the top k (ties included)
+            threshold = np.partition(totals, len(totals) - k)[len(totals) - k]
+            keep = np.flatnonzero(totals >= threshold)
+            candidates, totals = candidates[keep], totals[keep]
+        # Best score first; catalog order breaks ties
+        order = np.lexsort((candidates, -totals))[:k]
+        return [
+            ProductMatch(self.catalog.product(int(candidates[i])), round(float(totals[i]), 4))
+            for i in order
+        ]
+
+
+def fit_package_sizes(matches: List[ProductMatch], quantity: str, ingredient: str) -> List[ProductMatch]:
+    """
+    Fill in packs for each match from its title's pack size and rerank.
+
+    "2 lb" of onions needs one "3 lb Bag" or two "1 lb" bags; the closer a
+    product's packs come to the quantity without going under, the larger
+    its score boost (up to SIZE_FIT_WEIGHT). Matches whose size can't be
+    compared with the quantity (including counts of different things, like
+    cloves and heads) keep their score and have no packs.
+    """
+    required = parse_quantity(quantity)
+    sizes = [parse_package_size(match.product.title) for match in matches]
+    # Counts of different things ("4 cloves" and a "3 Heads" pack) don't compare
+    sized = [
+        index for index, size in enumerate(sizes)
+        if size is not None and size.amount > 0 and size.label == required.label
+    ]
+    if not required.numeric or not sized:
+        return list(matches)
+
+    # The quantity in each product's size unit, in one vectorized call
+    amounts = np.full(len(matches), np.nan)
+    amounts[sized] = convert_many(
+        np.full(len(sized), required.amount),
+        [required.unit] * len(sized),
+        [sizes[index].unit for index in sized],
+        [ingredient] * len(sized),
+    )
+    fitted = []
+    for match, size, amount in zip(matches, sizes, amounts.tolist()):
+        if not amount > 0:
+            fitted.append(match)
+            continue
+        packs = max(1, math.ceil(amount / size.amount - 1e-9))
+        score = match.score
+        if score is not None:
+            score = round(score * (1 + SIZE_FIT_WEIGHT * amount / (packs * size.amount)), 4)
+        fitted.append(match._replace(score=score, packs=packs))
+    if all(match.score is not None for match in fitted):
+        fitted.sort(key=lambda match: -match.score)
+    return fitted
@@ -0,0 +1,247 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from app.models.pantry import QuantityUnit
+
+# Unicode vulgar fractions ("½", "¾", ...) and their values
+VULGAR_FRACTIONS = {char: unicodedata.numeric(char) for char in "½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅛⅜⅝⅞"}
+
+# Unit aliases -> (unit, factor to multiply the amount by). Units the enum
+# doesn't have (pints, fl oz, mg) are rescaled into one it does.
+UNIT_ALIASES = {
+    QuantityUnit.GRAMS: ["g", "gr", "gram", "grams", "gramme", "grammes"],
+    QuantityUnit.KILOGRAMS: ["kg", "kgs", "kilo", "kilos", "kilogram", "kilograms"],
+    QuantityUnit.MILLILITERS: ["ml", "mls", "milliliter", "milliliters", "millilitre", "millilitres"],
+    QuantityUnit.LITERS: ["l", "liter", "liters", "litre", "litres", "ltr"],
+    QuantityUnit.COUNT: ["count", "x", "each", "ea", "piece", "pieces", "pc", "pcs", "clove", "cloves",
+                         "whole", "small", "medium", "large", "head", "heads", "stalk", "stalks",
+                         "slice", "slices"],
+    QuantityUnit.TABLESPOON: ["tbsp", "tbsps", "tbs", "tbl", "tablespoon", "tablespoons"],
+    QuantityUnit.TEASPOON: ["tsp", "tsps", "teaspoon", "teaspoons"],
+    QuantityUnit.CUP: ["cup", "cups", "c"],
+    QuantityUnit.OUNCE: ["oz", "ozs", "ounce", "ounces"],
+    QuantityUnit.POUND: ["lb", "lbs", "pound", "pounds"],
+    QuantityUnit.PINCH: ["pinch", "pinches", "dash", "dashes"],
+    QuantityUnit.BUNCH: ["bunch", "bunches"],
+    QuantityUnit.PACKAGE: ["package", "packages", "pack", "packs", "pkg", "pkgs", "packet", "packets", "bag", "bags"],
+    QuantityUnit.CAN: ["can", "cans", "tin", "tins"],
+    QuantityUnit.BOTTLE: ["bottle", "bottles"],
+    QuantityUnit.BOX: ["box", "boxes", "carton", "cartons"],
+    QuantityUnit.OTHER: ["other"],
+}
+SCALED_UNIT_ALIASES = {
+    "mg": (QuantityUnit.GRAMS, 0.001),
+    "cl": (QuantityUnit.MILLILITERS, 10.0),
+    "dl": (QuantityUnit.MILLILITERS, 100.0),
+    "fl oz": (QuantityUnit.MILLILITERS, 29.5735),
+    "floz": (QuantityUnit.MILLILITERS, 29.5735),
+    "pint": (QuantityUnit.MILLILITERS, 473.176),
+    "pints": (QuantityUnit.MILLILITERS, 473.176),
+    "pt": (QuantityUnit.MILLILITERS, 473.176),
+    "quart": (QuantityUnit.MILLILITERS, 946.353),
+    "quarts": (QuantityUnit.MILLILITERS, 946.353),
+    "qt": (QuantityUnit.MILLILITERS, 946.353),
+    "gallon": (QuantityUnit.LITERS, 3.78541),
+    "gallons": (QuantityUnit.LITERS, 3.78541),
+    "gal": (QuantityUnit.LITERS, 3.78541),
+}
+_UNIT_LOOKUP = {
+    **{alias: (unit, 1.0) for unit, aliases in UNIT_ALIASES.items() for alias in aliases},
+    **SCALED_UNIT_ALIASES,
+}
+# "dozen" is a count of twelve
+_UNIT_LOOKUP["dozen"] = (QuantityUnit.COUNT, 12.0)
+
+# Count words that say what is counted, singular -> plural. "4 cloves" and
+# "1 head" of garlic are both counts but don't add up, so parsed quantities
+# keep the word as a label and only amounts with the same label are summed.
+# Sizes ("2 large eggs") and "whole" describe the item, not a kind of count,
+# so they stay plain counts.
+COUNT_LABELS = {
+    "clove": "cloves",
+    "head": "heads",
+    "stalk": "stalks",
+    "slice": "slices",
+}
+_COUNT_LABEL_LOOKUP = {
+    **{label: label for label in COUNT_LABELS},
+    **{plural: label for label, plural in COUNT_LABELS.items()},
+}
+
+_FRACTION_CHARS = "".join(VULGAR_FRACTIONS)
+# One number: "1 1/2", "1½", "1/2", "1.5", ".5", "½", "2"
+_NUMBER = (
+    rf"(?:\d+\s+\d+/\d+|\d+\s*[{_FRACTION_CHARS}]|\d+/\d+|\d*\.\d+|\d+|[{_FRACTION_CHARS}])"
+)
+QUANTITY_PATTERN = re.compile(
+    rf"(?P<low>{_NUMBER})"
+    rf"(?:\s*(?:-|–|—|to|or)\s*(?P<high>{_NUMBER}))?"
+    r"\s*(?P<unit>fl\.?\s*oz\b|[^\W\d_]+\.?)?"
+)
+# A quantity at the start of a recipe line: "2 cups flour", "1 1/2 lbs chicken"
+LEADING_QUANTITY_PATTERN = re.compile(rf"^\s*(?:{_NUMBER})(?:\s*(?:-|–|—|to|or)\s*(?:{_NUMBER}))?")
+# A pack size between the count and its unit: "1 (14 oz) can tomatoes"
+_PACK_SIZE_PATTERN = re.compile(r"\s*\([^)]*\)")
+_LEADING_UNIT_PATTERN = re.compile(r"\s*(fl\.?\s*oz\b|[^\W\d_]+\.?)(?:\s+of\b)?")
+_MIXED_PATTERN = re.compile(r"^(\d+)\s+(\d+)/(\d+)$")
+_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:\s+oz\b)?")
+
+
+class ParsedQuantity(NamedTuple):
+    """
+    A quantity string broken into numbers and a unit.
+
+    amount is what to shop for or check against: the upper bound of a range
+    ("3-4 cloves" -> 4). low/high keep both ends; numeric is False when the
+    text had no number and amount defaulted to 1. label is the count word
+    for counts of a particular kind ("clove", "head"), None otherwise.
+    """
+    amount: float
+    unit: QuantityUnit
+    low: float
+    high: float
+    numeric: bool = True
+    label: Optional[str] = None
+
+    @property
+    def midpoint(self) -> float:
+        return (self.low + self.high) / 2
+
+
+def _parse_number(text: str) -> float:
+    text = text.strip()
+    if text in VULGAR_FRACTIONS:
+        return VULGAR_FRACTIONS[text]
+    if text[-1] in VULGAR_FRACTIONS:
+        return float(text[:-1].strip()) + VULGAR_FRACTIONS[text[-1]]
+    mixed = _MIXED_PATTERN.match(text)
+    if mixed:
+        whole, numerator, denominator = (int(part) for part in mixed.groups())
+        return whole + (numerator / denominator if denominator else 0.0)
+    if "/" in text:
+        numerator, denominator = text.split("/", 1)
+        return int(numerator) / int(denominator) if int(denominator) else 0.0
+    return float(text)
+
+
+@lru_cache(maxsize=512)
+def parse_unit(text: str) -> Optional[Tuple[QuantityUnit, float]]:
+    """Map a unit name or alias ("Tablespoons", "fl oz") to (unit, factor)"""
+    key = re.sub(r"\s+", " ", text.strip().lower().replace(".", ""))
+    if key in _UNIT_LOOKUP:
+        return _UNIT_LOOKUP[key]
+    if key.replace(" ", "") in _UNIT_LOOKUP:
+        return _UNIT_LOOKUP[key.replace(" ", "")]
+    return None
+
+
+def count_label(text: str) -> Optional[str]:
+    """The label for a count word ("Cloves" -> "clove"); None for other units"""
+    return _COUNT_LABEL_LOOKUP.get(text.strip().lower().rstrip("."))
+
+
+def format_count_label(amount: float, label: str) -> str:
+    """The count word to show with amount: "clove" for 1, "cloves" otherwise"""
+    return label if amount == 1 else COUNT_LABELS.get(label, label)
+
+
+@lru_cache(maxsize=4096)
+def parse_quantity(text: str) -> ParsedQuantity:
+    """
+    Parse a free-form quantity such as "2 lbs", "1 1/2 cups", "3-4 cloves"
+    or "a pinch". Text without a number counts as 1 of whatever unit it
+    names; a number without a known unit is a count.
+    """
+    text = (text or "").lower().replace("⁄", "/")
+    match = QUANTITY_PATTERN.search(text)
+    if match is None:
+        # "a pinch", "one bunch": the first word that names a unit
+        for word in _WORD_PATTERN.finditer(text):
+            found = parse_unit(word.group(0))
+            if found:
+                unit, factor = found
+                return ParsedQuantity(factor, unit, factor, factor, numeric=False, label=count_label(word.group(0)))
+        return ParsedQuantity(1.0, QuantityUnit.COUNT, 1.0, 1.0, numeric=False)
+
+    try:
+        low = _parse_number(match.group("low"))
+        high = _parse_number(match.group("high")) if match.group("high") else low
+    except (ValueError, ZeroDivisionError):
+        return ParsedQuantity(1.0, QuantityUnit.COUNT, 1.0, 1.0, numeric=False)
+    low, high = min(low, high), max(low, high)
+
+    unit, factor, label = QuantityUnit.COUNT, 1.0, None
+    if match.group("unit") and parse_unit(match.group("unit")):
+        unit, factor = parse_unit(match.group("unit"))
+        label = count_label(match.group("unit"))
+    return ParsedQuantity(high * factor, unit, low * factor, high * factor, label=label)
+
+
+@lru_cache(maxsize=4096)
+def parse_package_size(title: str) -> Optional[ParsedQuantity]:
+    """
+    The pack size in a product title: the last number followed by a known
+    unit, so "365 by Whole Foods, Baby Spinach, 16 Ounce" -> 16 oz. None
+    when the title gives no size.
+    """
+    text = title.lower().replace("⁄", "/")
+    for match in reversed(list(QUANTITY_PATTERN.finditer(text))):
+        found = parse_unit(match.group("unit")) if match.group("unit") else None
+        if found is None:
+            continue
+        try:
+            amount = _parse_number(match.group("high") or match.group("low"))
+        except (ValueError, ZeroDivisionError):
+            continue
+        unit, factor = found
+        return ParsedQuantity(amount * factor, unit, amount * factor, amount * factor, label=count_label(match.group("unit")))
+    return None
+
+
+def parse_quantities(texts: Iterable[str]) -> List[ParsedQuantity]:
+    """Parse a batch of quantity strings; repeats are served from the cache"""
+    return [parse_quantity(text) for text in texts]
+
+
+def parse_ingredient_quantity(quantity: Optional[str], unit: Optional[str] = None) -> ParsedQuantity:
+    """
+    Parse a quantity that may come with a separate unit field, as in
+    {"quantity": "1 1/2", "unit": "cups"}. An explicit unit wins over one in
+    the quantity text; an explicit unit we don't recognize becomes OTHER.
+    """
+    parsed = parse_quantity(str(quantity) if quantity is not None else "1")
+    if not unit or not str(unit).strip():
+        return parsed
+    explicit = parse_unit(str(unit))
+    if explicit is None:
+        return parsed._replace(unit=QuantityUnit.OTHER, label=None)
+    explicit_unit, factor = explicit
+    return ParsedQuantity(
+        parsed.amount * factor, explicit_unit, parsed.low * factor, parsed.high * factor, parsed.numeric, count_label(str(unit))
+    )
+
+
+def split_ingredient_line(line: str) -> Tuple[str, str]:
+    """
+    Split a recipe-style line into (name, quantity): "2 cups flour" ->
+    ("flour", "2 cups"). A pack size after the count is skipped, so
+    "1 (14 oz) can tomatoes" -> ("tomatoes", "1 can"). Lines without a
+    leading number are all name, with a quantity of "1".
+    """
+    line = line.strip()
+    match = LEADING_QUANTITY_PATTERN.match(line)
+    if match is None:
+        return line, "1"
+    pack_size = _PACK_SIZE_PATTERN.match(line, match.end())
+    end = pack_size.end() if pack_size else match.end()
+    quantity = line[:match.end()]
+    unit = _LEADING_UNIT_PATTERN.match(line, end)
+    if unit and parse_unit(unit.group(1)):
+        quantity += line[end:unit.end(1)]
+        end = unit.end()
+    name = line[end:].strip()
+    if not name:
+        return line, "1"
+    return name, quantity.strip()
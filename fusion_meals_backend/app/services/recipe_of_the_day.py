@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from app.llm import llm_gateway, PRIORITY_BATCH
+from app.services.image_store import image_store, image_key
+
+logger = logging.getLogger("recipe_of_the_day")
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: each worker generates its own recipe
+    fcntl = None
+
+DEFAULT_STORE_PATH = os.getenv("RECIPE_OF_THE_DAY_PATH", "data/recipe_of_the_day.json")
+# How long before midnight the next day's recipe is generated
+PREWARM_SECONDS = int(os.getenv("RECIPE_OF_THE_DAY_PREWARM_SECONDS", "1800"))
+# A fallback recipe (generation failed) is only served this long before retrying
+FALLBACK_RETRY_SECONDS = 300
+# How often a worker retries the store's lock file while another one generates
+FILE_LOCK_POLL_SECONDS = 0.1
+
+# List of popular cuisine combinations for Recipe of the Day
+popular_cuisine_combos = [
+    ("Italian", "Japanese"),
+    ("Mexican", "Thai"),
+    ("Indian", "Mediterranean"),
+    ("Chinese", "French"),
+    ("Korean", "American"),
+    ("Lebanese", "Brazilian"),
+    ("Vietnamese", "Spanish"),
+    ("Greek", "Japanese"),
+    ("Moroccan", "Chinese"),
+    ("Ethiopian", "Italian")
+]
+
+
+def cuisine_combo_for(day: date) -> Tuple[str, str]:
+    """Pick the day's cuisine pair; stable across restarts and workers"""
+    digest = hashlib.sha256(day.isoformat().encode("utf-8")).digest()
+    return popular_cuisine_combos[int.from_bytes(digest[:4], "big") % len(popular_cuisine_combos)]
+
+
+def seconds_until_midnight(now: Optional[datetime] = None) -> float:
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+class CachedRecipe:
+    """A day's recipe, serialized once and served as-is"""
+
+    def __init__(self, day: date, payload: Dict[str, Any], retry_at: Optional[float] = None):
+        self.day = day
+        self.payload = payload
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        # Set for fallback recipes, which are regenerated after this time
+        self.retry_at = retry_at
+
+    @property
+    def is_fallback(self) -> bool:
+        return self.retry_at is not None
+
+
+async def generate_recipe_of_the_day(day: date) -> Tuple[Dict[str, Any], bool]:
+    """
+    Generate the recipe and image for a day.
+    Returns (payload, ok); ok is False when the fallback recipe was used.
+    """
+    cuisine1, cuisine2 = cuisine_combo_for(day)
+
+    # Create a prompt for recipe of the day
+    prompt = f"""
+    Create a special 'Recipe of the Day' combining {cuisine1} and {cuisine2} cuisines.
+    This should be an approachable recipe that most people can cook with common ingredients.
+
+    Generate the recipe in the following format:
+
+    TITLE: [Catchy recipe name]
+
+    DESCRIPTION: [A brief, enticing description of the dish in 2-3 sentences]
+
+    INGREDIENTS:
+    - [List main ingredients]
+
+    INSTRUCTIONS:
+    1. [Step 1]
+    2. [Step 2]
+    3. [Step 3]
+
+    COOKING TIME: [Total time]
+    DIFFICULTY: [Easy/Medium/Hard]
+    SERVES: [Number of people]
+    """
+
+    ok = True
+    # Generate recipe - using gpt-3.5-turbo instead of gpt-4 for more compatibility
+    try:
+        recipe_text = await llm_gateway.complete(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.8,
+            priority=PRIORITY_BATCH
+        )
+        recipe_text = recipe_text.strip()
+        logger.info(f"Recipe generation succeeded for {cuisine1}-{cuisine2}")
+    except Exception as recipe_error:
+        logger.error(f"Recipe generation error: {recipe_error}")
+        ok = False
+        # Provide a fallback recipe in case of error
+        recipe_text = f"""
+        TITLE: Simple {cuisine1}-{cuisine2} Fusion Dish
+
+        DESCRIPTION: A delicious fusion dish combining elements from {cuisine1} and {cuisine2} cuisines. Perfect for a quick, flavorful meal.
+
+        INGREDIENTS:
+        - Basic ingredients from both cuisines
+        - Common vegetables
+        - Protein of choice
+        - Herbs and spices
+
+        INSTRUCTIONS:
+        1. Prepare all ingredients.
+        2. Cook according to basic techniques from both cuisines.
+        3. Combine and serve hot.
+
+        COOKING TIME: 30 minutes
+        DIFFICULTY: Medium
+        SERVES: 4
+        """
+
+    # Extract title for the image generation
+    title = recipe_text.split("TITLE:")[1].split("\n")[0].strip() if "TITLE:" in recipe_text else f"{cuisine1}-{cuisine2} Fusion Dish"
+
+    # Extract description
+    description = recipe_text.split("DESCRIPTION:")[1].split("\n\n")[0].strip() if "DESCRIPTION:" in recipe_text else "A delicious fusion recipe combining the best of two culinary worlds."
+
+    # Generate an image for the recipe - using a simpler approach
+    try:
+        image_prompt = f"Food photography of {title}, {cuisine1} and {cuisine2} fusion cuisine"
+
+        image_url = await image_store.get_or_create(
+            image_key(title, cuisine1, cuisine2, "dall-e-2-512"),
+            lambda: llm_gateway.generate_image(
+                prompt=image_prompt,
+                model="dall-e-2",  # Using dall-e-2 instead of dall-e-3 for more compatibility
+                size="512x512",  # Smaller size
+                priority=PRIORITY_BATCH
+            )
+        )
+    except Exception as image_error:
+        logger.error(f"Image generation error: {str(image_error)}")
+        image_url = None
+
+    payload = {
+        "recipe": recipe_text,
+        "image_url": image_url,
+        "image_status": "ready" if image_url else "failed",
+        "image_job_id": None,
+        "title": title,
+        "description": description,
+        "cuisines": [cuisine1, cuisine2],
+        "date": day.isoformat()
+    }
+    return payload, ok
+
+
+class RecipeOfTheDayService:
+    """
+    Generates each day's recipe once and serves it from memory.
+
+    Recipes are persisted to a JSON file so restarts don't pay for a new
+    generation, and a background scheduler generates the next day's recipe
+    PREWARM_SECONDS before midnight. Each worker process keeps its own copy
+    in memory. On a miss a worker takes an exclusive lock on a file next to
+    the store and re-reads the store under it, so only the first worker
+    generates a day's recipe; the others poll for the lock and serve the
+    recipe it wrote.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, prewarm_seconds: int = PREWARM_SECONDS):
+        self.path = path
+        self.prewarm_seconds = prewarm_seconds
+        self._recipes: Dict[date, CachedRecipe] = {}
+        self._locks: Dict[date, asyncio.Lock] = {}
+        self._scheduler: Optional["asyncio.Task"] = None
+
+    # Persistence
+    def _read_file(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read {self.path}: {str(e)}")
+            return {}
+
+    def _write_file(self, recipes: Dict[str, Any]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(recipes, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def _try_file_lock(self) -> Optional[int]:
+        """Lock the store's lock file without blocking; its descriptor, or None if another process holds it"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    async def _acquire_file_lock(self) -> Optional[int]:
+        """
+        Wait until this process holds the store's lock file and return its
+        descriptor (None without fcntl). Polls on the event loop rather than
+        blocking a thread, so a cancelled wait never leaves the lock held.
+        """
+        if fcntl is None:
+            return None
+        while True:
+            fd = self._try_file_lock()
+            if fd is not None:
+                return fd
+            await asyncio.sleep(FILE_LOCK_POLL_SECONDS)
+
+    @staticmethod
+    def _release_file_lock(fd: Optional[int]):
+        if fd is None:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    async def _load(self):
+        """Merge recipes other workers have stored into memory (call with the file lock held)"""
+        for day_str, payload in (await asyncio.to_thread(self._read_file)).items():
+            day = date.fromisoformat(day_str)
+            if day >= date.today() and self._fresh(day) is None:
+                self._recipes[day] = CachedRecipe(day, payload)
+
+    async def _persist(self):
+        recipes = {
+            day.isoformat(): recipe.payload
+            for day, recipe in self._recipes.items()
+            if not recipe.is_fallback
+        }
+        try:
+            await asyncio.to_thread(self._write_file, recipes)
+        except OSError as e:
+            logger.warning(f"Could not persist recipe of the day: {str(e)}")
+
+    def _prune(self):
+        today = date.today()
+        for day in [day for day in self._recipes if day < today]:
+            del self._recipes[day]
+            self._locks.pop(day, None)
+
+    # Serving
+    def _fresh(self, day: date) -> Optional[CachedRecipe]:
+        recipe = self._recipes.get(day)
+        if recipe is not None and (recipe.retry_at is None or recipe.retry_at > time.time()):
+            return recipe
+        return None
+
+    async def get(self, day: Optional[date] = None) -> CachedRecipe:
+        """Return the recipe for day (default today), generating it on a miss"""
+        day = day or date.today()
+        recipe = self._fresh(day)
+        if recipe is not None:
+            return recipe
+
+        lock = self._locks.setdefault(day, asyncio.Lock())
+        async with lock:
+            recipe = self._fresh(day)
+            if recipe is not None:
+                return recipe
+
+            # Other workers wait here while one generates, then read its recipe
+            fd = await self._acquire_file_lock()
+            try:
+                await self._load()
+                recipe = self._fresh(day)
+                if recipe is not None:
+                    return recipe
+
+                logger.info(f"Generating recipe of the day for {day.isoformat()}")
+                payload, ok = await generate_recipe_of_the_day(day)
+                recipe = CachedRecipe(day, payload, retry_at=None if ok else time.time() + FALLBACK_RETRY_SECONDS)
+                self._recipes[day] = recipe
+                if ok:
+                    await self._persist()
+            finally:
+                self._release_file_lock(fd)
+            self._prune()
+            return recipe
+
+    # Scheduling
+    async def _run_scheduler(self):
+        while True:
+            try:
+                await self.get()
+                wait = seconds_until_midnight() - self.prewarm_seconds
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self.get(date.today() + timedelta(days=1))
+                # Sleep past midnight before checking today's recipe again
+                await asyncio.sleep(seconds_until_midnight() + 1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Recipe of the day scheduler error: {str(e)}")
+                await asyncio.sleep(FALLBACK_RETRY_SECONDS)
+
+    def start(self):
+        """Start the background refresh loop (call from app startup)"""
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self._run_scheduler())
+
+    async def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            try:
+                await self._scheduler
+            except asyncio.CancelledError:
+                pass
+        self._scheduler = None
+
+
+# Shared recipe of the day used by the recipes router
+recipe_of_the_day = RecipeOfTheDayService()
@@ -0,0 +1,172 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from app.models.pantry import QuantityUnit
+
+# Dimensions a unit can measure; only units of one dimension convert
+# directly, volume <-> mass goes through an ingredient density
+MASS, VOLUME, COUNT = 0, 1, 2
+
+# Unit -> (dimension, size in the dimension's base unit: grams, milliliters, items)
+UNIT_DEFINITIONS = {
+    QuantityUnit.GRAMS: (MASS, 1.0),
+    QuantityUnit.KILOGRAMS: (MASS, 1000.0),
+    QuantityUnit.OUNCE: (MASS, 28.349523125),
+    QuantityUnit.POUND: (MASS, 453.59237),
+    QuantityUnit.MILLILITERS: (VOLUME, 1.0),
+    QuantityUnit.LITERS: (VOLUME, 1000.0),
+    QuantityUnit.TEASPOON: (VOLUME, 4.92892159375),
+    QuantityUnit.TABLESPOON: (VOLUME, 14.78676478125),
+    QuantityUnit.CUP: (VOLUME, 236.5882365),
+    QuantityUnit.PINCH: (VOLUME, 0.308057599609375),  # 1/16 tsp
+    QuantityUnit.COUNT: (COUNT, 1.0),
+}
+
+# Every unit in a fixed order; indexes into the matrix below. QuantityUnit
+# is a str enum, so plain "cup" strings look up the same index.
+UNITS = list(QuantityUnit)
+UNIT_INDEX = {unit: index for index, unit in enumerate(UNITS)}
+
+# Containers (bunch, can, box, ...) and OTHER have no fixed size: each gets
+# a dimension of its own, so it only converts to itself
+_DIMENSIONS = np.array(
+    [UNIT_DEFINITIONS.get(unit, (COUNT + 1 + index, 1.0))[0] for index, unit in enumerate(UNITS)]
+)
+_BASE_SIZES = np.array([UNIT_DEFINITIONS.get(unit, (None, 1.0))[1] for unit in UNITS])
+
+# CONVERSION_MATRIX[i, j] multiplies an amount in UNITS[i] into UNITS[j];
+# NaN where the units measure different things
+CONVERSION_MATRIX = np.where(
+    _DIMENSIONS[:, None] == _DIMENSIONS[None, :],
+    _BASE_SIZES[:, None] / _BASE_SIZES[None, :],
+    np.nan,
+)
+_IS_VOLUME = _DIMENSIONS == VOLUME
+_IS_MASS = _DIMENSIONS == MASS
+
+# Grams per milliliter, matched against ingredient names by keyword.
+# Longer keywords win, so "brown sugar" beats "sugar".
+INGREDIENT_DENSITIES = {
+    "water": 1.0,
+    "broth": 1.0,
+    "stock": 1.0,
+    "milk": 1.03,
+    "buttermilk": 1.03,
+    "cream": 1.0,
+    "sour cream": 1.02,
+    "yogurt": 1.03,
+    "butter": 0.911,
+    "ghee": 0.91,
+    "oil": 0.92,
+    "honey": 1.42,
+    "maple syrup": 1.32,
+    "syrup": 1.33,
+    "molasses": 1.4,
+    "vinegar": 1.01,
+    "soy sauce": 1.17,
+    "lemon juice": 1.03,
+    "lime juice": 1.03,
+    "juice": 1.04,
+    "wine": 0.99,
+    "flour": 0.53,
+    "almond flour": 0.41,
+    "cornstarch": 0.54,
+    "sugar": 0.85,
+    "brown sugar": 0.93,
+    "powdered sugar": 0.56,
+    "salt": 1.2,
+    "kosher salt": 0.54,
+    "baking soda": 0.92,
+    "baking powder": 0.9,
+    "cocoa": 0.42,
+    "rice": 0.85,
+    "oats": 0.41,
+    "quinoa": 0.72,
+    "lentils": 0.81,
+    "breadcrumbs": 0.45,
+    "peanut butter": 1.09,
+    "cheese": 0.45,
+    "parmesan": 0.42,
+    "spinach": 0.13,
+    "cilantro": 0.13,
+    "ground spice": 0.5,
+    "cinnamon": 0.56,
+    "cumin": 0.48,
+    "turmeric": 0.64,
+    "paprika": 0.46,
+    "black pepper": 0.5,
+}
+_DENSITY_KEYWORDS = sorted(INGREDIENT_DENSITIES, key=len, reverse=True)
+
+
+@lru_cache(maxsize=4096)
+def ingredient_density(name: Optional[str]) -> Optional[float]:
+    """Grams per milliliter for an ingredient name, if we know it"""
+    if not name:
+        return None
+    name = name.lower()
+    for keyword in _DENSITY_KEYWORDS:
+        if keyword in name:
+            return INGREDIENT_DENSITIES[keyword]
+    return None
+
+
+# Canonical unit per dimension: what quantities are summed and compared in
+_BASE_UNITS = {MASS: QuantityUnit.GRAMS, VOLUME: QuantityUnit.MILLILITERS}
+
+
+def canonical_unit(unit: QuantityUnit, ingredient: Optional[str] = None) -> QuantityUnit:
+    """
+    The unit to add up amounts of an ingredient in: grams for weights (and
+    for volumes of ingredients with a known density), milliliters for other
+    volumes; counts and containers stay as they are.
+    """
+    dimension = UNIT_DEFINITIONS.get(unit, (None, 1.0))[0]
+    if dimension not in _BASE_UNITS:
+        return unit
+    return _BASE_UNITS[MASS if ingredient_density(ingredient) else dimension]
+
+
+def conversion_factor(from_unit: QuantityUnit, to_unit: QuantityUnit, ingredient: Optional[str] = None) -> Optional[float]:
+    """Multiplier from from_unit to to_unit; None when they can't be converted"""
+    factor = convert_many([1.0], [from_unit], [to_unit], [ingredient])[0]
+    return None if np.isnan(factor) else float(factor)
+
+
+def convert(amount: float, from_unit: QuantityUnit, to_unit: QuantityUnit, ingredient: Optional[str] = None) -> Optional[float]:
+    """
+    Convert amount between units, using the ingredient's density for volume
+    <-> mass. Returns None when the units can't be converted (e.g. cups to
+    cans, or cups to grams of an ingredient with no known density).
+    """
+    factor = conversion_factor(from_unit, to_unit, ingredient)
+    return None if factor is None else amount * factor
+
+
+def convert_many(
+    amounts: Sequence[float],
+    from_units: Sequence[QuantityUnit],
+    to_units: Sequence[QuantityUnit],
+    ingredients: Optional[Iterable[Optional[str]]] = None,
+) -> np.ndarray:
+    """
+    Convert arrays of quantities in one pass. Returns a float array with NaN
+    wherever a conversion isn't possible.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    from_index = np.fromiter((UNIT_INDEX[unit] for unit in from_units), dtype=np.intp, count=len(amounts))
+    to_index = np.fromiter((UNIT_INDEX[unit] for unit in to_units), dtype=np.intp, count=len(amounts))
+
+    factors = CONVERSION_MATRIX[from_index, to_index]
+    if ingredients is not None:
+        densities = np.fromiter(
+            (ingredient_density(name) or np.nan for name in ingredients), dtype=float, count=len(amounts)
+        )
+        scale = _BASE_SIZES[from_index] / _BASE_SIZES[to_index]
+        volume_to_mass = _IS_VOLUME[from_index] & _IS_MASS[to_index]
+        mass_to_volume = _IS_MASS[from_index] & _IS_VOLUME[to_index]
+        factors = np.where(volume_to_mass, scale * densities, factors)
+        factors = np.where(mass_to_volume, scale / densities, factors)
+    return amounts * factors
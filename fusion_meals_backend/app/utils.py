@@ -0,0 +1,15 @@
+from starlette.requests import Request
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the request's If-None-Match covers etag, so a 304 can be sent.
+    Handles lists ('"a", "b"'), "*" and weak validators (W/"a"), which
+    If-None-Match compares the same as strong ones.
+    """
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in tags)
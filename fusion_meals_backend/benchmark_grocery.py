@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""
+Grocery Parsing Benchmark for Fusion Meals Backend
+
+Compares the compiled keyword categorizer used by /grocery/parse-recipe
+against the previous per-request nested substring scan, on synthetic
+grocery lists of 1k and 10k lines, and checks both give the same answers.
+Then times /grocery/aggregate merging hundreds of recipes in one call, and
+the per-item fuzzy product matching /grocery/amazon-checkout runs against
+the product catalog (or the compiled index, when one has been built), and
+pricing whole carts the way /grocery/add-to-cart does.
+
+Usage:
+    cd fusion_meals_backend
+    python benchmark_grocery.py [--sizes 1000 10000] [--repeat 5] [--recipes 100 500] [--max-ms 100] [--max-match-ms 1] [--carts 50 500]
+"""
+
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from app.services.grocery_aggregator import aggregate_grocery_lists, iter_list_items
+from app.services.grocery_parser import categorize_items
+from app.services.product_index import load_catalog
+from app.services.product_matcher import ProductMatcher, fit_package_sizes
+from app.services.price_estimator import price_estimator
+from app.services.grocery_categorizer import (
+    GroceryCategorizer,
+    CATEGORY_KEYWORDS,
+    SPECIAL_CASES,
+    CATEGORY_PRIORITY,
+)
+
+ADJECTIVES = ["fresh", "organic", "large", "chopped", "frozen", "baby", "smoked", "extra virgin", "whole", "ground", "dried", ""]
+QUANTITIES = ["1", "2", "3-4", "1/2 cup", "1 1/2 cups", "2 tbsp", "1 tsp", "½ tsp", "200 g", "1 lb", "2 cloves", "1 can", "to taste"]
+# Plural produce and dairy lines, which /aggregate and /parse-recipe must file under the same category
+PLURAL_LINES = ["12 eggs", "3 tomatoes", "8 oz mushrooms", "1 lb green beans", "2 cucumbers", "1 cup peas",
+                "2 cups shredded cheeses", "4 lemons", "3 potatoes", "2 bell peppers"]
+# Sized and bare counts of the same item, which /aggregate must merge into one row; garlic cloves
+# and heads stay apart: (line, merged name, merged quantity)
+COUNT_LINES = [("2 large eggs", "eggs", "5"), ("3 eggs", "eggs", "5"), ("1 medium onion", "onion", "4"),
+               ("1 onion", "onion", "4"), ("2 large onions", "onion", "4"), ("4 cloves garlic", "garlic", "4 cloves"),
+               ("1 head garlic", "garlic", "1 head")]
+# The same can with and without its pack size, which /aggregate must merge
+PACK_SIZE_LINES = ["1 (14 oz) can diced tomatoes", "1 can diced tomatoes"]
+UNKNOWN_ITEMS = ["parchment paper", "foil", "toothpicks", "ziploc bags", "charcoal", "birthday candles"]
+# Checkout items (name, quantity, Amazon category), typos included
+MATCH_ITEMS = [
+    ("cherry tomatoes", "2 pints", "GroceryFresh"),
+    ("tomato paste", "1 can", "Grocery"),
+    ("tomatoe", "2 lbs", "GroceryFresh"),
+    ("red onions", "3", "GroceryFresh"),
+    ("chiken breast", "3 lbs", "GroceryFresh"),
+    ("spinnach", "8 oz", "GroceryFresh"),
+    ("extra virgin olive oil", "2 cups", "Grocery"),
+    ("eggs", "18", "GroceryFresh"),
+    ("basmati rice", "4 cups", "Grocery"),
+    ("birthday candles", "1", "Grocery"),
+]
+
+
+def categorize_naive(item_lower, category_items=CATEGORY_KEYWORDS, special_cases=SPECIAL_CASES):
+    """The pre-compilation algorithm: special cases, then any() per category in priority order"""
+    for special_item, special_category in special_cases.items():
+        if special_item in item_lower:
+            return special_category
+    for cat in CATEGORY_PRIORITY:
+        if any(keyword in item_lower for keyword in category_items.get(cat, [])):
+            return cat
+    return None
+
+
+def make_items(count, seed=42):
+    rng = random.Random(seed)
+    keywords = [keyword for words in CATEGORY_KEYWORDS.values() for keyword in words] + list(SPECIAL_CASES)
+    items = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            base = rng.choice(UNKNOWN_ITEMS)
+        else:
+            base = " ".join(rng.sample(keywords, rng.choice([1, 1, 2])))
+        items.append(f"{rng.choice(ADJECTIVES)} {base}".strip())
+    return items
+
+
+def make_recipes(count, lines_per_recipe=15, seed=7):
+    """Plain recipe ingredient lists drawn from a shared pool, so items repeat across recipes"""
+    rng = random.Random(seed)
+    pool = make_items(300, seed=seed)
+    recipes = []
+    for _ in range(count):
+        lines = []
+        for name in rng.sample(pool, lines_per_recipe):
+            quantity = rng.choice(QUANTITIES)
+            lines.append(f"- {name}, {quantity}" if quantity == "to taste" else f"- {quantity} {name}")
+        recipes.append("\n".join(lines))
+    return recipes
+
+
+def best_time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark grocery item categorization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--recipes", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if aggregating any recipe count takes longer")
+    parser.add_argument("--max-match-ms", type=float, default=None, help="fail if matching one checkout item takes longer")
+    parser.add_argument("--carts", type=int, nargs="+", default=[50, 500], help="cart sizes to price")
+    args = parser.parse_args()
+
+    print("=== Fusion Meals Grocery Categorization Benchmark ===")
+    for size in args.sizes:
+        items = [item.lower() for item in make_items(size)]
+
+        expected = [categorize_naive(item) for item in items]
+        compiled = GroceryCategorizer(cache_size=0)
+        mismatches = [item for item, category in zip(items, expected) if compiled.categorize(item) != category]
+        if mismatches:
+            print(f"\n❌ {len(mismatches)} items categorized differently, e.g. {mismatches[:3]}")
+            sys.exit(1)
+
+        naive_best, naive_median = best_time(lambda: [categorize_naive(item) for item in items], args.repeat)
+        compiled_best, compiled_median = best_time(lambda: [compiled.categorize(item) for item in items], args.repeat)
+
+        # Real lists repeat items across requests; the shared categorizer memoizes names
+        cached = GroceryCategorizer()
+        [cached.categorize(item) for item in items]
+        cached_best, cached_median = best_time(lambda: [cached.categorize(item) for item in items], args.repeat)
+
+        print(f"\n{size} lines ({len(set(items))} distinct items)")
+        print(f"  nested substring scan: best {naive_best * 1000:8.2f} ms   median {naive_median * 1000:8.2f} ms")
+        print(f"  compiled automaton:    best {compiled_best * 1000:8.2f} ms   median {compiled_median * 1000:8.2f} ms   ({naive_best / compiled_best:.1f}x)")
+        print(f"  automaton + lru cache: best {cached_best * 1000:8.2f} ms   median {cached_median * 1000:8.2f} ms   ({naive_best / cached_best:.1f}x)")
+
+    print("\n=== Multi-recipe Aggregation ===")
+    plural_list = "\n".join(f"- {line}" for line in PLURAL_LINES)
+    parsed = {item["name"]: item["category"] for item in categorize_items(iter_list_items(plural_list))}
+    aggregated = {item["name"]: item["category"] for item in aggregate_grocery_lists([plural_list]) if item["name"] in parsed}
+    disagreements = [(name, aggregated.get(name), category) for name, category in parsed.items() if aggregated.get(name) != category]
+    if disagreements:
+        print(f"\n❌ Aggregated and parsed categories differ (name, aggregated, parsed): {disagreements}")
+        sys.exit(1)
+    print(f"Aggregated and parsed categories agree for {len(parsed)} plural items")
+    merged = {(item["name"], item["quantity"]) for item in aggregate_grocery_lists(["\n".join(line for line, _, _ in COUNT_LINES)])}
+    expected = {(name, quantity) for _, name, quantity in COUNT_LINES}
+    if not expected <= merged:
+        print(f"\n❌ Counts merged wrong: expected {sorted(expected)}, got {sorted(merged)}")
+        sys.exit(1)
+    print(f"Sized and bare counts merge into {len(expected)} rows")
+    cans = [item for item in aggregate_grocery_lists(["\n".join(PACK_SIZE_LINES)]) if item["name"] == "diced tomatoes"]
+    if [item["quantity"] for item in cans] != ["2 can"]:
+        print(f"\n❌ Pack-size lines merged wrong: {cans}")
+        sys.exit(1)
+    print("Pack-size and plain can lines merge into one row")
+    for count in args.recipes:
+        recipes = make_recipes(count)
+        merged = aggregate_grocery_lists(recipes)
+        line_count = sum(len(recipe.split("\n")) for recipe in recipes)
+        agg_best, agg_median = best_time(lambda: aggregate_grocery_lists(recipes), args.repeat)
+        print(f"\n{count} recipes ({line_count} lines -> {len(merged)} items)")
+        print(f"  aggregate: best {agg_best * 1000:8.2f} ms   median {agg_median * 1000:8.2f} ms")
+        if args.max_ms is not None and agg_median * 1000 > args.max_ms:
+            print(f"\n❌ Aggregating {count} recipes took {agg_median * 1000:.1f} ms, over the {args.max_ms:.1f} ms budget")
+            sys.exit(1)
+
+    print("\n=== Checkout Product Matching ===")
+    catalog = load_catalog()
+    start = time.perf_counter()
+    matcher = ProductMatcher(catalog)
+    setup = time.perf_counter() - start
+
+    def match_all():
+        return [fit_package_sizes(matcher.match(name, category, k=10), quantity, name) for name, quantity, category in MATCH_ITEMS]
+
+    start = time.perf_counter()
+    results = match_all()
+    cold = time.perf_counter() - start
+    match_best, match_median = best_time(match_all, max(args.repeat, 50))
+    per_item = match_median * 1000 / len(MATCH_ITEMS)
+    print(f"\n{len(catalog)} products, {len(MATCH_ITEMS)} items (matcher setup {setup * 1000:.2f} ms)")
+    for (name, quantity, _), matches in zip(MATCH_ITEMS, results):
+        best = f"{matches[0].product.title} (score {matches[0].score}, packs {matches[0].packs})" if matches else "no match"
+        print(f"  {name} [{quantity}] -> {best}")
+    print(f"  first pass: {cold * 1000 / len(MATCH_ITEMS):8.3f} ms/item")
+    print(f"  per item:   best {match_best * 1000 / len(MATCH_ITEMS):8.3f} ms   median {per_item:8.3f} ms")
+    if args.max_match_ms is not None and per_item > args.max_match_ms:
+        print(f"\n❌ Matching took {per_item:.3f} ms per item, over the {args.max_match_ms:.3f} ms budget")
+        sys.exit(1)
+
+    print("\n=== Cart Pricing ===")
+    sized, bare = price_estimator.estimate_many([("eggs", "24 large", "Dairy & Eggs"), ("eggs", "24", "Dairy & Eggs")])
+    if sized != bare:
+        print(f"\n❌ \"24 large\" eggs priced as {sized}, \"24\" as {bare}")
+        sys.exit(1)
+    print(f"\"24 large\" eggs priced like \"24\": {sized.packs} x {sized.product}")
+    categories = ["Produce", "Meat & Seafood", "Dairy & Eggs", "Pantry", "Spices & Seasonings"]
+    for size in args.carts:
+        rng = random.Random(size)
+        pool = [(name, quantity) for name, quantity, _ in MATCH_ITEMS] + \
+            [(name, rng.choice(QUANTITIES)) for name in make_items(100, seed=size)]
+        cart = [(name, quantity, rng.choice(categories)) for name, quantity in (rng.choice(pool) for _ in range(size))]
+        estimates = price_estimator.estimate_many(cart)
+        from_catalog = sum(estimate.source == "catalog" for estimate in estimates)
+        price_best, price_median = best_time(lambda: price_estimator.estimate_many(cart), max(args.repeat, 20))
+        print(f"\n{size} items ({from_catalog} priced from the catalog, total ${sum(estimate.price for estimate in estimates):.2f})")
+        print(f"  reprice cart: best {price_best * 1000:8.3f} ms   median {price_median * 1000:8.3f} ms")
+
+    print("\n✅ Grocery categorization benchmark completed")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Weekly Meal Plan Fan-out Benchmark for Fusion Meals Backend
+
+Times the seven per-day generations behind the AI Chef weekly meal plan
+run one after another and fanned out concurrently, against a simulated
+LLM latency, then merges the days the way the endpoint does. The days mix
+the nutrition shapes models return: full objects, and bare values such
+as "protein": "30g", which must merge the same way.
+
+Usage:
+    cd fusion_meals_backend
+    python benchmark_meal_plan.py [--latency-ms 200] [--concurrency 7]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from app.services.meal_plan_fanout import WEEK_DAYS, fan_out, merge_weekly_meal_plan
+
+# Protein grams per day; odd days report them as a bare "30g" rather than an object
+DAILY_PROTEIN = [30, 40, 50, 30, 40, 50, 40]
+
+
+def make_day(index, day_name):
+    protein, sources = DAILY_PROTEIN[index], ["chicken", "lentils"]
+    if index % 2:
+        # The bare-value shapes: a macro as its amount, sources as one string
+        nutrition = {
+            "calories": f"{1800 + index * 10} kcal",
+            "protein": f"{protein}g",
+            "carbohydrates": "200",
+            "fats": 60,
+            "fiber": {"grams": "25g", "sources": "oats, beans"},
+            "micronutrients": {"vitamin_c": "80%", "vitamin_c_sources": "peppers, kiwi"},
+        }
+    else:
+        nutrition = {
+            "calories": 1800 + index * 10,
+            "protein": {"grams": f"{protein}g", "sources": sources},
+            "carbohydrates": {"grams": 200},
+            "fats": {"grams": "60 g"},
+            "fiber": {"grams": 25, "sources": ["oats"]},
+            "micronutrients": {"vitamin_c": 80},
+        }
+    return {
+        "day": {"day": day_name, "breakfast": {"name": "Oats", "calories": 400}},
+        "nutrition": nutrition,
+        "grocery_items": {"produce": ["Peppers"], "protein": "Chicken, Lentils"},
+        "estimated_cost": "$20",
+        "prep_ahead": ["Cook lentils"],
+        "storage_tips": ["Refrigerate"],
+    }
+
+
+def day_jobs(latency):
+    def job(index, day_name):
+        async def generate():
+            await asyncio.sleep(latency)
+            return make_day(index, day_name)
+        return generate
+    return [job(index, day_name) for index, day_name in enumerate(WEEK_DAYS)]
+
+
+async def timed(latency, concurrency):
+    start = time.perf_counter()
+    days = await fan_out(day_jobs(latency), concurrency=concurrency)
+    return time.perf_counter() - start, merge_weekly_meal_plan(days)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the weekly meal plan fan-out")
+    parser.add_argument("--latency-ms", type=float, default=200, help="simulated time for one day's generation")
+    parser.add_argument("--concurrency", type=int, default=7, help="day generations in flight at once")
+    args = parser.parse_args()
+
+    print("=== Fusion Meals Weekly Meal Plan Fan-out Benchmark ===")
+    latency = args.latency_ms / 1000
+    sequential, _ = asyncio.run(timed(latency, 1))
+    concurrent, plan = asyncio.run(timed(latency, args.concurrency))
+    print(f"\n{len(WEEK_DAYS)} days at {args.latency_ms:g} ms each:")
+    print(f"  one at a time:   {sequential * 1000:8.1f} ms")
+    print(f"  concurrency {args.concurrency}:   {concurrent * 1000:8.1f} ms   ({sequential / concurrent:.1f}x)")
+
+    summary = plan["nutrition_summary"]
+    expected = {
+        "protein grams": (summary["daily_macros"]["protein"]["grams"], f"{round(sum(DAILY_PROTEIN) / len(DAILY_PROTEIN))}"),
+        "fats grams": (summary["daily_macros"]["fats"]["grams"], "60"),
+        "fiber sources": (summary["daily_macros"]["fiber"]["sources"], ["oats", "beans"]),
+        "vitamin C": (summary["micronutrients"]["vitamin_c"], "80% DV"),
+        "protein groceries": (plan["grocery_list"]["protein"], ["Chicken", "Lentils"]),
+        "days": (len(plan["meal_plan"]["days"]), len(WEEK_DAYS)),
+    }
+    wrong = {name: values for name, values in expected.items() if values[0] != values[1]}
+    if wrong:
+        print(f"\n❌ Merged plan differs from expected (got, expected): {wrong}")
+        sys.exit(1)
+    print(f"Merged {len(WEEK_DAYS)} days with object and bare-value nutrition")
+
+    print("\n✅ Meal plan fan-out benchmark completed")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+Pantry Database Benchmark for Fusion Meals Backend
+
+Compares request latency under concurrent load for the pantry and recipe
+ratings reads, served two ways:
+
+- blocking: async handlers running the queries on a synchronous Session,
+  as the routers did before (every round trip stalls the event loop)
+- async: the AsyncSession services the routers use now
+
+Each round fires --concurrency requests at once (inventory, low-stock and
+review reads for random users and recipes) and times each from the start
+of the round, so time spent queued behind a blocked event loop counts.
+Reports p50/p99 latency per mode and the worst event-loop stall.
+
+Runs against a throwaway SQLite file by default; pass --database-url to
+use Postgres (the async side connects through asyncpg). Local SQLite has
+no network round trip for async I/O to overlap, so --round-trip-ms adds a
+simulated one to every statement: it blocks the caller on the sync driver
+and only aiosqlite's worker thread on the async one, as a real server wait
+would. Seeded rows are removed afterwards.
+
+Usage:
+    cd fusion_meals_backend
+    python benchmark_pantry_db.py [--database-url URL] [--round-trip-ms 2] [--users 50] [--items 50] [--concurrency 50] [--rounds 20] [--max-p99-ms 250]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'fusion_meals_bench.db')}"
+USER_PREFIX = "bench-user-"
+RECIPE_PREFIX = "bench-recipe-"
+REVIEWS_PER_RECIPE = 20
+ITEM_NAMES = ["flour", "sugar", "milk", "eggs", "butter", "rice", "onion", "garlic", "tomato", "olive oil",
+              "chicken breast", "spinach", "basil", "cumin", "black beans", "pasta", "parmesan", "lemon"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def simulate_round_trips(sync_engine, seconds, raw_connection=lambda connection: connection):
+    """Sleep for seconds in whichever thread runs each statement on connections from sync_engine"""
+    def on_connect(dbapi_connection, connection_record):
+        raw_connection(dbapi_connection).set_trace_callback(lambda statement: time.sleep(seconds))
+    event.listen(sync_engine, "connect", on_connect)
+
+
+def seed(session_factory, users, items, recipes, seed_value=42):
+    """Insert benchmark users, their pantry items and recipe reviews"""
+    rng = random.Random(seed_value)
+    today = date.today()
+    with session_factory() as db:
+        db.add_all(User(id=f"{USER_PREFIX}{u}", username=f"{USER_PREFIX}{u}", email=f"{USER_PREFIX}{u}@example.com")
+                   for u in range(users))
+        db.flush()
+        db.add_all(
+            PantryItem(
+                user_id=f"{USER_PREFIX}{u}",
+                name=f"{name} {i}",
+                name_norm=f"{name} {i}",
+                category="Pantry",
+                quantity=rng.choice([0.5, 1, 2, 5, 500]),
+                unit="count",
+                purchase_date=today,
+                expiry_date=today + timedelta(days=rng.randint(-10, 60)),
+                status="available",
+                threshold_quantity=rng.choice([None, 1, 2])
+            )
+            for u in range(users)
+            for i, name in ((i, ITEM_NAMES[i % len(ITEM_NAMES)]) for i in range(items))
+        )
+        db.add_all(
+            RecipeRating(recipe_id=f"{RECIPE_PREFIX}{r}", user_id=f"{USER_PREFIX}{n % users}",
+                         rating=rng.randint(1, 5), review="Tasty")
+            for r in range(recipes)
+            for n in range(REVIEWS_PER_RECIPE)
+        )
+        db.commit()
+
+
+def cleanup(session_factory):
+    with session_factory() as db:
+        db.execute(delete(RecipeRating).where(RecipeRating.recipe_id.like(f"{RECIPE_PREFIX}%")))
+        db.execute(delete(PantryItem).where(PantryItem.user_id.like(f"{USER_PREFIX}%")))
+        db.execute(delete(User).where(User.id.like(f"{USER_PREFIX}%")))
+        db.commit()
+
+
+# The handlers as they were: async functions running queries on a sync Session
+async def blocking_request(kind, key):
+    with SessionLocal() as db:
+        if kind == "reviews":
+            ratings = db.scalars(select(RecipeRating).where(RecipeRating.recipe_id == key)).all()
+            return len(ratings)
+        status = PantryItemStatus.LOW if kind == "low-stock" else None
+        rows = db.execute(pantry_items_query(key, status)).all()
+        return len([db_to_pydantic_pantry_item(item, item_status) for item, item_status in rows])
+
+
+# The handlers as they are now
+async def async_request(kind, key):
+    async with AsyncSessionLocal() as db:
+        if kind == "reviews":
+            return (await recipe_ratings.get_reviews(key, db))["review_count"]
+        if kind == "low-stock":
+            return len(await db_pantry_service.get_low_stock_items(db, key))
+        return len((await db_pantry_service.get_pantry_inventory(db, key)).items)
+
+
+async def run(handler, workload, concurrency, rounds):
+    """Per-request latencies (seconds), results and the longest event-loop stall"""
+    stalls = []
+
+    async def watch_loop(interval=0.001):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            stalls.append(time.perf_counter() - started - interval)
+
+    async def timed(start, kind, key):
+        result = await handler(kind, key)
+        return time.perf_counter() - start, result
+
+    watcher = asyncio.create_task(watch_loop())
+    latencies, results = [], []
+    for round_index in range(rounds):
+        batch = workload[round_index * concurrency:(round_index + 1) * concurrency]
+        start = time.perf_counter()
+        for latency, result in await asyncio.gather(*(timed(start, kind, key) for kind, key in batch)):
+            latencies.append(latency)
+            results.append(result)
+    watcher.cancel()
+    return latencies, results, max(stalls, default=0.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs async pantry database access")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="database to seed and query (sync URL)")
+    parser.add_argument("--round-trip-ms", type=float, default=0, help="simulated server round trip per statement (SQLite only)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=50, help="pantry items per user")
+    parser.add_argument("--recipes", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight per round")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="fail if the async p99 latency is higher")
+    args = parser.parse_args()
+
+    # The engines are built from DATABASE_URL when the database module is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.database_url == DEFAULT_DATABASE_URL and os.path.exists(DEFAULT_DATABASE_URL[len("sqlite:///"):]):
+        os.remove(DEFAULT_DATABASE_URL[len("sqlite:///"):])
+
+    from sqlalchemy import delete, event, select
+    from app.database.database import ASYNC_DATABASE_URL, AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+    from app.database.models import PantryItem, User
+    from app.models.pantry import PantryItemStatus
+    from app.models.recipe_rating import RecipeRating
+    from app.routers import recipe_ratings
+    from app.services import db_pantry_service
+    from app.services.db_pantry_service import db_to_pydantic_pantry_item, pantry_items_query
+
+    print("=== Fusion Meals Pantry Database Benchmark ===")
+    print(f"Sync URL: {args.database_url}")
+    print(f"Async URL: {ASYNC_DATABASE_URL}")
+
+    Base.metadata.create_all(bind=engine)
+    cleanup(SessionLocal)
+    seed(SessionLocal, args.users, args.items, args.recipes)
+    print(f"Seeded {args.users} users x {args.items} items, {args.recipes} recipes x {REVIEWS_PER_RECIPE} reviews")
+
+    if args.round_trip_ms:
+        if not args.database_url.startswith("sqlite"):
+            print("\n❌ --round-trip-ms only applies to SQLite; server databases have real round trips")
+            sys.exit(1)
+        # Seeding ran without the delay; new pooled connections pick it up
+        engine.dispose()
+        simulate_round_trips(engine, args.round_trip_ms / 1000)
+        # aiosqlite runs statements on its own thread, around the sqlite3 connection
+        simulate_round_trips(async_engine.sync_engine, args.round_trip_ms / 1000,
+                             lambda connection: connection._connection._conn)
+        print(f"Simulating a {args.round_trip_ms:g} ms round trip per statement")
+
+    rng = random.Random(7)
+    workload = []
+    for _ in range(args.concurrency * args.rounds):
+        kind = rng.choice(["inventory", "low-stock", "reviews"])
+        prefix, count = (RECIPE_PREFIX, args.recipes) if kind == "reviews" else (USER_PREFIX, args.users)
+        workload.append((kind, f"{prefix}{rng.randrange(count)}"))
+
+    async def main():
+        # Warm both paths (connections, compiled statements) before timing
+        await run(blocking_request, workload[:args.concurrency], args.concurrency, 1)
+        await run(async_request, workload[:args.concurrency], args.concurrency, 1)
+        report = {}
+        for mode, handler in (("blocking", blocking_request), ("async", async_request)):
+            report[mode] = await run(handler, workload, args.concurrency, args.rounds)
+        await async_engine.dispose()
+        return report
+
+    try:
+        report = asyncio.run(main())
+    finally:
+        cleanup(SessionLocal)
+
+    print(f"\n{args.concurrency * args.rounds} requests, {args.concurrency} concurrent:")
+    for mode, (latencies, _, stall) in report.items():
+        print(f"  {mode:>8}: p50 {statistics.median(latencies) * 1000:8.2f} ms   "
+              f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms   "
+              f"worst loop stall {stall * 1000:8.2f} ms")
+
+    if report["blocking"][1] != report["async"][1]:
+        print("\n❌ Blocking and async reads returned different results")
+        sys.exit(1)
+    async_p99 = percentile(report["async"][0], 0.99) * 1000
+    if args.max_p99_ms is not None and async_p99 > args.max_p99_ms:
+        print(f"\n❌ Async p99 latency {async_p99:.1f} ms is over the {args.max_p99_ms:.1f} ms budget")
+        sys.exit(1)
+
+    print("\n✅ Pantry database benchmark completed")
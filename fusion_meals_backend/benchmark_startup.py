@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Worker Startup Benchmark for Fusion Meals Backend
+
+Measures how long a fresh worker takes to import the app and run its
+startup hooks, which is what every uvicorn/gunicorn worker pays on boot.
+Each run is a separate Python process so module caches don't hide costs.
+
+Usage:
+    cd fusion_meals_backend
+    python benchmark_startup.py [--runs 10] [--max-ms 3000]
+
+With --max-ms the script exits non-zero when the median exceeds the budget,
+so it can run in CI to catch startup regressions (e.g. network calls at import).
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Runs inside the child process: time the import and the startup hooks separately
+CHILD_SCRIPT = """
+import json, time, asyncio
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def run_startup():
+    await app.router.startup()
+    started = time.perf_counter()
+    await app.router.shutdown()
+    return started
+
+started = asyncio.run(run_startup())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (started - imported) * 1000}))
+"""
+
+
+def run_once(env):
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "worker failed to start")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark worker startup time")
+    parser.add_argument("--runs", type=int, default=10, help="number of fresh processes to time")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if median import + startup exceeds this")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Startup must not depend on a working key; a dummy one proves no call is made at import
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark-dummy")
+
+    print("=== Fusion Meals Worker Startup Benchmark ===")
+    totals, imports, startups = [], [], []
+    try:
+        for i in range(args.runs):
+            timing = run_once(env)
+            imports.append(timing["import_ms"])
+            startups.append(timing["startup_ms"])
+            totals.append(timing["import_ms"] + timing["startup_ms"])
+            print(f"  run {i + 1:>2}: import {timing['import_ms']:8.1f} ms   startup hooks {timing['startup_ms']:7.1f} ms")
+    except Exception as e:
+        print(f"\n❌ Worker failed to start: {str(e)}")
+        sys.exit(1)
+
+    print(f"\nImport:        median {statistics.median(imports):8.1f} ms   p95 {percentile(imports, 0.95):8.1f} ms")
+    print(f"Startup hooks: median {statistics.median(startups):8.1f} ms   p95 {percentile(startups, 0.95):8.1f} ms")
+    print(f"Total:         median {statistics.median(totals):8.1f} ms   p95 {percentile(totals, 0.95):8.1f} ms")
+
+    if args.max_ms is not None and statistics.median(totals) > args.max_ms:
+        print(f"\n❌ Median startup {statistics.median(totals):.1f} ms exceeds budget of {args.max_ms:.1f} ms")
+        sys.exit(1)
+    print("\n✅ Startup benchmark completed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Product Index Builder for Fusion Meals Backend
+
+Compiles the product catalog (JSON list or CSV) into the memory-mapped
+index that amazon_service searches: a fixed-width product table, a sorted
+term dictionary and postings arrays. Workers map the file read-only, so
+they share one copy in the page cache and start without parsing anything.
+
+Usage:
+    cd fusion_meals_backend
+    python build_product_index.py [--input data/product_catalog.json] [--output data/product_catalog.idx]
+
+Rebuild whenever the catalog changes; when no index exists the service
+falls back to loading the JSON catalog into memory.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from app.services.product_catalog import DEFAULT_CATALOG_PATH, IndexedProductCatalog, load_catalog_records, record_keywords, tokenize
+from app.services.product_index import DEFAULT_INDEX_PATH, MmapProductCatalog, write_product_index
+from app.services.product_matcher import ProductMatcher
+
+
+# Larger catalogs are too slow to load into the in-memory catalog for comparison
+VERIFY_MAX_PRODUCTS = 50000
+
+
+def verify(records, index_path, sample=200):
+    """Check the matcher ranks and scores the compiled index like the in-memory catalog for a sample of terms"""
+    expected = IndexedProductCatalog(records)
+    compiled = MmapProductCatalog(index_path)
+    expected_matcher, compiled_matcher = ProductMatcher(expected), ProductMatcher(compiled)
+    if len(compiled) != len(records):
+        return f"expected {len(records)} products, found {len(compiled)}"
+    terms = sorted({
+        token
+        for record in records
+        for text in [record["title"], *record_keywords(record)]
+        for token in tokenize(text)
+    })[:sample]
+    for term in terms:
+        for category in (None, "Grocery", "GroceryFresh"):
+            # A one-letter typo exercises the fuzzy path too
+            for query in (term, term[:-1]):
+                want = [(match.product.model_dump(), match.score) for match in expected_matcher.match(query, category)]
+                got = [(match.product.model_dump(), match.score) for match in compiled_matcher.match(query, category)]
+                if want != got:
+                    return f"match '{query}' in {category}: expected {want}, got {got}"
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the product catalog into a memory-mapped index")
+    parser.add_argument("--input", default=DEFAULT_CATALOG_PATH, help="catalog JSON or CSV")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH, help="index file to write")
+    args = parser.parse_args()
+
+    print("=== Fusion Meals Product Index Builder ===")
+    try:
+        start = time.perf_counter()
+        records = load_catalog_records(args.input)
+        counts = write_product_index(records, args.output)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        print(f"\n❌ Could not build the index: {str(e)}")
+        sys.exit(1)
+
+    print(f"Read {len(records)} products from {args.input}")
+    print(f"Indexed {counts['terms']} terms, {counts['postings']} postings in {elapsed:.2f} s")
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024:.1f} KiB)")
+
+    if len(records) <= VERIFY_MAX_PRODUCTS:
+        problem = verify(records, args.output)
+        if problem:
+            print(f"\n❌ Index doesn't match the in-memory catalog: {problem}")
+            sys.exit(1)
+        print("Verified rankings against the in-memory catalog")
+    print("\n✅ Product index built")
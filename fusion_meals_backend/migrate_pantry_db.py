@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Pantry Schema Migration for Fusion Meals Backend
+
+Brings an existing pantry_items table up to date with app/database/models.py:
+adds the name_norm column (the normalized item name bulk grocery updates
+look items up by), backfills it for existing rows, then creates the
+per-user composite indexes on (user_id, name_norm), (user_id, status) and
+(user_id, expiry_date). Safe to run more than once; new databases get the
+column and indexes from initialize_db.py.
+
+Usage:
+    cd fusion_meals_backend
+    python migrate_pantry_db.py [--batch-size 1000]
+
+The script expects a DATABASE_URL environment variable or uses the default connection string.
+"""
+
+import os
+import sys
+import argparse
+from typing import List
+
+from sqlalchemy import inspect, text
+
+from app.database.database import engine
+from app.database.models import PantryItem
+from app.services.grocery_aggregator import normalize_name
+
+
+def add_name_norm_column(connection) -> bool:
+    """Add pantry_items.name_norm if it's missing; returns whether it was added"""
+    columns = {column["name"] for column in inspect(connection).get_columns("pantry_items")}
+    if "name_norm" in columns:
+        return False
+    connection.execute(text("ALTER TABLE pantry_items ADD COLUMN name_norm VARCHAR"))
+    return True
+
+
+def backfill_name_norm(connection, batch_size: int) -> int:
+    """Fill name_norm for rows that don't have it, batch_size rows per UPDATE round trip"""
+    rows = connection.execute(text("SELECT id, name FROM pantry_items WHERE name_norm IS NULL")).fetchall()
+    updates = [{"id": row.id, "name_norm": normalize_name(row.name or "")} for row in rows]
+    for start in range(0, len(updates), batch_size):
+        connection.execute(
+            text("UPDATE pantry_items SET name_norm = :name_norm WHERE id = :id"),
+            updates[start:start + batch_size]
+        )
+    return len(updates)
+
+
+def create_indexes(connection) -> List[str]:
+    """Create the pantry_items indexes declared on the model that the table lacks; returns their names"""
+    existing = {index["name"] for index in inspect(connection).get_indexes("pantry_items")}
+    created = []
+    for index in sorted(PantryItem.__table__.indexes, key=lambda index: index.name):
+        if index.name not in existing:
+            index.create(connection)
+            created.append(index.name)
+    return created
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the pantry_items table")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per backfill UPDATE")
+    args = parser.parse_args()
+
+    print("=== Fusion Meals Pantry Migration ===")
+    print(f"Using database URL: {os.getenv('DATABASE_URL', 'postgresql://vinitdesai@localhost:5432/fusion_meals')}")
+
+    try:
+        with engine.begin() as connection:
+            if add_name_norm_column(connection):
+                print("Added pantry_items.name_norm")
+            else:
+                print("pantry_items.name_norm already exists")
+            print(f"Backfilled name_norm for {backfill_name_norm(connection, args.batch_size)} rows")
+            # After the backfill, so the indexes are built once over the final values
+            created = create_indexes(connection)
+            print(f"Created indexes: {', '.join(created)}" if created else "All pantry_items indexes already exist")
+            # Fresh statistics, so the planner weighs the new indexes by real row counts
+            connection.execute(text("ANALYZE pantry_items"))
+    except Exception as e:
+        print(f"\n❌ Error migrating pantry table: {str(e)}")
+        sys.exit(1)
+
+    print("\n✅ Pantry migration completed successfully!")